@@ -0,0 +1,58 @@
+import asyncio
+
+from alembic import context
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from conf.config import settings
+from webapp.models import meta
+from webapp.models.meta import DEFAULT_SCHEMA
+
+target_metadata = meta.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=settings.DB_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_schemas=True,
+        version_table_schema=DEFAULT_SCHEMA,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_schemas=True,
+        version_table_schema=DEFAULT_SCHEMA,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    engine = create_async_engine(settings.DB_URL, poolclass=NullPool)
+
+    # таблица версий лежит в той же схеме, поэтому схема создается до миграций
+    async with engine.begin() as connection:
+        await connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS {DEFAULT_SCHEMA}'))
+
+    # транзакциями управляет alembic: миграциям с CREATE INDEX CONCURRENTLY нужен autocommit_block
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
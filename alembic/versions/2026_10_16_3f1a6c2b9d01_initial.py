@@ -0,0 +1,97 @@
+"""initial
+
+Revision ID: 3f1a6c2b9d01
+Revises:
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = '3f1a6c2b9d01'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'sirius'
+
+personal_general_enum = postgresql.ENUM(
+    'personal', 'general', name='personal_general_enum', schema=SCHEMA, create_type=False
+)
+like_dislike_enum = postgresql.ENUM('like', 'dislike', name='like_dislike_enum', schema=SCHEMA, create_type=False)
+
+
+def upgrade() -> None:
+    # базы, созданные раньше через metadata.create_all, уже содержат эти таблицы - создаем только недостающее
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    personal_general_enum.create(bind, checkfirst=True)
+    like_dislike_enum.create(bind, checkfirst=True)
+
+    if not inspector.has_table('users', schema=SCHEMA):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.BigInteger(), nullable=False),
+            sa.Column('tg', sa.String(), nullable=False),
+            sa.Column('code', sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_users')),
+            sa.UniqueConstraint('username', name=op.f('uq_users_username')),
+            schema=SCHEMA,
+        )
+        op.create_index(op.f('ix_sirius_users_id'), 'users', ['id'], unique=False, schema=SCHEMA)
+
+    if not inspector.has_table('memes', schema=SCHEMA):
+        op.create_table(
+            'memes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('photo_url', sa.String(length=200), nullable=False),
+            sa.Column('text', sa.Text(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id'], name=op.f('fk_memes_user_id_users')),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_memes')),
+            schema=SCHEMA,
+        )
+
+    if not inspector.has_table('mem_carts', schema=SCHEMA):
+        op.create_table(
+            'mem_carts',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('mem_id', sa.Integer(), nullable=False),
+            sa.Column('cart_type', personal_general_enum, nullable=False),
+            sa.ForeignKeyConstraint(['mem_id'], [f'{SCHEMA}.memes.id'], name=op.f('fk_mem_carts_mem_id_memes')),
+            sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id'], name=op.f('fk_mem_carts_user_id_users')),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_mem_carts')),
+            sa.UniqueConstraint('user_id', 'mem_id', 'cart_type', name='user_mem_unique_cart'),
+            schema=SCHEMA,
+        )
+        op.create_index(op.f('ix_sirius_mem_carts_id'), 'mem_carts', ['id'], unique=False, schema=SCHEMA)
+
+    if not inspector.has_table('mem_ratings', schema=SCHEMA):
+        op.create_table(
+            'mem_ratings',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('mem_id', sa.Integer(), nullable=False),
+            sa.Column('rating', like_dislike_enum, nullable=False),
+            sa.ForeignKeyConstraint(['mem_id'], [f'{SCHEMA}.memes.id'], name=op.f('fk_mem_ratings_mem_id_memes')),
+            sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id'], name=op.f('fk_mem_ratings_user_id_users')),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_mem_ratings')),
+            sa.UniqueConstraint('user_id', 'mem_id', name='user_mem_unique_rating'),
+            schema=SCHEMA,
+        )
+        op.create_index(op.f('ix_sirius_mem_ratings_id'), 'mem_ratings', ['id'], unique=False, schema=SCHEMA)
+
+
+def downgrade() -> None:
+    op.drop_table('mem_ratings', schema=SCHEMA)
+    op.drop_table('mem_carts', schema=SCHEMA)
+    op.drop_table('memes', schema=SCHEMA)
+    op.drop_table('users', schema=SCHEMA)
+    like_dislike_enum.drop(op.get_bind(), checkfirst=True)
+    personal_general_enum.drop(op.get_bind(), checkfirst=True)
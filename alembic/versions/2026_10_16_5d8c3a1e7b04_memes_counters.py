@@ -0,0 +1,49 @@
+"""memes like/dislike counters
+
+Revision ID: 5d8c3a1e7b04
+Revises: 3f1a6c2b9d01
+Create Date: 2026-10-16 10:02:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '5d8c3a1e7b04'
+down_revision: Union[str, None] = '3f1a6c2b9d01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'sirius'
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    memes_columns = {column['name'] for column in inspector.get_columns('memes', schema=SCHEMA)}
+
+    if 'likes' in memes_columns:
+        return
+
+    op.add_column('memes', sa.Column('likes', sa.Integer(), server_default='0', nullable=False), schema=SCHEMA)
+    op.add_column('memes', sa.Column('dislikes', sa.Integer(), server_default='0', nullable=False), schema=SCHEMA)
+    # счетчики заполняются по уже накопленным оценкам
+    op.execute(
+        f'''
+        UPDATE {SCHEMA}.memes AS m
+        SET likes = r.likes, dislikes = r.dislikes
+        FROM (
+            SELECT mem_id,
+                   count(*) FILTER (WHERE rating = 'like') AS likes,
+                   count(*) FILTER (WHERE rating = 'dislike') AS dislikes
+            FROM {SCHEMA}.mem_ratings
+            GROUP BY mem_id
+        ) AS r
+        WHERE r.mem_id = m.id
+        '''
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('memes', 'dislikes', schema=SCHEMA)
+    op.drop_column('memes', 'likes', schema=SCHEMA)
@@ -0,0 +1,67 @@
+"""memes phash and events outbox
+
+Revision ID: 7b2e4d8a1c02
+Revises: 5d8c3a1e7b04
+Create Date: 2026-10-16 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = '7b2e4d8a1c02'
+down_revision: Union[str, None] = '5d8c3a1e7b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'sirius'
+PHASH_BANDS = 4
+PHASH_BAND_BITS = 16
+
+mem_event_enum = postgresql.ENUM(
+    'created', 'rated', 'added_to_cart', name='mem_event_enum', schema=SCHEMA, create_type=False
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    memes_columns = {column['name'] for column in inspector.get_columns('memes', schema=SCHEMA)}
+
+    if 'phash' not in memes_columns:
+        op.add_column('memes', sa.Column('phash', sa.BigInteger(), nullable=True), schema=SCHEMA)
+
+    op.execute(f'CREATE INDEX IF NOT EXISTS ix_sirius_memes_likes ON {SCHEMA}.memes (likes)')
+    op.execute(f'CREATE INDEX IF NOT EXISTS ix_sirius_memes_photo_url ON {SCHEMA}.memes (photo_url)')
+    mask = (1 << PHASH_BAND_BITS) - 1
+    for band in range(PHASH_BANDS):
+        op.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_sirius_memes_phash_band_{band} '
+            f'ON {SCHEMA}.memes (((phash >> {band * PHASH_BAND_BITS}) & {mask}))'
+        )
+
+    mem_event_enum.create(bind, checkfirst=True)
+    if not inspector.has_table('mem_events', schema=SCHEMA):
+        op.create_table(
+            'mem_events',
+            sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+            sa.Column('mem_id', sa.Integer(), nullable=False),
+            sa.Column('event_type', mem_event_enum, nullable=False),
+            sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_mem_events')),
+            schema=SCHEMA,
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('mem_events', schema=SCHEMA)
+    mem_event_enum.drop(op.get_bind(), checkfirst=True)
+
+    for band in range(PHASH_BANDS):
+        op.drop_index(f'ix_sirius_memes_phash_band_{band}', table_name='memes', schema=SCHEMA)
+    op.drop_index('ix_sirius_memes_photo_url', table_name='memes', schema=SCHEMA)
+    op.drop_index('ix_sirius_memes_likes', table_name='memes', schema=SCHEMA)
+    op.drop_column('memes', 'phash', schema=SCHEMA)
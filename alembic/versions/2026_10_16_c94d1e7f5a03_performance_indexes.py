@@ -0,0 +1,38 @@
+"""performance indexes for ratings and carts
+
+Revision ID: c94d1e7f5a03
+Revises: 7b2e4d8a1c02
+Create Date: 2026-10-16 10:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'c94d1e7f5a03'
+down_revision: Union[str, None] = '7b2e4d8a1c02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'sirius'
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        # подсчет и пересборка счетчиков по мему читают только индекс, не обращаясь к таблице
+        op.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sirius_mem_ratings_mem_id '
+            f'ON {SCHEMA}.mem_ratings (mem_id) INCLUDE (rating, id)'
+        )
+        # общая корзина и лента по типу корзины без скана всей mem_carts
+        op.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sirius_mem_carts_cart_type_mem_id '
+            f'ON {SCHEMA}.mem_carts (cart_type, mem_id)'
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.ix_sirius_mem_carts_cart_type_mem_id')
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {SCHEMA}.ix_sirius_mem_ratings_mem_id')
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal
 
 from pydantic_settings import BaseSettings
 
@@ -13,15 +13,59 @@ class Settings(BaseSettings):
     DB_USERNAME: str = 'postgres'
     DB_PASSWORD: str = 'postgres'
     DB_NAME: str = 'main_db'
+    # direct - прямое подключение с кэшем подготовленных запросов,
+    # pgbouncer - без кэша и с уникальными именами запросов для pgbouncer в режиме transaction
+    DB_CONNECTION_MODE: Literal['direct', 'pgbouncer'] = 'direct'
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = False
+    # общий лимит соединений на все воркеры, 0 - у каждого воркера свой пул DB_POOL_SIZE + DB_MAX_OVERFLOW
+    DB_POOL_BUDGET: int = 0
+
+    # реплики для читающих запросов, пустой список - все запросы идут в основную базу
+    DB_REPLICA_URLS: List[str] = []
+    DB_REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
+    DB_REPLICA_HEALTH_CHECK_TIMEOUT: float = 1.0
+    # сколько секунд после своей записи пользователь читает из основной базы
+    DB_READ_YOUR_WRITES_WINDOW: float = 5.0
+
+    WEB_WORKERS: int = 1
 
     JWT_SECRET_SALT: str
+    JWT_TOKEN_TTL: int = 6 * 24 * 60 * 60
+    JWT_CACHE_ENABLED: bool = True
+    JWT_CACHE_MAX_SIZE: int = 10000
+    JWT_REVOCATION_SYNC_INTERVAL: float = 1.0
 
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_PASSWORD: str
     REDIS_SIRIUS_CACHE_PREFIX: str = 'sirius'
+    # общий лимит соединений с Redis на все воркеры, 0 - без ограничения
+    REDIS_POOL_BUDGET: int = 0
+    # секунды ожидания свободного соединения из пула
+    REDIS_POOL_TIMEOUT: int = 5
 
     RABBIT_SIRIUS_USER_PREFIX: str = 'user_memes'
+    # ограничения личной очереди: старые мемы неактивного пользователя вытесняются новыми и истекают
+    RABBIT_USER_QUEUE_MAX_LENGTH: int = 1000
+    RABBIT_USER_QUEUE_MESSAGE_TTL_MS: int = 7 * 24 * 3600 * 1000
+
+    KAFKA_BOOTSTRAP_SERVERS: List[str]
+    KAFKA_TOPIC: str
+    KAFKA_RESIZE_GROUP_ID: str = 'resize_worker'
+    KAFKA_MEM_EVENTS_TOPIC: str = 'mem_events'
+    KAFKA_LINGER_MS: int = 20
+    KAFKA_MAX_BATCH_SIZE: int = 64 * 1024
+    KAFKA_COMPRESSION_TYPE: str | None = 'gzip'
+
+    OUTBOX_PUBLISH_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_MS: int = 200
 
     LOG_LEVEL: str = 'debug'
 
@@ -31,6 +75,65 @@ class Settings(BaseSettings):
     MINIO_PORT: str
 
     BUCKET_NAME: str = 'memes-storage'
+    MINIO_PART_SIZE: int = 5 * 1024 * 1024
+    MEM_UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024
+    MEM_UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    MEM_UPLOAD_MULTIPART_OVERHEAD: int = 64 * 1024
+    MEM_PHASH_ENABLED: bool = False
+    MEM_PHASH_MAX_DISTANCE: int = 3
+    MEM_PHASH_MAX_CANDIDATES: int = 100
+    MEM_DOWNLOAD_CHUNK_SIZE: int = 64 * 1024
+    MEM_DOWNLOAD_MODE: Literal['stream', 'redirect', 'accel'] = 'stream'
+    MEM_DOWNLOAD_URL_TTL: int = 600
+    MEM_DOWNLOAD_ACCEL_LOCATION: str = '/minio-internal'
+    MINIO_PUBLIC_URL: str | None = None
+    # соединения с MinIO на воркер для потоковых скачиваний
+    MINIO_HTTP_CONNECTIONS: int = 100
+
+    RESIZE_MAX_SIDE: int = 2048
+    # размеры уменьшенных копий мемов для /mem/download, "ширинаxвысота"
+    RESIZE_ALLOWED_SIZES: List[str] = ['160x160', '320x320', '640x640', '1280x1280']
+    RESIZE_STATUS_TTL: int = 7 * 24 * 3600
+    # копия, которая дольше этого остается в очереди (задача потерялась), ставится в очередь повторно
+    RESIZE_REQUEUE_AFTER: int = 10 * 60
+    RESIZE_JPEG_QUALITY: int = 85
+    RESIZE_WORKERS: int = 0
+
+    MEM_CACHE_TTL: int = 3600
+    CACHE_STALE_TTL: int = 300
+    CACHE_TTL_JITTER: float = 0.1
+    CACHE_LOCK_ENABLED: bool = True
+    CACHE_LOCK_TTL: float = 5.0
+    CACHE_LOCK_WAIT: float = 1.0
+    CACHE_LOCK_POLL_INTERVAL: float = 0.05
+    LOCAL_CACHE_ENABLED: bool = True
+    LOCAL_CACHE_MAX_SIZE: int = 10000
+    LOCAL_CACHE_TTL: float = 5.0
+
+    MEM_PAGE_LIMIT: int = 50
+    MEM_PAGE_LIMIT_MAX: int = 500
+    MEM_STREAM_YIELD_PER: int = 1000
+
+    MEM_BATCH_LIMIT_MAX: int = 100
+
+    VOTES_WRITE_BEHIND: bool = False
+    VOTES_FLUSH_INTERVAL_MS: int = 200
+    VOTES_FLUSH_BATCH_SIZE: int = 5000
+    VOTES_FLUSH_LOCK_TTL: float = 30.0
+    VOTES_STATE_TTL: int = 24 * 3600
+
+    TOP_MEMES_LIMIT_MAX: int = 100
+    TRENDY_MEMES_REBUILD_LOCK_TTL: int = 60
+
+    RANDOM_MEMES_COUNT_MAX: int = 50
+    RANDOM_MEMES_REBUILD_LOCK_TTL: int = 60
+    RANDOM_MEMES_SKIP_SEEN: bool = True
+    RANDOM_MEMES_SEEN_TTL: int = 7 * 24 * 3600
+    RANDOM_MEMES_SEEN_RESET_RATIO: float = 0.9
+    RANDOM_MEMES_SAMPLE_ATTEMPTS: int = 3
+
+    MEM_FEED_COUNT: int = 10
+    MEM_FEED_COUNT_MAX: int = 50
 
 
 settings = Settings()
@@ -0,0 +1,44 @@
+import gc
+import os
+import shutil
+import multiprocessing
+from typing import Any
+
+# число воркеров по числу ядер, если не задано явно
+workers = int(os.environ.get('WEB_WORKERS') or 0) or multiprocessing.cpu_count()
+# пулы соединений делят бюджет между воркерами, поэтому число воркеров нужно приложению до его загрузки
+os.environ['WEB_WORKERS'] = str(workers)
+
+# метрики воркеров пишутся в общий каталог; его нужно выставить и очистить до импорта prometheus_client
+prometheus_multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir)
+
+bind = f"{os.environ.get('BIND_IP', '0.0.0.0')}:{os.environ.get('BIND_PORT', '8000')}"
+wsgi_app = 'webapp.main:create_app()'
+worker_class = 'webapp.worker.web.UvicornWorker'
+# приложение импортируется один раз в мастере, воркеры получают его страницы через fork
+preload_app = True
+graceful_timeout = 30
+keepalive = 5
+
+
+def pre_fork(server: Any, worker: Any) -> None:
+    # объекты мастера уходят в постоянное поколение: сборщик мусора воркера их не обходит
+    # и не пишет в их страницы, поэтому они остаются общими после fork
+    gc.freeze()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    from webapp.db.postgres import engine, replica_engines
+
+    # соединения мастера, в том числе к репликам, не должны использоваться воркерами
+    for worker_engine in [engine, *replica_engines]:
+        worker_engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    from prometheus_client import multiprocess
+
+    # гейджи умершего воркера в режимах live* перестают учитываться
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,43 @@
+import timeit
+import argparse
+from typing import Callable
+
+from jose import jwt
+
+from webapp.models.sirius.user import User
+from webapp.utils.auth import jwt as jwt_module
+from webapp.utils.auth.jwt import jwt_auth
+
+parser = argparse.ArgumentParser(description='Стоимость проверки JWT на один запрос: без кэша и с кэшем')
+
+parser.add_argument('--iterations', type=int, default=20000, help='Количество проверок в одном замере')
+parser.add_argument('--repeat', type=int, default=5, help='Количество замеров, берется лучший')
+
+args = parser.parse_args()
+
+
+def measure(name: str, func: Callable[[], object], iterations: int, repeat: int) -> float:
+    best = min(timeit.repeat(func, number=iterations, repeat=repeat)) / iterations
+    print(f'{name:<24} {best * 1e6:8.2f} us/request')
+    return best
+
+
+def main(iterations: int, repeat: int) -> None:
+    token = jwt_auth.create_token(User(id=1))
+
+    before = measure('jose decode (before)', lambda: jwt.decode(token, jwt_auth.secret), iterations, repeat)
+
+    token_cache, jwt_module.token_cache = jwt_module.token_cache, None
+    measure('check_token, no cache', lambda: jwt_auth.check_token(token), iterations, repeat)
+    jwt_module.token_cache = token_cache
+
+    if token_cache is None:
+        print('JWT_CACHE_ENABLED=false, cached path is not measured')
+        return
+
+    after = measure('check_token, cached', lambda: jwt_auth.check_token(token), iterations, repeat)
+    print(f'speedup x{before / after:.1f}')
+
+
+if __name__ == '__main__':
+    main(args.iterations, args.repeat)
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from miniopy_async.error import S3Error
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from conf.config import settings
+from webapp.db.minio import async_minio_client
+from webapp.db.postgres import engine
+from webapp.models.sirius.mem import Mem
+
+parser = argparse.ArgumentParser(description='Удаление картинок из MinIO, на которые не ссылается ни один мем')
+
+parser.add_argument('--grace-hours', type=int, default=24, help='Не трогать объекты моложе стольких часов')
+parser.add_argument('--batch-size', type=int, default=1000, help='Количество объектов в одной проверке по memes')
+parser.add_argument('--dry-run', action='store_true', help='Только вывести, что будет удалено')
+
+args = parser.parse_args()
+
+
+async def is_recently_used(object_name: str, deadline: datetime) -> bool:
+    try:
+        stat = await async_minio_client.stat_object(settings.BUCKET_NAME, object_name)
+    except S3Error as e:
+        # объект уже удален - удалять нечего
+        if e.code == 'NoSuchKey':
+            return True
+        raise
+    return stat.last_modified >= deadline
+
+
+async def main(grace_hours: int, batch_size: int, dry_run: bool) -> None:
+    # число ссылок на объект - число мемов с таким photo_url; свежие объекты пропускаем, их мем может быть еще не записан
+    deadline = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    objects = await async_minio_client.list_objects(settings.BUCKET_NAME, prefix='blobs/', recursive=True)
+    candidates = [obj.object_name for obj in objects if obj.last_modified < deadline]
+
+    removed = 0
+    paths_param = bindparam('paths', type_=ARRAY(String))
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start : start + batch_size]
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(Mem.photo_url).where(Mem.photo_url == any_(paths_param)).distinct(), {'paths': batch}
+            )
+            referenced = set(result.scalars())
+
+        for object_name in batch:
+            if object_name in referenced:
+                continue
+            # список объектов мог устареть: повторная загрузка той же картинки обновляет last_modified
+            if await is_recently_used(object_name, deadline):
+                continue
+            if not dry_run:
+                await async_minio_client.remove_object(settings.BUCKET_NAME, object_name)
+            removed += 1
+            logging.info('Removed unreferenced %s', object_name)
+
+    logging.info('Removed %s of %s checked objects', removed, len(candidates))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.grace_hours, args.batch_size, args.dry_run))
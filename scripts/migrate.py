@@ -1,19 +1,15 @@
-import asyncio
-import logging
+from pathlib import Path
 
-from sqlalchemy.exc import IntegrityError
+from alembic import command
+from alembic.config import Config
 
-from webapp.db.postgres import engine
-from webapp.models import meta
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / 'alembic.ini'
 
 
-async def main() -> None:
-    try:
-        async with engine.begin() as conn:
-            await conn.run_sync(meta.metadata.create_all)
-    except IntegrityError:
-        logging.exception('Already exists')
+def main() -> None:
+    # базы, созданные раньше через create_all, подхватываются первой ревизией: она создает только недостающее
+    command.upgrade(Config(str(ALEMBIC_INI)), 'head')
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    main()
@@ -0,0 +1,39 @@
+import json
+import shlex
+import argparse
+import subprocess
+
+from webapp.cache.rabbit.queue import USER_QUEUE_POLICY_NAME, get_user_queue_policy
+
+parser = argparse.ArgumentParser(description='Ограничение личных очередей пользователей политикой RabbitMQ')
+
+parser.add_argument(
+    '--rabbitmqctl',
+    default='rabbitmqctl',
+    help='Команда rabbitmqctl, например "docker compose exec rabbitmq rabbitmqctl"',
+)
+parser.add_argument('--dry-run', action='store_true', help='Только вывести команду')
+
+args = parser.parse_args()
+
+
+def main(rabbitmqctl: str, dry_run: bool) -> None:
+    # политика применяется и к уже объявленным очередям, и к новым; повторный запуск обновляет ее значения
+    policy = get_user_queue_policy()
+    command = [
+        *shlex.split(rabbitmqctl),
+        'set_policy',
+        USER_QUEUE_POLICY_NAME,
+        policy['pattern'],
+        json.dumps(policy['definition']),
+        '--apply-to',
+        policy['apply-to'],
+    ]
+
+    print(shlex.join(command))
+    if not dry_run:
+        subprocess.run(command, check=True)
+
+
+if __name__ == '__main__':
+    main(args.rabbitmqctl, args.dry_run)
@@ -0,0 +1,18 @@
+import asyncio
+import logging
+
+from webapp.crud.mem import rebuild_trendy_memes
+from webapp.db.postgres import async_session
+from webapp.on_startup.redis import start_redis
+
+
+async def main() -> None:
+    await start_redis()
+
+    async with async_session() as session:
+        if not await rebuild_trendy_memes(session):
+            logging.error('Leaderboard is already being rebuilt')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
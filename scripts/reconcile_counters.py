@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import argparse
+
+from sqlalchemy import func, or_, select, update
+
+from webapp.db.postgres import engine
+from webapp.models.sirius.mem import Mem
+from webapp.models.sirius.mem_rating import LikeDislikeEnum, MemRating
+
+parser = argparse.ArgumentParser(description='Пересчет счетчиков likes/dislikes в memes по таблице mem_ratings')
+
+parser.add_argument('--batch-size', type=int, default=10000, help='Количество мемов в одной транзакции')
+
+args = parser.parse_args()
+
+
+async def main(batch_size: int) -> None:
+    async with engine.connect() as conn:
+        max_id = (await conn.execute(select(func.max(Mem.id)))).scalar() or 0
+
+    fixed = 0
+    # пересчет идет диапазонами id, чтобы не держать блокировки на всей таблице сразу
+    for start in range(0, max_id, batch_size):
+        counts = (
+            select(
+                Mem.id.label('mem_id'),
+                func.count(MemRating.id).filter(MemRating.rating == LikeDislikeEnum.like).label('likes'),
+                func.count(MemRating.id).filter(MemRating.rating == LikeDislikeEnum.dislike).label('dislikes'),
+            )
+            .outerjoin(MemRating, MemRating.mem_id == Mem.id)
+            .where(Mem.id > start, Mem.id <= start + batch_size)
+            .group_by(Mem.id)
+            .subquery()
+        )
+        stmt = (
+            update(Mem)
+            .where(Mem.id == counts.c.mem_id)
+            .where(or_(Mem.likes != counts.c.likes, Mem.dislikes != counts.c.dislikes))
+            .values(likes=counts.c.likes, dislikes=counts.c.dislikes)
+        )
+
+        async with engine.begin() as conn:
+            # блокируем строки диапазона: голоса, которые еще не зафиксированы, дождутся пересчета
+            # и применят свою дельту поверх, поэтому счетчики остаются точными без остановки записи
+            await conn.execute(
+                select(Mem.id).where(Mem.id > start, Mem.id <= start + batch_size).order_by(Mem.id).with_for_update()
+            )
+            result = await conn.execute(stmt)
+            fixed += result.rowcount
+
+    logging.info('Counters reconciled, fixed %s memes', fixed)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size))
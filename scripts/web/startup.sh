@@ -7,5 +7,6 @@ python scripts/migrate.py
 
 # load fixtures
 # python scripts/load_data.py fixture/sirius/sirius.users.json fixture/sirius/sirius.memes.json fixture/sirius/sirius.memes_carts.json fixture/sirius/sirius.memes_ratings.json
+# python scripts/reconcile_counters.py
 
-exec uvicorn webapp.main:create_app --host=$BIND_IP --port=$BIND_PORT
\ No newline at end of file
+exec gunicorn -c conf/gunicorn.conf.py
\ No newline at end of file
@@ -1,7 +1,7 @@
 import json
 import uuid
 from pathlib import Path
-from typing import AsyncGenerator, List
+from typing import Any, AsyncGenerator, Dict, List
 
 import pytest
 from fastapi import FastAPI
@@ -14,8 +14,10 @@ from tests.mocking.kafka import TestKafkaProducer
 from tests.my_types import FixtureFunctionT
 
 from webapp.db import kafka
+from webapp.db.minio import async_minio_client
 from webapp.db.postgres import engine, get_session
 from webapp.models.meta import metadata
+from webapp.utils.upload import ImageUpload
 
 
 @pytest.fixture()
@@ -66,6 +68,19 @@ def kafka_received_messages() -> List:
     return []
 
 
+@pytest.fixture()
+def _mock_minio(monkeypatch: pytest.MonkeyPatch, minio_put_objects: Dict[str, bytes]) -> FixtureFunctionT:
+    async def put_object(bucket_name: str, object_name: str, data: ImageUpload, length: int, **kwargs: Any) -> None:
+        minio_put_objects[object_name] = await data.read(length)
+
+    monkeypatch.setattr(async_minio_client, 'put_object', put_object)
+
+
+@pytest.fixture()
+def minio_put_objects() -> Dict[str, bytes]:
+    return {}
+
+
 @pytest.fixture()
 async def access_token(
     client: AsyncClient,
@@ -11,10 +11,11 @@ MOCKED_HEX = 'mocked_hex'
 with open(BASE_DIR / 'test_file', 'rb') as file:
     image = file.read()
 
+UPLOAD_PATH = f'resized/{MOCKED_HEX}/upload'
 
 value = msgpack.packb(
     {
-        'image': image,
+        'upload_path': UPLOAD_PATH,
         'mem_id': MOCKED_HEX,
         'width': WIDTH,
         'height': HEIGHT,
@@ -1,52 +1,88 @@
-from typing import List
+from typing import Any, Dict, List
 
 import pytest
 from httpx import AsyncClient
+from starlette import status
 
-from tests.api.file.const import BASE_DIR, HEIGHT, MOCKED_HEX, WIDTH, value
+from tests.api.file.const import BASE_DIR, HEIGHT, MOCKED_HEX, UPLOAD_PATH, WIDTH, image, value
 from tests.const import URLS
 
+from webapp.crud.resize import set_resize_status
+from webapp.schema.file.resize import ResizeStatusEnum
+
 FIXTURES_PATH = BASE_DIR / 'fixtures'
 
+FIXTURES = [
+    FIXTURES_PATH / 'sirius.users.json',
+]
+
 
 @pytest.mark.parametrize(
-    ('username', 'password', 'fixtures', 'mocked_hex', 'width', 'height', 'kafka_expected_messages'),
+    ('user_id', 'fixtures', 'mocked_hex', 'width', 'height', 'kafka_expected_messages'),
     [
         (
-            'test',
-            'qwerty',
-            [
-                FIXTURES_PATH / 'sirius.user.json',
-            ],
+            1,
+            FIXTURES,
             MOCKED_HEX,
             WIDTH,
             HEIGHT,
-            [{'partition': 1, 'topic': 'test_resize_image', 'value': value}],
+            [{'partition': 1, 'topic': 'test_resize_image', 'key': None, 'value': value}],
         ),
     ],
 )
 @pytest.mark.asyncio()
-@pytest.mark.usefixtures('_common_api_with_kafka_fixture')
+@pytest.mark.usefixtures('_common_api_with_kafka_fixture', '_mock_minio', 'fake_redis')
 async def test_resize(
     client: AsyncClient,
-    username: str,
-    password: str,
     width: int,
     height: int,
     access_token: str,
-    kafka_received_messages: List,
-    kafka_expected_messages: List,
+    kafka_received_messages: List[Dict[str, Any]],
+    kafka_expected_messages: List[Dict[str, Any]],
+    minio_put_objects: Dict[str, bytes],
 ) -> None:
+    headers = {'Authorization': f'Bearer {access_token}'}
+    params = {'width': width, 'height': height}
+
     with open(BASE_DIR / 'test_file', 'rb') as file:
-        response = await client.post(
-            URLS['file']['resize'],
-            files={'image': file},
-            params={
-                'width': width,
-                'height': height,
-            },
-            headers={'Authorization': f'Bearer {access_token}'},
-        )
-
-    assert response.status_code == 200
+        response = await client.post(URLS['file']['resize'], files={'image': file}, params=params, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'status': 'queued', 'mem_id': MOCKED_HEX}
     assert kafka_received_messages == kafka_expected_messages
+    assert minio_put_objects == {UPLOAD_PATH: image}
+
+    # пока воркер не закончил, задача отличается от неизвестной
+    status_url = URLS['file']['resize_status'].format(mem_id=MOCKED_HEX)
+    response = await client.get(status_url, params=params, headers=headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json() == {'status': 'queued', 'mem_id': MOCKED_HEX}
+
+    await set_resize_status(MOCKED_HEX, width, height, ResizeStatusEnum.done)
+    response = await client.get(status_url, params=params, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'status': 'done', 'mem_id': MOCKED_HEX}
+
+    response = await client.get(URLS['file']['resize_status'].format(mem_id='unknown'), params=params, headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize(('user_id', 'fixtures', 'mocked_hex'), [(1, FIXTURES, MOCKED_HEX)])
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_with_kafka_fixture', '_mock_minio', 'fake_redis')
+async def test_resize_not_image(
+    client: AsyncClient,
+    access_token: str,
+    kafka_received_messages: List[Dict[str, Any]],
+    minio_put_objects: Dict[str, bytes],
+) -> None:
+    response = await client.post(
+        URLS['file']['resize'],
+        files={'image': ('mem.png', b'qwertyqwerty')},
+        params={'width': WIDTH, 'height': HEIGHT},
+        headers={'Authorization': f'Bearer {access_token}'},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert kafka_received_messages == []
+    assert minio_put_objects == {}
@@ -0,0 +1,9 @@
+import pytest
+
+from webapp.models.sirius.user import User
+from webapp.utils.auth.jwt import jwt_auth
+
+
+@pytest.fixture()
+def access_token(user_id: int) -> str:
+    return jwt_auth.create_token(User(id=user_id))
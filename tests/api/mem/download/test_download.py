@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+from httpx import AsyncClient
+from starlette import status
+
+from tests.const import URLS
+
+from webapp.crud.mem import mem_download_cache
+from webapp.db import minio
+from webapp.db.minio import async_minio_client
+
+BASE_DIR = Path(__file__).parent
+FIXTURES_PATH = BASE_DIR / 'fixtures'
+
+FIXTURES = [
+    FIXTURES_PATH / 'sirius.users.json',
+    FIXTURES_PATH / 'sirius.memes.json',
+]
+
+CONTENT = bytes(range(100))
+ETAG = 'abc'
+LAST_MODIFIED = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+class ObjectResponse:
+    def __init__(self, data: bytes) -> None:
+        self.content = self
+        self.data = data
+
+    async def iter_chunked(self, chunk_size: int) -> AsyncIterator[bytes]:
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start : start + chunk_size]
+
+    def release(self) -> None:
+        return
+
+
+@pytest.fixture()
+def _mock_minio_object(monkeypatch: pytest.MonkeyPatch, fake_redis: FakeRedis) -> None:
+    async def stat_object(bucket_name: str, object_name: str) -> SimpleNamespace:
+        return SimpleNamespace(etag=ETAG, size=len(CONTENT), last_modified=LAST_MODIFIED)
+
+    async def get_object(
+        bucket_name: str, object_name: str, session: Any, offset: int = 0, length: int = 0
+    ) -> ObjectResponse:
+        return ObjectResponse(CONTENT[offset : offset + length] if length else CONTENT[offset:])
+
+    monkeypatch.setattr(async_minio_client, 'stat_object', stat_object)
+    monkeypatch.setattr(async_minio_client, 'get_object', get_object)
+    monkeypatch.setattr(minio, 'get_http_session', lambda: None)
+    monkeypatch.setattr(mem_download_cache, 'local', None)
+
+
+@pytest.mark.parametrize(
+    ('headers', 'expected_status', 'expected_body', 'expected_content_range', 'fixtures'),
+    [
+        ({}, status.HTTP_200_OK, CONTENT, None, FIXTURES),
+        ({'Range': 'bytes=10-19'}, status.HTTP_206_PARTIAL_CONTENT, CONTENT[10:20], 'bytes 10-19/100', FIXTURES),
+        ({'Range': 'bytes=-5'}, status.HTTP_206_PARTIAL_CONTENT, CONTENT[95:], 'bytes 95-99/100', FIXTURES),
+        ({'Range': 'bytes=90-'}, status.HTTP_206_PARTIAL_CONTENT, CONTENT[90:], 'bytes 90-99/100', FIXTURES),
+        (
+            {'Range': 'bytes=10-19', 'If-Range': f'"{ETAG}"'},
+            status.HTTP_206_PARTIAL_CONTENT,
+            CONTENT[10:20],
+            'bytes 10-19/100',
+            FIXTURES,
+        ),
+        # файл изменился - отдается целиком
+        ({'Range': 'bytes=10-19', 'If-Range': '"stale"'}, status.HTTP_200_OK, CONTENT, None, FIXTURES),
+        ({'Range': 'bytes=0-9,20-29'}, status.HTTP_200_OK, CONTENT, None, FIXTURES),
+    ],
+)
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_fixture', '_mock_minio_object')
+async def test_download(
+    client: AsyncClient,
+    headers: Dict[str, str],
+    expected_status: int,
+    expected_body: bytes,
+    expected_content_range: str | None,
+) -> None:
+    response = await client.get(URLS['mem']['download'].format(mem_id=1), headers=headers)
+
+    assert response.status_code == expected_status
+    assert response.content == expected_body
+    assert response.headers['Content-Length'] == str(len(expected_body))
+    assert response.headers.get('Content-Range') == expected_content_range
+    assert response.headers['ETag'] == f'"{ETAG}"'
+
+
+@pytest.mark.parametrize('fixtures', [FIXTURES])
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_fixture', '_mock_minio_object')
+async def test_download_range_not_satisfiable(client: AsyncClient) -> None:
+    response = await client.get(URLS['mem']['download'].format(mem_id=1), headers={'Range': 'bytes=100-'})
+
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers['Content-Range'] == 'bytes */100'
@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+import orjson
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from tests.const import URLS
+
+BASE_DIR = Path(__file__).parent
+FIXTURES_PATH = BASE_DIR / 'fixtures'
+
+FIXTURES = [
+    FIXTURES_PATH / 'sirius.users.json',
+    FIXTURES_PATH / 'sirius.memes.json',
+    FIXTURES_PATH / 'sirius.mem_carts.json',
+]
+
+
+@pytest.mark.parametrize(
+    ('user_id', 'params', 'expected_ids', 'expected_next_after', 'fixtures'),
+    [
+        (1, {'cart_type': 'general', 'limit': 2}, [1, 2], 2, FIXTURES),
+        (1, {'cart_type': 'general', 'limit': 2, 'after': 2}, [3], None, FIXTURES),
+        (1, {'cart_type': 'general', 'limit': 2, 'after': 3}, [], None, FIXTURES),
+    ],
+)
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_fixture')
+async def test_list_page(
+    client: AsyncClient,
+    access_token: str,
+    params: Dict[str, Any],
+    expected_ids: List[int],
+    expected_next_after: int | None,
+) -> None:
+    response = await client.get(URLS['mem']['list'], params=params, headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [mem['id'] for mem in response.json()['items']] == expected_ids
+    assert response.json()['next_after'] == expected_next_after
+
+
+@pytest.mark.parametrize(
+    ('user_id', 'params', 'expected_ids', 'fixtures'),
+    [
+        (1, {'cart_type': 'general', 'stream': True}, [1, 2, 3], FIXTURES),
+        (1, {'cart_type': 'general', 'stream': True, 'after': 1}, [2, 3], FIXTURES),
+    ],
+)
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_fixture')
+async def test_list_stream(
+    client: AsyncClient,
+    access_token: str,
+    params: Dict[str, Any],
+    expected_ids: List[int],
+) -> None:
+    response = await client.get(URLS['mem']['list'], params=params, headers={'Authorization': f'Bearer {access_token}'})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [orjson.loads(line)['id'] for line in response.text.splitlines()] == expected_ids
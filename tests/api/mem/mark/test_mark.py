@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Dict
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from tests.const import URLS
+
+from webapp.models.sirius.mem import Mem
+from webapp.models.sirius.mem_event import MemEvent
+from webapp.models.sirius.mem_rating import LikeDislikeEnum, MemRating
+
+BASE_DIR = Path(__file__).parent
+FIXTURES_PATH = BASE_DIR / 'fixtures'
+
+# у мема 1 уже есть лайк пользователя 1
+FIXTURES = [
+    FIXTURES_PATH / 'sirius.users.json',
+    FIXTURES_PATH / 'sirius.memes.json',
+    FIXTURES_PATH / 'sirius.mem_ratings.json',
+]
+
+
+@pytest.mark.parametrize(
+    ('user_id', 'mark', 'expected_counters', 'expected_ratings', 'fixtures'),
+    [
+        # повторный лайк снимает оценку
+        (1, 'like', {'likes': 0, 'dislikes': 0}, {}, FIXTURES),
+        # дизлайк заменяет лайк
+        (1, 'dislike', {'likes': 0, 'dislikes': 1}, {1: LikeDislikeEnum.dislike}, FIXTURES),
+        # новая оценка
+        (2, 'like', {'likes': 2, 'dislikes': 0}, {1: LikeDislikeEnum.like, 2: LikeDislikeEnum.like}, FIXTURES),
+        (2, 'dislike', {'likes': 1, 'dislikes': 1}, {1: LikeDislikeEnum.like, 2: LikeDislikeEnum.dislike}, FIXTURES),
+    ],
+)
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_fixture', 'fake_redis')
+async def test_mark(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    access_token: str,
+    mark: str,
+    expected_counters: Dict[str, int],
+    expected_ratings: Dict[int, LikeDislikeEnum],
+) -> None:
+    response = await client.get(
+        URLS['mem']['mark'].format(mem_id=1),
+        params={'mark': mark},
+        headers={'Authorization': f'Bearer {access_token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {key: response.json()[key] for key in expected_counters} == expected_counters
+
+    mem = (await db_session.execute(select(Mem.likes, Mem.dislikes).where(Mem.id == 1))).one()
+    assert {'likes': mem.likes, 'dislikes': mem.dislikes} == expected_counters
+
+    ratings = await db_session.execute(select(MemRating.user_id, MemRating.rating).where(MemRating.mem_id == 1))
+    assert dict(ratings.tuples().all()) == expected_ratings
+    assert await db_session.scalar(select(func.count()).select_from(MemEvent)) == 1
+
+
+@pytest.mark.parametrize(
+    ('user_id', 'fixtures'),
+    [
+        (1, FIXTURES),
+    ],
+)
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_common_api_fixture', 'fake_redis')
+async def test_mark_missing_mem(client: AsyncClient, db_session: AsyncSession, access_token: str) -> None:
+    response = await client.get(
+        URLS['mem']['mark'].format(mem_id=2),
+        params={'mark': 'like'},
+        headers={'Authorization': f'Bearer {access_token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'message': 'Нет данных'}
+    assert await db_session.scalar(select(func.count()).select_from(MemRating)) == 1
+    assert await db_session.scalar(select(func.count()).select_from(MemEvent)) == 0
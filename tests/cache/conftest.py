@@ -0,0 +1,14 @@
+from typing import Generator
+
+import pytest
+
+from webapp.cache.local import LocalCache, local_caches
+
+
+@pytest.fixture()
+def local_cache() -> Generator[LocalCache[str], None, None]:
+    cache: LocalCache[str] = LocalCache(max_size=3, ttl=60)
+
+    yield cache
+
+    local_caches.remove(cache)
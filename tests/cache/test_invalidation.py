@@ -0,0 +1,49 @@
+import os
+from typing import List, Tuple, cast
+
+import pytest
+from redis.asyncio.client import Pipeline
+
+from webapp.cache.local import LocalCache
+from webapp.cache.redis import invalidation
+
+
+class RecordingPipeline:
+    def __init__(self) -> None:
+        self.published: List[Tuple[str, bytes]] = []
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self.published.append((channel, message))
+
+
+def test_worker_id_differs_after_fork(monkeypatch: pytest.MonkeyPatch) -> None:
+    # при preload_app модуль импортирован в мастере, воркеры отличаются только pid
+    worker_ids = set()
+    for pid in (101, 102):
+        monkeypatch.setattr(os, 'getpid', lambda pid=pid: pid)
+        worker_ids.add(invalidation.get_worker_id())
+
+    assert len(worker_ids) == 2
+
+
+@pytest.mark.parametrize(
+    ('receiver_pid', 'expected_value'),
+    [
+        (102, None),
+        (101, 'value'),
+    ],
+)
+def test_invalidation_from_other_worker(
+    monkeypatch: pytest.MonkeyPatch, local_cache: LocalCache[str], receiver_pid: int, expected_value: str | None
+) -> None:
+    local_cache.set('key', 'value')
+    pipe = RecordingPipeline()
+
+    monkeypatch.setattr(os, 'getpid', lambda: 101)
+    invalidation.publish_invalidation_in(cast(Pipeline, pipe), ['key'])
+
+    monkeypatch.setattr(os, 'getpid', lambda: receiver_pid)
+    for _, message in pipe.published:
+        invalidation.handle_invalidation(message)
+
+    assert local_cache.get('key') == expected_value
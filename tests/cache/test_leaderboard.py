@@ -0,0 +1,105 @@
+from typing import AsyncIterator, Dict, List, Tuple
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+
+from webapp.cache.redis import leaderboard
+
+
+async def incr_mem_likes(redis: FakeRedis, mem_id: int, delta: int, likes: int) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        leaderboard.incr_mem_likes(pipe, mem_id, delta, likes)
+        await pipe.execute()
+
+
+@pytest.mark.asyncio()
+async def test_cold_leaderboard_ignores_votes_and_new_memes(fake_redis: FakeRedis) -> None:
+    await leaderboard.add_mem(1)
+    await incr_mem_likes(fake_redis, 1, 1, 1)
+
+    assert await leaderboard.get_top_mem_ids(0, 10) is None
+
+
+@pytest.mark.asyncio()
+async def test_empty_leaderboard(fake_redis: FakeRedis) -> None:
+    async def chunks() -> AsyncIterator[Dict[int, int]]:
+        return
+        yield
+
+    assert await leaderboard.rebuild(chunks())
+    assert await leaderboard.get_top_mem_ids(0, 10) == []
+
+
+@pytest.mark.asyncio()
+async def test_ties_ordered_by_id_desc(fake_redis: FakeRedis) -> None:
+    async def chunks() -> AsyncIterator[Dict[int, int]]:
+        yield {9: 5, 10: 5, 100: 7, 2: 5}
+
+    await leaderboard.rebuild(chunks())
+
+    # как ORDER BY likes DESC, id DESC в Postgres, а не по строкам id
+    assert await leaderboard.get_top_mem_ids(0, 10) == [100, 10, 9, 2]
+    assert await leaderboard.get_top_mem_ids(1, 2) == [10, 9]
+
+
+@pytest.mark.parametrize(
+    ('before_snapshot', 'during_rebuild', 'expected_top'),
+    [
+        # голос зафиксирован до снимка и уже учтен в нем: повторно не применяется
+        ([(1, 1, 3)], [], [(1, 3), (2, 2)]),
+        # голос зафиксирован до снимка, но дошел до Redis, когда снимок уже читается
+        ([], [(1, 1, 3)], [(1, 3), (2, 2)]),
+        # голоса после снимка не попали в него и применяются после RENAME
+        ([], [(2, 1, 3), (2, 1, 4)], [(2, 4), (1, 3)]),
+        ([(1, 1, 3)], [(1, -1, 2), (2, 2, 4)], [(2, 4), (1, 2)]),
+    ],
+)
+@pytest.mark.asyncio()
+async def test_votes_during_rebuild(
+    fake_redis: FakeRedis,
+    before_snapshot: List[Tuple[int, int, int]],
+    during_rebuild: List[Tuple[int, int, int]],
+    expected_top: List[Tuple[int, int]],
+) -> None:
+    async def chunks() -> AsyncIterator[Dict[int, int]]:
+        # блокировка уже взята, запрос в Postgres еще не начался
+        for mem_id, delta, likes in before_snapshot:
+            await incr_mem_likes(fake_redis, mem_id, delta, likes)
+        yield {1: 3}
+        for mem_id, delta, likes in during_rebuild:
+            await incr_mem_likes(fake_redis, mem_id, delta, likes)
+        yield {2: 2}
+
+    assert await leaderboard.rebuild(chunks())
+
+    top = await fake_redis.zrevrange(leaderboard.get_script_keys()[0], 0, -1, withscores=True)
+    assert [(int(member), int(score)) for member, score in top] == expected_top
+
+
+@pytest.mark.asyncio()
+async def test_mem_added_during_rebuild(fake_redis: FakeRedis) -> None:
+    async def chunks() -> AsyncIterator[Dict[int, int]]:
+        yield {1: 3}
+        await leaderboard.add_mem(2)
+        await incr_mem_likes(fake_redis, 2, 1, 1)
+
+    await leaderboard.rebuild(chunks())
+
+    assert await leaderboard.get_top_mem_ids(0, 10) == [1, 2]
+    # после пересборки изменения снова пишутся сразу в рейтинг
+    await incr_mem_likes(fake_redis, 2, 5, 6)
+    assert await leaderboard.get_top_mem_ids(0, 10) == [2, 1]
+    assert not await fake_redis.exists(*leaderboard.get_script_keys()[1:])
+
+
+@pytest.mark.asyncio()
+async def test_rebuild_already_running(fake_redis: FakeRedis) -> None:
+    async def chunks() -> AsyncIterator[Dict[int, int]]:
+        assert not await leaderboard.rebuild(other_chunks())
+        yield {1: 3}
+
+    async def other_chunks() -> AsyncIterator[Dict[int, int]]:
+        yield {2: 100}
+
+    assert await leaderboard.rebuild(chunks())
+    assert await leaderboard.get_top_mem_ids(0, 10) == [1]
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+
+from webapp.cache.redis.lock import acquire_lock, keep_lock
+
+TTL = 0.3
+
+
+@pytest.mark.asyncio()
+async def test_lock_kept_while_held(fake_redis: FakeRedis) -> None:
+    token = await acquire_lock('lock', TTL)
+    assert token is not None
+
+    async with keep_lock('lock', token, TTL):
+        await asyncio.sleep(TTL * 3)
+        assert await fake_redis.get('lock') == token.encode()
+
+    # после выхода блокировка больше не продлевается
+    await asyncio.sleep(TTL * 2)
+    assert not await fake_redis.exists('lock')
+
+
+@pytest.mark.asyncio()
+async def test_foreign_lock_not_extended(fake_redis: FakeRedis) -> None:
+    token = await acquire_lock('lock', TTL)
+    assert token is not None
+
+    async with keep_lock('lock', token, TTL):
+        await fake_redis.set('lock', 'other', px=int(TTL * 1000))
+        await asyncio.sleep(TTL * 2)
+        assert not await fake_redis.exists('lock')
@@ -0,0 +1,84 @@
+import re
+from typing import Any, Dict, List
+
+import pytest
+from aio_pika.exceptions import ChannelNotFoundEntity, ChannelPreconditionFailed
+
+from conf.config import settings
+from webapp.cache.rabbit import queue
+from webapp.cache.rabbit.key_builder import get_user_memes_queue_key
+
+
+class MissingQueue:
+    async def get(self, no_ack: bool, fail: bool) -> None:
+        raise ChannelNotFoundEntity('NOT_FOUND - no queue')
+
+
+class EmptyQueue:
+    async def get(self, no_ack: bool, fail: bool) -> None:
+        return None
+
+
+@pytest.mark.asyncio()
+async def test_pull_mem_ids_redeclares_lost_queue(monkeypatch: pytest.MonkeyPatch) -> None:
+    queues = [MissingQueue(), EmptyQueue()]
+    forgotten: List[int] = []
+
+    async def get_user_queue(user_id: int) -> object:
+        return queues.pop(0)
+
+    async def forget_user_queue(user_id: int) -> None:
+        forgotten.append(user_id)
+
+    monkeypatch.setattr(queue, 'get_user_queue', get_user_queue)
+    monkeypatch.setattr(queue, 'forget_user_queue', forget_user_queue)
+
+    async with queue.pull_mem_ids(1, 10) as mem_ids:
+        assert mem_ids == []
+
+    assert forgotten == [1]
+    assert not queues
+
+
+class Channel:
+    # как RabbitMQ: очередь с тем же именем, но другими аргументами объявить нельзя
+    def __init__(self) -> None:
+        self.queues: Dict[str, Dict[str, Any]] = {}
+
+    async def declare_queue(self, name: str, **kwargs: Any) -> 'Queue':
+        if self.queues.setdefault(name, kwargs) != kwargs:
+            raise ChannelPreconditionFailed(f"PRECONDITION_FAILED - inequivalent arg for queue '{name}'")
+        return Queue()
+
+
+class Queue:
+    async def bind(self, exchange: object, routing_key: str) -> None:
+        return
+
+
+@pytest.mark.asyncio()
+async def test_declare_existing_queue(monkeypatch: pytest.MonkeyPatch) -> None:
+    channel = Channel()
+    # очередь объявлена до появления ограничений
+    channel.queues[get_user_memes_queue_key(1)] = {'auto_delete': False, 'durable': True}
+
+    monkeypatch.setattr(queue, 'get_channel', lambda: channel)
+    monkeypatch.setattr(queue, 'get_exchange_users', lambda: None)
+
+    await queue.declare_queue(1)
+    await queue.declare_queue(2)
+    await queue.declare_queue(2)
+
+    assert channel.queues[get_user_memes_queue_key(1)] == channel.queues[get_user_memes_queue_key(2)]
+
+
+def test_user_queue_policy() -> None:
+    policy = queue.get_user_queue_policy()
+
+    assert re.match(policy['pattern'], get_user_memes_queue_key(1))
+    assert not re.match(policy['pattern'], f'other_{get_user_memes_queue_key(1)}')
+    assert policy['definition'] == {
+        'max-length': settings.RABBIT_USER_QUEUE_MAX_LENGTH,
+        'overflow': 'drop-head',
+        'message-ttl': settings.RABBIT_USER_QUEUE_MESSAGE_TTL_MS,
+    }
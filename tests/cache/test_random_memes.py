@@ -0,0 +1,75 @@
+from typing import AsyncIterator, List
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+
+from webapp.cache.redis import random_memes
+from webapp.cache.redis.key_builder import get_random_memes_added_key, get_random_memes_key, get_random_memes_lock_key
+
+
+async def chunks_of(*chunks: List[int]) -> AsyncIterator[List[int]]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def pool_mem_ids(redis: FakeRedis) -> List[int]:
+    return sorted(int(mem_id) for mem_id in await redis.smembers(get_random_memes_key()))
+
+
+@pytest.mark.asyncio()
+async def test_cold_pool(fake_redis: FakeRedis) -> None:
+    await random_memes.add_mem(1)
+
+    assert await random_memes.sample_mem_ids(10) is None
+    assert await random_memes.sample_unseen_mem_ids(1, 10) is None
+
+
+@pytest.mark.asyncio()
+async def test_empty_pool(fake_redis: FakeRedis) -> None:
+    assert await random_memes.rebuild(chunks_of())
+
+    # пул построен, но в нем только заглушка: пустой ответ вместо повторной пересборки
+    assert await random_memes.sample_mem_ids(10) == []
+    assert await random_memes.sample_unseen_mem_ids(1, 10) == []
+
+    await random_memes.add_mem(5)
+
+    assert await random_memes.sample_mem_ids(10) == [5]
+    assert await random_memes.sample_unseen_mem_ids(1, 10) == [5]
+
+
+@pytest.mark.asyncio()
+async def test_mem_added_during_rebuild(fake_redis: FakeRedis) -> None:
+    async def chunks() -> AsyncIterator[List[int]]:
+        yield [1, 2]
+        # мем создан после того, как снимок из Postgres был прочитан
+        await random_memes.add_mem(3)
+        yield [4]
+
+    assert await random_memes.rebuild(chunks())
+
+    assert await pool_mem_ids(fake_redis) == [1, 2, 3, 4]
+    assert not await fake_redis.exists(get_random_memes_added_key())
+
+
+@pytest.mark.asyncio()
+async def test_rebuild_while_locked(fake_redis: FakeRedis) -> None:
+    await fake_redis.set(get_random_memes_lock_key(), 'other')
+
+    assert not await random_memes.rebuild(chunks_of([1]))
+    assert await random_memes.sample_mem_ids(10) is None
+
+
+@pytest.mark.asyncio()
+async def test_expired_lock_taken_by_other_token(fake_redis: FakeRedis) -> None:
+    async def chunks() -> AsyncIterator[List[int]]:
+        yield [1]
+        # блокировка истекла и ее взяла другая пересборка
+        await fake_redis.set(get_random_memes_lock_key(), 'other')
+        await random_memes.add_mem(2)
+
+    assert await random_memes.rebuild(chunks())
+
+    # чужая блокировка не снимается, мем, добавленный под ней, не теряется
+    assert await fake_redis.get(get_random_memes_lock_key()) == b'other'
+    assert await pool_mem_ids(fake_redis) == [1, 2]
@@ -0,0 +1,118 @@
+import time
+import asyncio
+from typing import List
+
+import orjson
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from webapp.cache.redis import read_through
+from webapp.cache.redis.read_through import ReadThroughCache
+from webapp.db.postgres import engine
+
+
+class Item(BaseModel):
+    id: int
+    text: str
+
+
+@pytest.fixture()
+def cache(monkeypatch: pytest.MonkeyPatch) -> ReadThroughCache[Item]:
+    monkeypatch.setattr(read_through.settings, 'LOCAL_CACHE_ENABLED', False)
+    return ReadThroughCache('test', Item, ttl=60)
+
+
+class CountingLoader:
+    def __init__(self, text: str = 'fresh') -> None:
+        self.text = text
+        self.sessions: List[AsyncSession] = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, session: AsyncSession) -> Item:
+        self.sessions.append(session)
+        await self.release.wait()
+        return Item(id=1, text=self.text)
+
+
+async def set_stale(redis: FakeRedis, key: str, item: Item) -> None:
+    await redis.set(key, orjson.dumps({'value': item.model_dump(mode='json'), 'fresh_until': time.time() - 1}))
+
+
+def primary_session() -> AsyncSession:
+    # соединение берется только при запросе, загрузчики в тестах в базу не ходят
+    return AsyncSession(bind=engine)
+
+
+def replica_session() -> AsyncSession:
+    return AsyncSession(bind=engine, info={'replica': True})
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_misses_load_once(fake_redis: FakeRedis, cache: ReadThroughCache[Item]) -> None:
+    loader = CountingLoader()
+    request_session = primary_session()
+
+    pending = [asyncio.ensure_future(cache.get('item:1', loader, request_session)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    # запрос, начавший загрузку, может завершиться и закрыть свою сессию раньше нее
+    await request_session.close()
+    loader.release.set()
+
+    assert [item.text for item in await asyncio.gather(*pending) if item] == ['fresh'] * 5
+    assert len(loader.sessions) == 1
+    assert loader.sessions[0] is not request_session
+    assert await cache.get('item:1', loader, primary_session()) == Item(id=1, text='fresh')
+    assert len(loader.sessions) == 1
+
+
+@pytest.mark.asyncio()
+async def test_primary_does_not_wait_for_replica_load(fake_redis: FakeRedis, cache: ReadThroughCache[Item]) -> None:
+    replica_loader = CountingLoader('replica')
+    primary_loader = CountingLoader('primary')
+    primary_loader.release.set()
+
+    replica_read = asyncio.ensure_future(cache.get('item:1', replica_loader, replica_session()))
+    await asyncio.sleep(0.01)
+
+    # отставание реплики не должно попасть в ответ тому, кто читает из основной базы
+    assert await cache.get('item:1', primary_loader, primary_session()) == Item(id=1, text='primary')
+
+    replica_loader.release.set()
+    await replica_read
+    assert replica_loader.sessions[0].info['replica']
+
+
+@pytest.mark.asyncio()
+async def test_replica_load_is_not_cached(fake_redis: FakeRedis, cache: ReadThroughCache[Item]) -> None:
+    loader = CountingLoader()
+    loader.release.set()
+
+    # прочитанное с реплики может отставать - оно отдается, но в общий кэш не попадает
+    assert await cache.get('item:1', loader, replica_session()) == Item(id=1, text='fresh')
+    assert await fake_redis.keys() == []
+
+
+@pytest.mark.asyncio()
+async def test_stale_value_refreshed_in_background(fake_redis: FakeRedis, cache: ReadThroughCache[Item]) -> None:
+    await set_stale(fake_redis, 'item:1', Item(id=1, text='stale'))
+    loader = CountingLoader()
+
+    assert await cache.get('item:1', loader, primary_session()) == Item(id=1, text='stale')
+    # пока обновление идет, повторное чтение не запускает еще одно
+    assert await cache.get('item:1', loader, primary_session()) == Item(id=1, text='stale')
+
+    loader.release.set()
+    await asyncio.gather(*cache._background)
+
+    assert len(loader.sessions) == 1
+    assert await cache.get('item:1', loader, primary_session()) == Item(id=1, text='fresh')
+
+
+@pytest.mark.asyncio()
+async def test_get_many_skips_stale_values(fake_redis: FakeRedis, cache: ReadThroughCache[Item]) -> None:
+    await cache.set('item:1', Item(id=1, text='fresh'))
+    await set_stale(fake_redis, 'item:2', Item(id=2, text='stale'))
+
+    assert await cache.get_many(['item:1', 'item:2', 'item:3']) == [Item(id=1, text='fresh'), None, None]
@@ -0,0 +1,61 @@
+import time
+from typing import Dict
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+
+from webapp.cache.redis import revoked_tokens
+from webapp.cache.redis.key_builder import get_revoked_tokens_key
+
+
+@pytest.fixture()
+def worker_revoked(monkeypatch: pytest.MonkeyPatch) -> Dict[str, float]:
+    # копия списка другого воркера, который сам ничего не отзывал
+    revoked: Dict[str, float] = {}
+    monkeypatch.setattr(revoked_tokens, 'revoked', revoked)
+    monkeypatch.setattr(revoked_tokens, 'last_synced_score', float('-inf'))
+    return revoked
+
+
+@pytest.mark.asyncio()
+async def test_sync_reads_only_new_revocations(fake_redis: FakeRedis, worker_revoked: Dict[str, float]) -> None:
+    exp = time.time() + 60
+    await revoked_tokens.revoke_token('first', exp)
+    worker_revoked.clear()
+
+    await revoked_tokens.sync_revoked_tokens()
+    assert revoked_tokens.is_revoked('first')
+
+    # запись, отозванная раньше прошлой синхронизации, уже прочитана и больше не перечитывается
+    await fake_redis.zadd(get_revoked_tokens_key(), {f'older:{exp}': revoked_tokens.last_synced_score - 1})
+    await revoked_tokens.revoke_token('second', exp)
+    worker_revoked.clear()
+    await revoked_tokens.sync_revoked_tokens()
+
+    assert not revoked_tokens.is_revoked('older')
+    assert revoked_tokens.is_revoked('second')
+
+
+@pytest.mark.asyncio()
+async def test_sync_drops_expired_tokens(fake_redis: FakeRedis, worker_revoked: Dict[str, float]) -> None:
+    await revoked_tokens.revoke_token('expired', time.time() - 1)
+    await revoked_tokens.revoke_token('active', time.time() + 60)
+
+    await revoked_tokens.sync_revoked_tokens()
+
+    assert not revoked_tokens.is_revoked('expired')
+    assert revoked_tokens.is_revoked('active')
+
+
+@pytest.mark.asyncio()
+async def test_revoke_removes_entries_older_than_token_ttl(
+    fake_redis: FakeRedis, worker_revoked: Dict[str, float]
+) -> None:
+    # запись, отозванная раньше, чем живет любой токен
+    await fake_redis.zadd(get_revoked_tokens_key(), {'old:0': 0})
+
+    await revoked_tokens.revoke_token('new', time.time() + 60)
+
+    members = await fake_redis.zrange(get_revoked_tokens_key(), 0, -1)
+
+    assert [member.decode().split(':')[0] for member in members] == ['new']
@@ -0,0 +1,80 @@
+from typing import List, Tuple
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+
+from webapp.cache.redis import leaderboard, votes
+from webapp.cache.redis.key_builder import get_flushing_votes_key, get_mem_counters_key, get_trendy_memes_key
+
+
+@pytest.mark.asyncio()
+async def test_missing_state_needs_postgres(fake_redis: FakeRedis) -> None:
+    assert await votes.record_vote(1, 1, 'like') is None
+    assert not await fake_redis.exists(get_mem_counters_key(1))
+    assert await votes.take_pending() == {}
+
+
+@pytest.mark.parametrize(
+    ('stored', 'marks', 'expected_counters', 'expected_mark'),
+    [
+        # повторная такая же оценка снимает голос
+        ((3, 1, votes.NO_VOTE), ['like'], [(4, 1)], 'like'),
+        ((3, 1, votes.NO_VOTE), ['like', 'like'], [(4, 1), (3, 1)], votes.NO_VOTE),
+        # другая оценка заменяет голос, в том числе сохраненный в Postgres
+        ((3, 1, votes.NO_VOTE), ['like', 'dislike'], [(4, 1), (3, 2)], 'dislike'),
+        ((3, 1, 'like'), ['dislike', 'dislike', 'like'], [(2, 2), (2, 1), (3, 1)], 'like'),
+        ((3, 1, 'like'), ['like'], [(2, 1)], votes.NO_VOTE),
+    ],
+)
+@pytest.mark.asyncio()
+async def test_toggle_votes(
+    fake_redis: FakeRedis,
+    stored: Tuple[int, int, str],
+    marks: List[str],
+    expected_counters: List[Tuple[int, int]],
+    expected_mark: str,
+) -> None:
+    # состояние из Postgres передается, только пока его нет в Redis
+    counters = [await votes.record_vote(1, 1, marks[0], stored)]
+    counters += [await votes.record_vote(1, 1, mark) for mark in marks[1:]]
+
+    assert counters == expected_counters
+    assert await votes.take_pending() == {(1, 1): expected_mark}
+
+
+@pytest.mark.asyncio()
+async def test_counters_shared_between_users(fake_redis: FakeRedis) -> None:
+    await votes.record_vote(1, 1, 'like', (0, 0, votes.NO_VOTE))
+    # счетчики мема уже в Redis, а оценки второго пользователя еще нет - нужен Postgres
+    assert await votes.record_vote(1, 2, 'like') is None
+
+    assert await votes.record_vote(1, 2, 'like', (0, 0, votes.NO_VOTE)) == (2, 0)
+
+
+@pytest.mark.asyncio()
+async def test_pending_handed_off_to_flushing(fake_redis: FakeRedis) -> None:
+    await votes.record_vote(1, 1, 'like', (0, 0, votes.NO_VOTE))
+    await votes.record_vote(2, 1, 'dislike', (0, 0, votes.NO_VOTE))
+
+    assert await votes.take_pending() == {(1, 1): 'like', (2, 1): 'dislike'}
+
+    # голоса, сделанные во время сброса, копятся отдельно
+    await votes.record_vote(1, 1, 'like')
+    # сброс не завершился - при повторе берется тот же снимок
+    assert await votes.take_pending() == {(1, 1): 'like', (2, 1): 'dislike'}
+
+    await votes.ack_pending()
+    assert not await fake_redis.exists(get_flushing_votes_key())
+    assert await votes.take_pending() == {(1, 1): votes.NO_VOTE}
+
+
+@pytest.mark.asyncio()
+async def test_votes_move_built_leaderboard(fake_redis: FakeRedis) -> None:
+    await fake_redis.zadd(get_trendy_memes_key(), {leaderboard.to_member(1): 5})
+
+    await votes.record_vote(1, 1, 'like', (5, 0, votes.NO_VOTE))
+    await votes.record_vote(1, 2, 'dislike', (6, 0, votes.NO_VOTE))
+    await votes.record_vote(2, 1, 'like', (0, 0, votes.NO_VOTE))
+
+    assert await leaderboard.get_top_mem_ids(0, 10) == [1]
+    assert await fake_redis.zscore(get_trendy_memes_key(), leaderboard.to_member(1)) == 6
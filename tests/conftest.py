@@ -1,10 +1,13 @@
 import asyncio
+from typing import AsyncIterator
 
 import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
 from fastapi import FastAPI
 
 from tests.my_types import FixtureFunctionT
 
+from webapp.db import redis as db_redis
 from webapp.db.postgres import engine
 from webapp.main import create_app
 from webapp.models import meta
@@ -29,3 +32,14 @@ async def _migrate_db() -> FixtureFunctionT:
 
     async with engine.begin() as conn:
         await conn.run_sync(meta.metadata.drop_all)
+
+
+@pytest.fixture()
+async def fake_redis(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[FakeRedis]:
+    # Lua-скрипты выполняются в fakeredis через lupa, сервер Redis не нужен
+    client = FakeRedis()
+    monkeypatch.setattr(db_redis, 'redis', client, raising=False)
+
+    yield client
+
+    await client.aclose()
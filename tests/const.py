@@ -5,5 +5,11 @@ URLS = {
     },
     'file': {
         'resize': '/file/resize',
+        'resize_status': '/file/resize/{mem_id}',
+    },
+    'mem': {
+        'list': '/mem/',
+        'mark': '/mem/mark/{mem_id}',
+        'download': '/mem/download/{mem_id}',
     },
 }
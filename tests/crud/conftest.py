@@ -0,0 +1,74 @@
+from typing import AsyncGenerator
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from tests.my_types import FixtureFunctionT
+
+from webapp.db.postgres import engine
+
+SEED_USERNAME_OFFSET = 10_000_000
+SEED_USERS = 1_000
+SEED_MEMES = 20_000
+# каждый из первых SEED_RATERS пользователей оценивает все мемы
+SEED_RATERS = 3
+
+SEED_QUERIES = [
+    f'''
+    INSERT INTO sirius.users (username, tg, code)
+    SELECT {SEED_USERNAME_OFFSET} + g, 'seed' || g, 'seed'
+    FROM generate_series(1, {SEED_USERS}) AS g
+    ''',
+    f'''
+    INSERT INTO sirius.memes (user_id, photo_url, text, likes, dislikes, phash)
+    SELECT u.id, 'seed/' || g || '.png', 'seed ' || g, (random() * 1000)::int, (random() * 100)::int,
+           ((random() * 2147483647)::bigint << 32) | (random() * 4294967295)::bigint
+    FROM generate_series(1, {SEED_MEMES}) AS g
+    JOIN sirius.users AS u ON u.username = {SEED_USERNAME_OFFSET} + 1 + g % {SEED_USERS}
+    ''',
+    '''
+    INSERT INTO sirius.mem_carts (user_id, mem_id, cart_type)
+    SELECT user_id, id, 'general' FROM sirius.memes
+    ON CONFLICT DO NOTHING
+    ''',
+    f'''
+    INSERT INTO sirius.mem_carts (user_id, mem_id, cart_type)
+    SELECT u.id, m.id, 'personal'
+    FROM sirius.memes AS m
+    JOIN sirius.users AS u ON u.username = {SEED_USERNAME_OFFSET} + 1 + m.id % {SEED_USERS}
+    WHERE m.id % 10 = 0
+    ON CONFLICT DO NOTHING
+    ''',
+    f'''
+    INSERT INTO sirius.mem_ratings (user_id, mem_id, rating)
+    SELECT u.id, m.id, (CASE WHEN random() < 0.7 THEN 'like' ELSE 'dislike' END)::sirius.like_dislike_enum
+    FROM sirius.memes AS m
+    JOIN sirius.users AS u ON u.username BETWEEN {SEED_USERNAME_OFFSET} + 1 AND {SEED_USERNAME_OFFSET} + {SEED_RATERS}
+    ON CONFLICT DO NOTHING
+    ''',
+    # без свежей статистики планировщик оценивает таблицы как пустые
+    'ANALYZE sirius.users, sirius.memes, sirius.mem_carts, sirius.mem_ratings',
+]
+
+
+@pytest.fixture()
+async def session(_migrate_db: FixtureFunctionT) -> AsyncGenerator[AsyncSession, None]:
+    async with engine.connect() as connection:
+        await connection.begin()
+        # транзакции, которые открывает проверяемый код, становятся точками сохранения внутри тестовой
+        session = async_sessionmaker(bind=connection, join_transaction_mode='create_savepoint')()
+
+        yield session
+
+        await session.close()
+        await connection.rollback()
+
+
+@pytest.fixture()
+async def seeded_session(session: AsyncSession) -> AsyncSession:
+    connection = await session.connection()
+    for query in SEED_QUERIES:
+        await connection.execute(text(query))
+
+    return session
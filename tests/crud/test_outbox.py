@@ -0,0 +1,58 @@
+from typing import Any, Dict, List
+
+import orjson
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tests.mocking.kafka import TestKafkaProducer
+
+from webapp.crud import outbox
+from webapp.db import kafka
+from webapp.models.sirius.mem_event import MemEvent, MemEventEnum
+
+EVENTS: List[Dict[str, Any]] = [
+    {'mem_id': 1, 'event_type': MemEventEnum.created, 'payload': {'user_id': 1}},
+    {'mem_id': 1, 'event_type': MemEventEnum.rated, 'payload': {'user_id': 2, 'mark': 'like'}},
+    {'mem_id': 2, 'event_type': MemEventEnum.added_to_cart, 'payload': {'user_id': 1, 'cart_type': 'personal'}},
+]
+
+
+@pytest.fixture()
+def kafka_received_messages(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    received: List[Dict[str, Any]] = []
+    monkeypatch.setattr(kafka, 'get_producer', lambda: TestKafkaProducer(received))
+    return received
+
+
+@pytest.mark.parametrize(
+    ('batch_size', 'expected_published'),
+    [
+        (10, [3, 0]),
+        (2, [2, 1, 0]),
+    ],
+)
+@pytest.mark.asyncio()
+async def test_publish_mem_events(
+    monkeypatch: pytest.MonkeyPatch,
+    session: AsyncSession,
+    kafka_received_messages: List[Dict[str, Any]],
+    batch_size: int,
+    expected_published: List[int],
+) -> None:
+    monkeypatch.setattr(outbox.settings, 'OUTBOX_BATCH_SIZE', batch_size)
+    await session.execute(insert(MemEvent), EVENTS)
+    await session.commit()
+
+    published = [await outbox.publish_mem_events(session) for _ in expected_published]
+
+    assert published == expected_published
+    # события уходят в порядке записи в outbox, ключ - id мема
+    messages = [orjson.loads(message['value']) for message in kafka_received_messages]
+    assert [(message['mem_id'], message['type']) for message in messages] == [
+        (event['mem_id'], event['event_type'].value) for event in EVENTS
+    ]
+    assert [message['key'] for message in kafka_received_messages] == [
+        str(event['mem_id']).encode() for event in EVENTS
+    ]
+    assert (await session.scalar(select(func.count()).select_from(MemEvent))) == 0
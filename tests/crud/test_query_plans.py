@@ -0,0 +1,92 @@
+import json
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tests.crud.conftest import SEED_USERNAME_OFFSET
+
+from webapp.cache.redis import votes
+from webapp.crud.mem import (
+    _load_mem,
+    _load_mem_download,
+    _rating_mem_query,
+    _top_memes_from_db,
+    find_similar_memes,
+    get_memes_by_cart,
+    get_memes_by_ids,
+)
+from webapp.crud.vote import _write_votes
+from webapp.db.postgres import engine
+from webapp.models.sirius.mem import Mem
+from webapp.models.sirius.mem_rating import LikeDislikeEnum
+from webapp.models.sirius.user import User
+
+# таблицы, которые растут вместе с пользователями: полный проход по ним в запросе на каждый запрос API недопустим
+LARGE_TABLES = {'memes', 'mem_ratings', 'mem_carts'}
+
+QueryT = Callable[[AsyncSession, int, int], Awaitable[Any]]
+
+# пересборки рейтингов из Postgres и запасной random() читают таблицу целиком намеренно и здесь не проверяются
+QUERIES: Dict[str, QueryT] = {
+    'load_mem': lambda session, user_id, mem_id: _load_mem(session, mem_id),
+    'load_mem_download': lambda session, user_id, mem_id: _load_mem_download(session, mem_id),
+    'memes_by_general_cart': lambda session, user_id, mem_id: get_memes_by_cart(session, 'general', user_id, 10),
+    'memes_by_general_cart_after': lambda session, user_id, mem_id: get_memes_by_cart(
+        session, 'general', user_id, 10, after=mem_id
+    ),
+    'memes_by_personal_cart': lambda session, user_id, mem_id: get_memes_by_cart(session, 'personal', user_id, 10),
+    'memes_by_ids': lambda session, user_id, mem_id: get_memes_by_ids(session, [mem_id, mem_id + 1, mem_id + 2]),
+    'top_memes_from_db': lambda session, user_id, mem_id: _top_memes_from_db(session, 0, 10),
+    'similar_memes': lambda session, user_id, mem_id: find_similar_memes(session, 0x1234_5678_9ABC_DEF0),
+    'rating_mem': lambda session, user_id, mem_id: session.execute(
+        _rating_mem_query(mem_id, user_id, LikeDislikeEnum.like)
+    ),
+    'write_votes': lambda session, user_id, mem_id: _write_votes(
+        session, {(mem_id, user_id): LikeDislikeEnum.dislike.value, (mem_id + 1, user_id): votes.NO_VOTE}
+    ),
+}
+
+
+@contextmanager
+def capture_statements() -> Iterator[List[Tuple[str, Any]]]:
+    statements: List[Tuple[str, Any]] = []
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def find_seq_scans(plan: Dict[str, Any]) -> List[str]:
+    seq_scans = []
+    if plan['Node Type'] == 'Seq Scan' and plan.get('Relation Name') in LARGE_TABLES:
+        seq_scans.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        seq_scans.extend(find_seq_scans(child))
+    return seq_scans
+
+
+@pytest.mark.parametrize('query_name', list(QUERIES))
+@pytest.mark.asyncio()
+async def test_query_plan_uses_indexes(seeded_session: AsyncSession, query_name: str) -> None:
+    user_id = (await seeded_session.scalars(select(User.id).where(User.username == SEED_USERNAME_OFFSET + 1))).one()
+    mem_id = (await seeded_session.scalars(select(func.min(Mem.id)))).one()
+
+    with capture_statements() as statements:
+        await QUERIES[query_name](seeded_session, user_id, mem_id)
+
+    assert statements
+
+    connection = await seeded_session.connection()
+    for statement, parameters in statements:
+        raw = (await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)).scalar_one()
+        plan = (raw if isinstance(raw, list) else json.loads(raw))[0]['Plan']
+
+        assert not find_seq_scans(plan), f'{query_name}: Seq Scan in plan of\n{statement}\n{json.dumps(plan, indent=2)}'
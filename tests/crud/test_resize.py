@@ -0,0 +1,91 @@
+import time
+from typing import Any, Dict, List
+
+import pytest
+from aiokafka.errors import KafkaTimeoutError
+from fakeredis import FakeAsyncRedis as FakeRedis
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import get_file_resize_cache
+from webapp.crud import resize
+from webapp.schema.file.resize import ResizeStatusEnum
+
+MEM_ID = 1
+PHOTO_URL = 'mem.png'
+WIDTH = HEIGHT = 160
+VARIANT = resize.get_resize_variant(WIDTH, HEIGHT)
+KEY = get_file_resize_cache(str(MEM_ID))
+
+
+@pytest.fixture()
+def sent_jobs(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    jobs: List[Dict[str, Any]] = []
+
+    async def send_resize_job(job: Dict[str, Any]) -> None:
+        jobs.append(job)
+
+    monkeypatch.setattr(resize, 'send_resize_job', send_resize_job)
+    return jobs
+
+
+async def get_resized_path() -> str | None:
+    return await resize.get_resized_mem_path(MEM_ID, PHOTO_URL, WIDTH, HEIGHT)
+
+
+@pytest.mark.asyncio()
+async def test_variant_queued_once(fake_redis: FakeRedis, sent_jobs: List[Dict[str, Any]]) -> None:
+    assert await get_resized_path() is None
+    assert await get_resized_path() is None
+
+    assert sent_jobs == [{'photo_url': PHOTO_URL, 'mem_id': str(MEM_ID), 'width': WIDTH, 'height': HEIGHT}]
+    assert await fake_redis.hget(KEY, VARIANT) == ResizeStatusEnum.queued.value.encode()
+    assert await fake_redis.hexists(KEY, resize.get_queued_at_field(VARIANT))
+
+
+@pytest.mark.parametrize(
+    ('status', 'queued_ago', 'expected_jobs'),
+    [
+        # задача потерялась: копия в очереди дольше RESIZE_REQUEUE_AFTER
+        (ResizeStatusEnum.queued, settings.RESIZE_REQUEUE_AFTER + 1, 1),
+        (ResizeStatusEnum.queued, settings.RESIZE_REQUEUE_AFTER - 60, 0),
+        # отметка без времени постановки
+        (ResizeStatusEnum.queued, None, 1),
+        (ResizeStatusEnum.failed, None, 1),
+    ],
+)
+@pytest.mark.asyncio()
+async def test_variant_requeued(
+    fake_redis: FakeRedis,
+    sent_jobs: List[Dict[str, Any]],
+    status: ResizeStatusEnum,
+    queued_ago: int | None,
+    expected_jobs: int,
+) -> None:
+    await fake_redis.hset(KEY, VARIANT, status.value)
+    if queued_ago is not None:
+        await fake_redis.hset(KEY, resize.get_queued_at_field(VARIANT), str(int(time.time()) - queued_ago))
+
+    assert await get_resized_path() is None
+    assert len(sent_jobs) == expected_jobs
+    assert await fake_redis.hget(KEY, VARIANT) == ResizeStatusEnum.queued.value.encode()
+
+
+@pytest.mark.asyncio()
+async def test_done_variant(fake_redis: FakeRedis, sent_jobs: List[Dict[str, Any]]) -> None:
+    await get_resized_path()
+    await resize.set_resize_status(str(MEM_ID), WIDTH, HEIGHT, ResizeStatusEnum.done)
+
+    assert await get_resized_path() == resize.get_resized_path(str(MEM_ID), VARIANT)
+    assert len(sent_jobs) == 1
+    assert not await fake_redis.hexists(KEY, resize.get_queued_at_field(VARIANT))
+
+
+@pytest.mark.asyncio()
+async def test_unsent_job_unmarked(fake_redis: FakeRedis, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def send_resize_job(job: Dict[str, Any]) -> None:
+        raise KafkaTimeoutError
+
+    monkeypatch.setattr(resize, 'send_resize_job', send_resize_job)
+
+    assert await get_resized_path() is None
+    assert not await fake_redis.exists(KEY)
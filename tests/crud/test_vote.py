@@ -0,0 +1,125 @@
+from typing import Dict, List, Tuple
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from webapp.cache.redis.key_builder import get_votes_flush_lock_key
+from webapp.crud import vote
+from webapp.crud.mem import mem_cache
+from webapp.models.sirius.mem import Mem
+from webapp.models.sirius.mem_event import MemEvent
+from webapp.models.sirius.mem_rating import LikeDislikeEnum, MemRating
+from webapp.models.sirius.user import User
+
+LIKE = LikeDislikeEnum.like
+DISLIKE = LikeDislikeEnum.dislike
+
+MEM_ID = 1
+
+
+@pytest.fixture()
+async def _rated_mem(monkeypatch: pytest.MonkeyPatch, session: AsyncSession, fake_redis: FakeRedis) -> None:
+    monkeypatch.setattr(mem_cache, 'local', None)
+    await session.execute(
+        insert(User), [{'id': user_id, 'username': user_id, 'tg': '', 'code': ''} for user_id in range(1, 4)]
+    )
+    await session.execute(insert(Mem).values(id=MEM_ID, user_id=1, photo_url='mem.png', text='mem', likes=1))
+    # оценка, сделанная до включения отложенной записи, есть только в Postgres
+    await session.execute(insert(MemRating).values(user_id=1, mem_id=MEM_ID, rating=LIKE))
+
+
+async def rate(session: AsyncSession, marks: List[Tuple[int, LikeDislikeEnum]]) -> Tuple[int, int]:
+    for user_id, mark in marks:
+        mem = await vote.buffer_rating_mem(session, MEM_ID, user_id, mark)
+
+    assert mem is not None
+    return mem.likes, mem.dislikes
+
+
+async def flush(session: AsyncSession) -> int:
+    # голоса сбрасывает фоновая задача в своей транзакции
+    await session.commit()
+    return await vote.flush_votes(session)
+
+
+async def stored_state(session: AsyncSession) -> Tuple[Tuple[int, int], Dict[int, LikeDislikeEnum]]:
+    mem = (await session.execute(select(Mem.likes, Mem.dislikes).where(Mem.id == MEM_ID))).one()
+    ratings = await session.execute(select(MemRating.user_id, MemRating.rating).where(MemRating.mem_id == MEM_ID))
+    return (mem.likes, mem.dislikes), dict(ratings.tuples().all())
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_rated_mem')
+async def test_toggles_flushed_to_postgres(session: AsyncSession) -> None:
+    counters = await rate(
+        session,
+        [
+            (1, LIKE),  # снимает лайк, сохраненный в Postgres
+            (1, DISLIKE),
+            (2, LIKE),
+            (2, LIKE),
+            (2, LIKE),
+            (3, DISLIKE),
+            (3, LIKE),
+        ],
+    )
+    assert counters == (2, 1)
+
+    assert await flush(session) == 3
+    assert await stored_state(session) == ((2, 1), {1: DISLIKE, 2: LIKE, 3: LIKE})
+    assert await session.scalar(select(func.count()).select_from(MemEvent)) == 3
+
+    # состояние осталось в Redis: следующие голоса считаются без Postgres и дописываются следующим сбросом
+    assert await rate(session, [(2, LIKE), (1, DISLIKE)]) == (1, 0)
+    assert await flush(session) == 2
+    assert await stored_state(session) == ((1, 0), {3: LIKE})
+
+    assert await flush(session) == 0
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_rated_mem')
+async def test_unfinished_flush_is_repeated(session: AsyncSession) -> None:
+    await rate(session, [(2, LIKE), (3, DISLIKE)])
+    await session.commit()
+
+    # сброс упал после того, как снимок забран из буфера
+    pending = await vote.votes.take_pending()
+    async with session.begin():
+        await vote._write_votes(session, pending)
+    await rate(session, [(2, DISLIKE)])
+
+    assert await flush(session) == 2
+    assert await stored_state(session) == ((2, 1), {1: LIKE, 2: LIKE, 3: DISLIKE})
+    assert await flush(session) == 1
+    assert await stored_state(session) == ((1, 2), {1: LIKE, 2: DISLIKE, 3: DISLIKE})
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_rated_mem')
+async def test_flush_with_lost_lock_not_committed(
+    monkeypatch: pytest.MonkeyPatch, session: AsyncSession, fake_redis: FakeRedis
+) -> None:
+    await rate(session, [(2, LIKE)])
+
+    async def write_votes(session: AsyncSession, pending: Dict[Tuple[int, int], str]) -> None:
+        await write_votes_before(session, pending)
+        # снимок пишется дольше TTL блокировки, и ее взял другой воркер
+        await fake_redis.set(get_votes_flush_lock_key(), 'other')
+
+    write_votes_before = vote._write_votes
+    monkeypatch.setattr(vote, '_write_votes', write_votes)
+
+    assert await flush(session) == 0
+    assert await stored_state(session) == ((1, 0), {1: LIKE})
+    assert await session.scalar(select(func.count()).select_from(MemEvent)) == 0
+    assert await fake_redis.get(get_votes_flush_lock_key()) == b'other'
+
+    # снимок остался в Redis и сбрасывается один раз новым владельцем блокировки
+    monkeypatch.setattr(vote, '_write_votes', write_votes_before)
+    await fake_redis.delete(get_votes_flush_lock_key())
+    assert await flush(session) == 1
+    assert await stored_state(session) == ((2, 0), {1: LIKE, 2: LIKE})
+    assert await session.scalar(select(func.count()).select_from(MemEvent)) == 1
@@ -0,0 +1,97 @@
+import time
+import asyncio
+from typing import List
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from webapp.db import replica
+from webapp.db.postgres import create_session, engine, is_replica
+from webapp.utils.auth.jwt import JwtTokenT
+
+
+@pytest.fixture()
+def replica_sessions(monkeypatch: pytest.MonkeyPatch) -> List[async_sessionmaker[AsyncSession]]:
+    # реплики смотрят в ту же базу, что и основная: запросов в тестах нет, важно только, какая сессия выдана
+    sessions = [create_session(engine, replica=True) for _ in range(2)]
+    monkeypatch.setattr(replica, 'replica_sessions', sessions)
+    monkeypatch.setattr(replica, 'healthy', [True] * len(sessions))
+    return sessions
+
+
+def get_user(user_id: int) -> JwtTokenT:
+    return JwtTokenT(uid='uid', exp=int(time.time()), user_id=user_id)
+
+
+async def read_session(primary: AsyncSession, user_id: int) -> AsyncSession:
+    sessions = replica.get_read_session(primary, get_user(user_id))
+    session = await sessions.__anext__()
+    await sessions.aclose()
+    return session
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('fake_redis')
+async def test_reads_go_to_healthy_replica(
+    monkeypatch: pytest.MonkeyPatch, replica_sessions: List[async_sessionmaker[AsyncSession]]
+) -> None:
+    primary = AsyncSession(bind=engine)
+    monkeypatch.setattr(replica, 'healthy', [False, True])
+
+    for _ in range(3):
+        session = await read_session(primary, 1)
+        assert is_replica(session)
+        assert session.bind is replica_sessions[1].kw['bind']
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('fake_redis', 'replica_sessions')
+async def test_no_healthy_replica_falls_back_to_primary(monkeypatch: pytest.MonkeyPatch) -> None:
+    primary = AsyncSession(bind=engine)
+    monkeypatch.setattr(replica, 'healthy', [False, False])
+
+    assert await read_session(primary, 1) is primary
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('replica_sessions')
+async def test_read_your_writes(fake_redis: FakeRedis) -> None:
+    primary = AsyncSession(bind=engine)
+
+    await replica.mark_user_write(1)
+
+    # только что записавший пользователь читает из основной базы, остальные - с реплик
+    assert await read_session(primary, 1) is primary
+    assert is_replica(await read_session(primary, 2))
+
+    await fake_redis.flushall()
+    assert is_replica(await read_session(primary, 1))
+
+
+@pytest.mark.parametrize(
+    'error',
+    [
+        ConnectionRefusedError(),
+        OperationalError('SELECT 1', {}, ConnectionResetError()),
+        # реплика не ответила за DB_REPLICA_HEALTH_CHECK_TIMEOUT
+        None,
+    ],
+)
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('replica_sessions')
+async def test_health_check(monkeypatch: pytest.MonkeyPatch, error: Exception | None) -> None:
+    async def ping_replica(index: int) -> None:
+        if index == 0:
+            if error is not None:
+                raise error
+            await asyncio.sleep(1)
+
+    monkeypatch.setattr(replica.settings, 'DB_REPLICA_HEALTH_CHECK_TIMEOUT', 0.01)
+    monkeypatch.setattr(replica, 'ping_replica', ping_replica)
+
+    await replica.check_replica(0)
+    await replica.check_replica(1)
+
+    assert replica.healthy == [False, True]
@@ -0,0 +1,61 @@
+from typing import AsyncIterator, Dict
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from httpx import AsyncClient
+from starlette import status
+
+from conf.config import settings
+from webapp.middleware.body_limit import BodySizeLimitMiddleware
+
+
+@pytest.fixture()
+async def limited_client(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[AsyncClient]:
+    monkeypatch.setattr(settings, 'MEM_UPLOAD_MAX_SIZE', 1024)
+    monkeypatch.setattr(settings, 'MEM_UPLOAD_MULTIPART_OVERHEAD', 512)
+
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware)
+
+    @app.post('/upload')
+    async def upload(file: UploadFile = File(...)) -> Dict[str, int]:
+        return {'size': len(await file.read())}
+
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        yield client
+
+
+async def stream_body(size: int) -> AsyncIterator[bytes]:
+    # multipart без Content-Length, частями по 256 байт
+    body = (
+        b'--x\r\nContent-Disposition: form-data; name="file"; filename="mem.jpg"\r\n\r\n'
+        + b'x' * size
+        + b'\r\n--x--\r\n'
+    )
+    for start in range(0, len(body), 256):
+        yield body[start : start + 256]
+
+
+@pytest.mark.parametrize(
+    ('size', 'expected_status'),
+    [
+        (1024, status.HTTP_200_OK),
+        (4096, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE),
+    ],
+)
+@pytest.mark.asyncio()
+async def test_content_length(limited_client: AsyncClient, size: int, expected_status: int) -> None:
+    response = await limited_client.post('/upload', files={'file': ('mem.jpg', b'x' * size)})
+
+    assert response.status_code == expected_status
+
+
+@pytest.mark.asyncio()
+async def test_chunked_body_over_limit(limited_client: AsyncClient) -> None:
+    response = await limited_client.post(
+        '/upload',
+        content=stream_body(4096),
+        headers={'content-type': 'multipart/form-data; boundary=x'},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
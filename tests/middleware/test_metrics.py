@@ -0,0 +1,142 @@
+import asyncio
+from typing import AsyncIterator, Dict
+
+import pytest
+from fakeredis import FakeAsyncRedis as FakeRedis
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from starlette import status
+
+from webapp.db import redis as db_redis
+from webapp.db.redis import get_redis
+from webapp.middleware.metrics import UNMATCHED_ENDPOINT, MeasureLatencyMiddleware
+from webapp.utils.instrumentation import InstrumentedRedis
+
+CHUNK_DELAY = 0.05
+CHUNKS = 3
+
+
+def get_sample(name: str, labels: Dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def get_requests(endpoint: str, http_status: int) -> float:
+    return get_sample(
+        'sirius_api_requests_total', {'method': 'GET', 'endpoint': endpoint, 'http_status': str(http_status)}
+    )
+
+
+def get_latency(name: str, endpoint: str) -> Dict[str, float]:
+    labels = {'method': 'GET', 'endpoint': endpoint}
+    return {suffix: get_sample(f'{name}_{suffix}', labels) for suffix in ('count', 'sum')}
+
+
+@pytest.fixture()
+async def metrics_client(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[AsyncClient]:
+    # fakeredis за клиентом приложения: время команд попадает в разбивку по зависимостям
+    redis = InstrumentedRedis(connection_pool=FakeRedis().connection_pool)
+    monkeypatch.setattr(db_redis, 'redis', redis, raising=False)
+
+    app = FastAPI()
+    app.add_middleware(MeasureLatencyMiddleware)
+
+    @app.get('/metrics-test/mem/{mem_id}')
+    async def get_mem(mem_id: int) -> Dict[str, int]:
+        if mem_id == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return {'id': mem_id}
+
+    @app.get('/metrics-test/stream')
+    async def stream() -> StreamingResponse:
+        async def chunks() -> AsyncIterator[bytes]:
+            for _ in range(CHUNKS):
+                await asyncio.sleep(CHUNK_DELAY)
+                yield b'x' * 10
+
+        return StreamingResponse(chunks())
+
+    @app.get('/metrics-test/redis')
+    async def touch_redis() -> Dict[str, int]:
+        redis = await get_redis()
+        await redis.set('metrics-test', 1)
+        return {'value': int(await redis.get('metrics-test'))}
+
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        yield client
+
+
+@pytest.mark.asyncio()
+async def test_route_template_label(metrics_client: AsyncClient) -> None:
+    endpoint = '/metrics-test/mem/{mem_id}'
+    before = get_requests(endpoint, status.HTTP_200_OK)
+
+    for mem_id in (1, 2, 3):
+        response = await metrics_client.get(f'/metrics-test/mem/{mem_id}')
+        assert response.status_code == status.HTTP_200_OK
+
+    assert get_requests(endpoint, status.HTTP_200_OK) - before == 3
+    assert get_requests('/metrics-test/mem/1', status.HTTP_200_OK) == 0
+
+
+@pytest.mark.asyncio()
+async def test_not_found_single_bucket(metrics_client: AsyncClient) -> None:
+    before_unmatched = get_requests(UNMATCHED_ENDPOINT, status.HTTP_404_NOT_FOUND)
+    before_route = get_requests('/metrics-test/mem/{mem_id}', status.HTTP_404_NOT_FOUND)
+
+    for path in ('/metrics-test/missing/1', '/metrics-test/missing/2', '/metrics-test/mem/1/extra'):
+        response = await metrics_client.get(path)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    # 404 из найденной ручки остается под ее шаблоном
+    response = await metrics_client.get('/metrics-test/mem/0')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    assert get_requests(UNMATCHED_ENDPOINT, status.HTTP_404_NOT_FOUND) - before_unmatched == 3
+    assert get_requests('/metrics-test/mem/{mem_id}', status.HTTP_404_NOT_FOUND) - before_route == 1
+    assert get_requests('/metrics-test/missing/1', status.HTTP_404_NOT_FOUND) == 0
+
+
+@pytest.mark.asyncio()
+async def test_streaming_response_timed(metrics_client: AsyncClient) -> None:
+    endpoint = '/metrics-test/stream'
+    latency_before = get_latency('api_request_latency_seconds', endpoint)
+    first_byte_before = get_latency('api_time_to_first_byte_seconds', endpoint)
+    size_before = get_latency('api_response_size_bytes', endpoint)
+
+    response = await metrics_client.get(endpoint)
+    assert response.content == b'x' * 10 * CHUNKS
+
+    latency = get_latency('api_request_latency_seconds', endpoint)
+    first_byte = get_latency('api_time_to_first_byte_seconds', endpoint)
+    size = get_latency('api_response_size_bytes', endpoint)
+
+    assert latency['count'] - latency_before['count'] == 1
+    assert first_byte['count'] - first_byte_before['count'] == 1
+    # время ручки включает отправку всего тела, а не только создание ответа
+    assert latency['sum'] - latency_before['sum'] >= CHUNK_DELAY * CHUNKS
+    assert first_byte['sum'] - first_byte_before['sum'] < latency['sum'] - latency_before['sum']
+    assert size['sum'] - size_before['sum'] == 10 * CHUNKS
+
+
+@pytest.mark.asyncio()
+async def test_server_timing_redis(metrics_client: AsyncClient) -> None:
+    endpoint = '/metrics-test/redis'
+    deps_before = get_sample('sirius_deps_latency_seconds_count', {'endpoint': endpoint})
+
+    for _ in range(2):
+        response = await metrics_client.get(endpoint)
+        assert response.status_code == status.HTTP_200_OK
+
+        server_timing = [metric.split(';')[0] for metric in response.headers['Server-Timing'].split(', ')]
+        assert server_timing == ['redis', 'app']
+
+    # одно наблюдение на запрос, а не на каждую команду Redis
+    assert get_sample('sirius_deps_latency_seconds_count', {'endpoint': endpoint}) - deps_before == 2
+
+
+@pytest.mark.asyncio()
+async def test_server_timing_without_deps(metrics_client: AsyncClient) -> None:
+    response = await metrics_client.get('/metrics-test/mem/1')
+
+    assert response.headers['Server-Timing'].startswith('app;dur=')
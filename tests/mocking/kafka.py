@@ -1,4 +1,5 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Tuple
 
 
 class TestKafkaProducer:
@@ -9,7 +10,22 @@ class TestKafkaProducer:
         self.kafka_received_messages.append(
             {
                 'topic': topic,
+                'key': key,
                 'value': value,
                 'partition': partition,
             }
         )
+
+    async def send(
+        self,
+        topic: str,
+        value: bytes | None = None,
+        key: bytes | None = None,
+        partition: int | None = None,
+        timestamp_ms: int | None = None,
+        headers: List[Tuple[str, bytes]] | None = None,
+    ) -> 'asyncio.Future[None]':
+        await self.send_and_wait(topic, value, key, partition, timestamp_ms, headers)
+        delivery = asyncio.get_running_loop().create_future()
+        delivery.set_result(None)
+        return delivery
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from typing import Tuple
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+
+from webapp.utils.http_range import if_range_matches, parse_range
+
+SIZE = 100
+
+ETAG = '"abc"'
+LAST_MODIFIED = datetime(2024, 1, 1, 12, 0, 0, 500, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    ('header', 'expected'),
+    [
+        ('bytes=0-9', (0, 9)),
+        ('bytes=10-10', (10, 10)),
+        # конец за пределами файла обрезается
+        ('bytes=90-200', (90, 99)),
+        ('bytes=-10', (90, 99)),
+        ('bytes=-200', (0, 99)),
+        ('bytes=95-', (95, 99)),
+        (' bytes=0- ', (0, 99)),
+    ],
+)
+def test_parse_range(header: str, expected: Tuple[int, int]) -> None:
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize(
+    'header',
+    [
+        # несколько диапазонов не поддерживаются - отдается файл целиком
+        'bytes=0-9,20-29',
+        'bytes=-',
+        'bytes=9-0',
+        'items=0-9',
+        'bytes=a-b',
+    ],
+)
+def test_parse_range_ignored(header: str) -> None:
+    assert parse_range(header, SIZE) is None
+
+
+@pytest.mark.parametrize(
+    ('header', 'size'),
+    [
+        ('bytes=100-', SIZE),
+        ('bytes=150-200', SIZE),
+        ('bytes=-0', SIZE),
+        ('bytes=-10', 0),
+    ],
+)
+def test_parse_range_not_satisfiable(header: str, size: int) -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range(header, size)
+
+    assert exc_info.value.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert exc_info.value.headers == {'Content-Range': f'bytes */{size}'}
+
+
+@pytest.mark.parametrize(
+    ('if_range', 'expected'),
+    [
+        (ETAG, True),
+        ('"stale"', False),
+        # слабый ETag не подходит, даже если совпадает
+        ('W/"abc"', False),
+        # Last-Modified передается с точностью до секунды
+        ('Mon, 01 Jan 2024 12:00:00 GMT', True),
+        ('Mon, 01 Jan 2024 11:59:59 GMT', False),
+        ('not a date', False),
+    ],
+)
+def test_if_range_matches(if_range: str, expected: bool) -> None:
+    assert if_range_matches(if_range, ETAG, LAST_MODIFIED) is expected
@@ -0,0 +1,18 @@
+from fastapi import Depends, Response
+from starlette import status
+
+from webapp.api.auth.router import auth_router
+from webapp.cache.redis.revoked_tokens import revoke_token
+from webapp.utils.auth.jwt import JwtTokenT, jwt_auth
+
+
+@auth_router.post(
+    '/logout',
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=['auth'],
+)
+async def logout(
+    access_token: JwtTokenT = Depends(jwt_auth.validate_token),
+) -> Response:
+    await revoke_token(access_token['uid'], access_token['exp'])
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,56 @@
+import uuid
+
+from fastapi import Depends, File, Query, UploadFile
+from fastapi.responses import ORJSONResponse
+from starlette import status
+
+from conf.config import settings
+from webapp.api.file.router import file_router
+from webapp.crud.resize import get_resize_status, resize_uploaded_image
+from webapp.schema.file.resize import ImageResizeResponse, ResizeStatusEnum
+from webapp.utils.auth.jwt import JwtTokenT, jwt_auth
+from webapp.utils.upload import ImageUpload
+
+
+@file_router.post(
+    '/resize',
+    response_model=ImageResizeResponse,
+    response_class=ORJSONResponse,
+    tags=['file'],
+    status_code=status.HTTP_200_OK,
+)
+async def resize_image(
+    width: int = Query(gt=0, le=settings.RESIZE_MAX_SIDE),
+    height: int = Query(gt=0, le=settings.RESIZE_MAX_SIDE),
+    image: UploadFile = File(...),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
+) -> ImageResizeResponse:
+    upload = await ImageUpload.open(image)
+
+    # картинку уменьшает воркер, ручка только ставит задачу в очередь
+    return await resize_uploaded_image(uuid.uuid4().hex, upload, width, height)
+
+
+@file_router.get(
+    '/resize/{mem_id}',
+    response_model=ImageResizeResponse,
+    response_class=ORJSONResponse,
+    tags=['file'],
+    status_code=status.HTTP_200_OK,
+)
+async def resize_status(
+    mem_id: str,
+    width: int = Query(gt=0, le=settings.RESIZE_MAX_SIDE),
+    height: int = Query(gt=0, le=settings.RESIZE_MAX_SIDE),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
+) -> ImageResizeResponse | ORJSONResponse:
+    job_status = await get_resize_status(mem_id, width, height)
+    if job_status is None:
+        return ORJSONResponse({'message': 'Задача не найдена'}, status_code=status.HTTP_404_NOT_FOUND)
+    # пока воркер не закончил - 202, чтобы клиент повторил запрос позже
+    if job_status == ResizeStatusEnum.queued:
+        return ORJSONResponse(
+            ImageResizeResponse(status=job_status, mem_id=mem_id).model_dump(mode='json'),
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+    return ImageResizeResponse(status=job_status, mem_id=mem_id)
@@ -0,0 +1,3 @@
+from fastapi import APIRouter
+
+file_router = APIRouter(prefix='/file')
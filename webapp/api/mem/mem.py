@@ -1,56 +1,116 @@
 import re
 import mimetypes
+from email.utils import format_datetime
 from typing import List
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit
 
-from fastapi import Depends, File, UploadFile
-from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi import Depends, File, Header, Query, UploadFile
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from miniopy_async.error import S3Error
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
+from starlette.background import BackgroundTask
 
 from conf.config import settings
 from webapp.api.mem.router import mem_router
+from webapp.cache.rabbit.queue import pull_mem_ids
 from webapp.crud.mem import (
     create_mem,
     download_mem_by_id,
+    get_cached_memes_by_ids,
     get_mem_by_id,
+    get_mem_download_url,
     get_memes_by_cart,
+    get_seen_stats,
     personal_cart,
     random_mem,
     rating_mem,
+    stream_memes_by_cart,
+    top_memes,
     trendy_mem,
 )
-from webapp.db.minio import minio_client
+from webapp.crud.resize import get_resize_variant, get_resized_mem_path
+from webapp.crud.vote import buffer_rating_mem
+from webapp.db.minio import ObjectStream, async_minio_client
 from webapp.db.postgres import get_session
+from webapp.db.replica import get_read_session, mark_user_write
 from webapp.models.sirius.mem_rating import LikeDislikeEnum
 from webapp.schema.enums import CartEnum
-from webapp.schema.mem.mem import MemAfterCreate, MemCreate, MemRead
+from webapp.schema.mem.mem import MemAfterCreate, MemCreate, MemPage, MemRead, MemSeenStats
 from webapp.utils.auth.jwt import JwtTokenT, jwt_auth
+from webapp.utils.http_range import if_range_matches, parse_range
 
 
 @mem_router.get(
-    '/', response_model=List[MemRead], response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK
+    '/', response_model=MemPage, response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK
 )
 async def get_memes(
     cart_type: CartEnum,
-    session: AsyncSession = Depends(get_session),
+    limit: int = Query(settings.MEM_PAGE_LIMIT, ge=1, le=settings.MEM_PAGE_LIMIT_MAX),
+    after: int | None = Query(None, ge=0),
+    stream: bool = False,
+    session: AsyncSession = Depends(get_read_session),
     current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
 ):
-    memes = await get_memes_by_cart(session=session, cart_type=cart_type, user_id=current_user['user_id'])
-    if memes:
-        return memes
+    if stream:
+        return StreamingResponse(
+            stream_memes_by_cart(session=session, cart_type=cart_type, user_id=current_user['user_id'], after=after),
+            media_type='application/x-ndjson',
+        )
+
+    page = await get_memes_by_cart(
+        session=session, cart_type=cart_type, user_id=current_user['user_id'], limit=limit, after=after
+    )
+    if page.items or after is not None:
+        return page
     return ORJSONResponse({'message': 'Доступных мемов нет'}, status_code=status.HTTP_200_OK)
 
 
 @mem_router.get(
-    '/random', response_model=MemRead, response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK
+    '/random',
+    response_model=MemRead | List[MemRead],
+    response_class=ORJSONResponse,
+    tags=['mem'],
+    status_code=status.HTTP_200_OK,
 )
 async def get_random_mem(
-    session: AsyncSession = Depends(get_session), current_user: JwtTokenT = Depends(jwt_auth.get_current_user)
+    count: int | None = Query(None, ge=1, le=settings.RANDOM_MEMES_COUNT_MAX),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
 ):
-    return await random_mem(session=session) or ORJSONResponse(
-        {'message': 'Доступных мемов нет'}, status_code=status.HTTP_200_OK
-    )
+    memes = await random_mem(session=session, count=count or 1, user_id=current_user['user_id'])
+    if not memes:
+        return ORJSONResponse({'message': 'Доступных мемов нет'}, status_code=status.HTTP_200_OK)
+    # без count сохраняем прежний ответ с одним мемом
+    return memes if count else memes[0]
+
+
+@mem_router.get(
+    '/random/seen',
+    response_model=MemSeenStats,
+    response_class=ORJSONResponse,
+    tags=['mem'],
+    status_code=status.HTTP_200_OK,
+)
+async def get_random_seen_stats(current_user: JwtTokenT = Depends(jwt_auth.get_current_user)) -> MemSeenStats:
+    return await get_seen_stats(user_id=current_user['user_id'])
+
+
+@mem_router.get(
+    '/feed',
+    response_model=List[MemRead],
+    response_class=ORJSONResponse,
+    tags=['mem'],
+    status_code=status.HTTP_200_OK,
+)
+async def get_feed(
+    count: int = Query(settings.MEM_FEED_COUNT, ge=1, le=settings.MEM_FEED_COUNT_MAX),
+    session: AsyncSession = Depends(get_session),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
+) -> List[MemRead]:
+    # сообщения подтверждаются только после того, как мемы собраны из кэша
+    async with pull_mem_ids(current_user['user_id'], count) as mem_ids:
+        return await get_cached_memes_by_ids(session=session, mem_ids=mem_ids)
 
 
 @mem_router.post(
@@ -67,6 +127,7 @@ async def upload_file(
     current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
 ):
     mem = await create_mem(session=session, body=body, file=file, user_id=current_user['user_id'])
+    await mark_user_write(current_user['user_id'])
     if mem:
         return mem
     return ORJSONResponse({'message': 'Невозможно выгрузить мем'}, status_code=status.HTTP_400_BAD_REQUEST)
@@ -80,19 +141,42 @@ async def upload_file(
     status_code=status.HTTP_200_OK,
 )
 async def get_trendy_mem(
-    session: AsyncSession = Depends(get_session), current_user: JwtTokenT = Depends(jwt_auth.get_current_user)
+    session: AsyncSession = Depends(get_read_session), current_user: JwtTokenT = Depends(jwt_auth.get_current_user)
 ):
     return await trendy_mem(session=session) or ORJSONResponse(
         {'message': 'Доступных мемов нет'}, status_code=status.HTTP_200_OK
     )
 
 
+@mem_router.get(
+    '/batch', response_model=List[MemRead], response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK
+)
+async def get_memes_batch(
+    ids: List[int] = Query(..., min_length=1, max_length=settings.MEM_BATCH_LIMIT_MAX),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
+) -> List[MemRead]:
+    return await get_cached_memes_by_ids(session=session, mem_ids=ids)
+
+
+@mem_router.get(
+    '/top', response_model=List[MemRead], response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK
+)
+async def get_top_memes(
+    n: int = Query(10, ge=1, le=settings.TOP_MEMES_LIMIT_MAX),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
+) -> List[MemRead]:
+    return await top_memes(session=session, offset=offset, n=n)
+
+
 @mem_router.get(
     '/{mem_id}', response_model=MemRead, response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK
 )
 async def get_mem(
     mem_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
 ):
     return await get_mem_by_id(session=session, mem_id=mem_id) or ORJSONResponse(
@@ -103,19 +187,94 @@ async def get_mem(
 @mem_router.get('/download/{mem_id}', response_class=ORJSONResponse, tags=['mem'], status_code=status.HTTP_200_OK)
 async def download_mem(
     mem_id: int,
+    width: int | None = Query(None, gt=0, le=settings.RESIZE_MAX_SIDE),
+    height: int | None = Query(None, gt=0, le=settings.RESIZE_MAX_SIDE),
+    range_header: str | None = Header(None, alias='Range'),
+    if_range: str | None = Header(None, alias='If-Range'),
     session: AsyncSession = Depends(get_session),
 ):
     record = await download_mem_by_id(session=session, mem_id=mem_id)
     if not record:
         return ORJSONResponse({'message': 'Нет данных'}, status_code=status.HTTP_404_NOT_FOUND)
+    if (width is None) != (height is None):
+        return ORJSONResponse({'message': 'Нужны оба размера'}, status_code=status.HTTP_400_BAD_REQUEST)
+    # ручка открыта без авторизации, поэтому копии делаются только заранее заданных размеров
+    if width and height and get_resize_variant(width, height) not in settings.RESIZE_ALLOWED_SIZES:
+        return ORJSONResponse(
+            {'message': f'Доступные размеры: {", ".join(settings.RESIZE_ALLOWED_SIZES)}'},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # уменьшенная копия отдается, когда воркер ее уже сделал, до этого - оригинал
+    photo_url, variant = record.photo_url, 'original'
+    if width and height:
+        resized_path = await get_resized_mem_path(mem_id, record.photo_url, width, height)
+        if resized_path:
+            photo_url, variant = resized_path, get_resize_variant(width, height)
 
-    response = minio_client.get_object(settings.BUCKET_NAME, record.photo_url)
-    match = re.search(r'[^/]+$', record.photo_url)
+    match = re.search(r'[^/]+$', photo_url)
     filename = match.group(0) if match else 'downloaded_file'
     media_type, _ = mimetypes.guess_type(filename)
     media_type = media_type or 'application/octet-stream'
-    headers = {'Content-Disposition': f"attachment; filename*=utf-8''{quote(filename)}"}
-    return StreamingResponse(response.stream(32 * 1024), media_type=media_type, headers=headers)
+    content_disposition = f"attachment; filename*=utf-8''{quote(filename)}"
+
+    # в режимах redirect и accel байты файла отдает MinIO или nginx, воркер только проверяет мем и подписывает ссылку
+    if settings.MEM_DOWNLOAD_MODE != 'stream':
+        public = settings.MEM_DOWNLOAD_MODE == 'redirect'
+        url = await get_mem_download_url(
+            mem_id,
+            photo_url,
+            {'response-content-type': media_type, 'response-content-disposition': content_disposition},
+            public=public,
+            variant=variant,
+        )
+        if public:
+            return RedirectResponse(url, status_code=status.HTTP_302_FOUND)
+
+        url_parts = urlsplit(url)
+        accel_path = f'{settings.MEM_DOWNLOAD_ACCEL_LOCATION}{url_parts.path}?{url_parts.query}'
+        return Response(
+            media_type=media_type,
+            headers={'X-Accel-Redirect': accel_path, 'Content-Disposition': content_disposition},
+        )
+
+    try:
+        stat = await async_minio_client.stat_object(settings.BUCKET_NAME, photo_url)
+    except S3Error:
+        return ORJSONResponse({'message': 'Нет данных'}, status_code=status.HTTP_404_NOT_FOUND)
+
+    etag = f'"{stat.etag}"'
+    headers = {
+        'Content-Disposition': content_disposition,
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+        'Last-Modified': format_datetime(stat.last_modified, usegmt=True),
+    }
+
+    # If-Range: диапазон отдается, только если файл не менялся, иначе - файл целиком
+    byte_range = None
+    if range_header and (if_range is None or if_range_matches(if_range, etag, stat.last_modified)):
+        byte_range = parse_range(range_header, stat.size)
+
+    if byte_range:
+        start, end = byte_range
+        stream = await ObjectStream(photo_url, offset=start, length=end - start + 1).open()
+        headers['Content-Range'] = f'bytes {start}-{end}/{stat.size}'
+        headers['Content-Length'] = str(end - start + 1)
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+    else:
+        stream = await ObjectStream(photo_url).open()
+        headers['Content-Length'] = str(stat.size)
+        status_code = status.HTTP_200_OK
+
+    # фоновая задача выполняется и после обрыва соединения клиентом - ответ MinIO не останется висеть
+    return StreamingResponse(
+        stream.iter_chunks(settings.MEM_DOWNLOAD_CHUNK_SIZE),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(stream.close),
+    )
 
 
 @mem_router.get(
@@ -127,6 +286,7 @@ async def add_to_cart(
     current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
 ):
     add = await personal_cart(session=session, mem_id=mem_id, user_id=current_user['user_id'])
+    await mark_user_write(current_user['user_id'])
     if add:
         return
     return ORJSONResponse({'message': 'Невозможно добавить в избранное'}, status_code=status.HTTP_200_OK)
@@ -145,6 +305,7 @@ async def mark_mem(
     session: AsyncSession = Depends(get_session),
     current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
 ):
-    return await rating_mem(
-        session=session, mem_id=mem_id, user_id=current_user['user_id'], mark=mark
-    ) or ORJSONResponse({'message': 'Нет данных'}, status_code=status.HTTP_200_OK)
+    vote = buffer_rating_mem if settings.VOTES_WRITE_BEHIND else rating_mem
+    mem = await vote(session=session, mem_id=mem_id, user_id=current_user['user_id'], mark=mark)
+    await mark_user_write(current_user['user_id'])
+    return mem or ORJSONResponse({'message': 'Нет данных'}, status_code=status.HTTP_200_OK)
@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Iterable, List, Tuple, TypeVar
+
+ValueT = TypeVar('ValueT')
+
+
+# LRU-кэш в памяти воркера с ограничением по размеру и по времени жизни записи
+class LocalCache(Generic[ValueT]):
+    def __init__(self, max_size: int, ttl: float, register: bool = True) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, Tuple[float, ValueT]] = OrderedDict()
+        # зарегистрированные кэши очищаются по событиям из канала инвалидации
+        if register:
+            local_caches.append(self)
+
+    def get(self, key: str) -> ValueT | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: ValueT, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+local_caches: List[LocalCache[Any]] = []
+
+
+def invalidate_local(keys: Iterable[str]) -> None:
+    keys = list(keys)
+    for cache in local_caches:
+        cache.delete(keys)
+
+
+def clear_local() -> None:
+    for cache in local_caches:
+        cache.clear()
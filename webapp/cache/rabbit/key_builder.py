@@ -1,5 +1,11 @@
+import re
+
 from conf.config import settings
 
 
 def get_user_memes_queue_key(user_id: int) -> str:
     return f'{settings.RABBIT_SIRIUS_USER_PREFIX}:{user_id}'
+
+
+def get_user_memes_queue_pattern() -> str:
+    return f'^{re.escape(settings.RABBIT_SIRIUS_USER_PREFIX)}:'
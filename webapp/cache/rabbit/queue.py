@@ -1,13 +1,102 @@
-from webapp.cache.rabbit.key_builder import get_user_memes_queue_key
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from aio_pika import DeliveryMode, Message
+from aio_pika.abc import AbstractIncomingMessage, AbstractQueue
+from aio_pika.exceptions import ChannelNotFoundEntity
+
+from conf.config import settings
+from webapp.cache.rabbit.key_builder import get_user_memes_queue_key, get_user_memes_queue_pattern
+from webapp.cache.redis.key_builder import get_declared_queues_key
 from webapp.db.rabbitmq import get_channel, get_exchange_users
+from webapp.db.redis import get_redis
+from webapp.utils.instrumentation import timed
+
+USER_QUEUE_POLICY_NAME = 'user-memes'
+
+
+def get_user_queue_policy() -> Dict[str, Any]:
+    # ограничения личных очередей задаются политикой RabbitMQ, а не аргументами объявления: аргументы уже
+    # существующей очереди поменять нельзя, повторное объявление с другими упадет с PRECONDITION_FAILED
+    return {
+        'pattern': get_user_memes_queue_pattern(),
+        'definition': {
+            'max-length': settings.RABBIT_USER_QUEUE_MAX_LENGTH,
+            'overflow': 'drop-head',
+            'message-ttl': settings.RABBIT_USER_QUEUE_MESSAGE_TTL_MS,
+        },
+        'apply-to': 'queues',
+    }
 
 
-async def declare_queue(user_id: int) -> None:
+async def declare_queue(user_id: int) -> AbstractQueue:
     channel = get_channel()
 
     queue_key = get_user_memes_queue_key(user_id)
 
     exchange_users = get_exchange_users()
-    queue = await channel.declare_queue(queue_key, auto_delete=False, durable=True)
+    with timed('rabbitmq', 'declare_queue'):
+        queue = await channel.declare_queue(queue_key, auto_delete=False, durable=True)
+
+        await queue.bind(exchange_users, queue_key)
+    return queue
+
+
+async def get_user_queue(user_id: int) -> AbstractQueue:
+    redis = await get_redis()
+
+    # объявленные очереди запоминаются в Redis, чтобы не ходить в RabbitMQ на каждый вход
+    if await redis.sismember(get_declared_queues_key(), user_id):
+        return await get_channel().get_queue(get_user_memes_queue_key(user_id), ensure=False)
+
+    queue = await declare_queue(user_id)
+    await redis.sadd(get_declared_queues_key(), user_id)
+    return queue
+
+
+async def forget_user_queue(user_id: int) -> None:
+    redis = await get_redis()
+    await redis.srem(get_declared_queues_key(), user_id)
+
+
+async def get_messages(queue: AbstractQueue, count: int) -> List[AbstractIncomingMessage]:
+    messages: List[AbstractIncomingMessage] = []
+    with timed('rabbitmq', 'get'):
+        while len(messages) < count:
+            message = await queue.get(no_ack=False, fail=False)
+            if message is None:
+                break
+            messages.append(message)
+    return messages
+
+
+async def publish_mem(mem_id: int) -> None:
+    # exchange users типа fanout - мем попадает в очередь каждого пользователя
+    message = Message(str(mem_id).encode(), delivery_mode=DeliveryMode.PERSISTENT)
+    with timed('rabbitmq', 'publish'):
+        await get_exchange_users().publish(message, routing_key='')
+
+
+@asynccontextmanager
+async def pull_mem_ids(user_id: int, count: int) -> AsyncIterator[List[int]]:
+    try:
+        messages = await get_messages(await get_user_queue(user_id), count)
+    except ChannelNotFoundEntity:
+        # очередь пропала из RabbitMQ (сброс, удаление вручную), а отметка в Redis осталась - объявляем заново;
+        # канал после ошибки восстанавливает RobustChannel, declare_queue дожидается его готовности
+        await forget_user_queue(user_id)
+        messages = await get_messages(await get_user_queue(user_id), count)
+
+    try:
+        # битые сообщения пропускаем, иначе они возвращались бы в очередь бесконечно
+        yield [int(message.body) for message in messages if message.body.isdigit()]
+    except BaseException:
+        # ответ не собрался - возвращаем мемы в очередь
+        with timed('rabbitmq', 'nack'):
+            await asyncio.gather(*(message.nack(requeue=True) for message in messages))
+        raise
 
-    await queue.bind(exchange_users, queue_key)
+    # канал общий, поэтому подтверждаем каждое сообщение отдельно, а не multiple=True
+    with timed('rabbitmq', 'ack'):
+        await asyncio.gather(*(message.ack() for message in messages))
@@ -0,0 +1,53 @@
+import os
+import uuid
+import asyncio
+from typing import List
+
+import orjson
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+
+from webapp.cache.local import clear_local, invalidate_local
+from webapp.cache.redis.key_builder import get_cache_invalidation_channel
+from webapp.db.redis import get_redis
+from webapp.logger import logger
+
+# id процесса, в котором загружен модуль; при preload_app он общий для всех воркеров gunicorn
+INSTANCE_ID = uuid.uuid4().hex
+
+RECONNECT_DELAY = 1.0
+
+listener: asyncio.Task[None]
+
+
+def get_worker_id() -> str:
+    # pid отличает воркеров, созданных fork после загрузки модуля
+    return f'{INSTANCE_ID}:{os.getpid()}'
+
+
+def publish_invalidation_in(pipe: Pipeline, keys: List[str]) -> None:
+    pipe.publish(get_cache_invalidation_channel(), orjson.dumps({'origin': get_worker_id(), 'keys': keys}))
+
+
+def handle_invalidation(raw: bytes) -> None:
+    data = orjson.loads(raw)
+    # свои же сообщения воркер пропускает: локальный кэш он уже обновил сам
+    if data['origin'] != get_worker_id():
+        invalidate_local(data['keys'])
+
+
+async def listen_invalidations() -> None:
+    redis = await get_redis()
+
+    while True:
+        try:
+            async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(get_cache_invalidation_channel())
+                # пока подписки не было, сообщения могли потеряться - начинаем с пустого локального кэша
+                clear_local()
+
+                async for message in pubsub.listen():
+                    handle_invalidation(message['data'])
+        except (RedisError, OSError):
+            logger.warning('Cache invalidation listener disconnected, reconnecting', exc_info=True)
+            await asyncio.sleep(RECONNECT_DELAY)
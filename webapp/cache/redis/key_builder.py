@@ -3,3 +3,89 @@ from conf.config import settings
 
 def get_file_resize_cache(mem_id: str) -> str:
     return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:file_resize:{mem_id}'
+
+
+def get_trendy_memes_key() -> str:
+    # v2: id мемов в рейтинге дополнены нулями, рейтинг в старом формате пересобирается заново
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:trendy_memes:v2'
+
+
+def get_trendy_memes_lock_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:trendy_memes:lock'
+
+
+def get_trendy_memes_recording_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:trendy_memes:recording'
+
+
+def get_trendy_memes_deltas_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:trendy_memes:deltas'
+
+
+def get_mem_cache_key(mem_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:mem:{mem_id}'
+
+
+def get_mem_download_cache_key(mem_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:mem_download:{mem_id}'
+
+
+def get_mem_download_url_key(mem_id: int, public: bool, variant: str = 'original') -> str:
+    host = 'public' if public else 'internal'
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:mem_download_url:{host}:{mem_id}:{variant}'
+
+
+def get_random_memes_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:random_memes'
+
+
+def get_random_memes_lock_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:random_memes:lock'
+
+
+def get_random_memes_added_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:random_memes:added'
+
+
+def get_seen_memes_key(user_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:seen_memes:{user_id}'
+
+
+def get_seen_memes_count_key(user_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:seen_memes:{user_id}:count'
+
+
+def get_cache_invalidation_channel() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:cache_invalidation'
+
+
+def get_vote_key(mem_id: int, user_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:vote:{mem_id}:{user_id}'
+
+
+def get_mem_counters_key(mem_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:mem_counters:{mem_id}'
+
+
+def get_pending_votes_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:votes:pending'
+
+
+def get_flushing_votes_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:votes:flushing'
+
+
+def get_votes_flush_lock_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:votes:lock'
+
+
+def get_revoked_tokens_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:revoked_tokens'
+
+
+def get_declared_queues_key() -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:declared_queues'
+
+
+def get_recent_write_key(user_id: int) -> str:
+    return f'{settings.REDIS_SIRIUS_CACHE_PREFIX}:recent_write:{user_id}'
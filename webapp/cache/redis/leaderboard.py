@@ -0,0 +1,130 @@
+from typing import Any, AsyncIterable, Dict, List
+
+from redis.asyncio.client import Pipeline
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import (
+    get_trendy_memes_deltas_key,
+    get_trendy_memes_key,
+    get_trendy_memes_lock_key,
+    get_trendy_memes_recording_key,
+)
+from webapp.cache.redis.lock import acquire_lock, release_lock
+from webapp.db.redis import get_redis
+
+# id в рейтинге дополнены нулями до ширины int4: при равном счете ZREVRANGE упорядочивает мемы по убыванию строки,
+# и это совпадает с ORDER BY likes DESC, id DESC запроса в Postgres, который отвечает, пока рейтинга нет
+MEM_ID_WIDTH = 10
+
+PLACEHOLDER_MEM_ID = 0
+
+# KEYS: рейтинг, признак записи изменений, изменения за время пересборки
+# Пока идет пересборка, изменения копятся отдельно: снимок из Postgres мог их не увидеть,
+# а RENAME снимка затирает то, что было записано в старый рейтинг. Копится не прирост, а итоговое число лайков
+# мема из Postgres: голос, который попал и в снимок, и в изменения, тогда не учитывается дважды.
+
+# мем добавляется, только если рейтинг уже построен: иначе появился бы неполный рейтинг из одного мема
+ADD_MEM_SCRIPT = '''
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('ZADD', KEYS[1], 'NX', ARGV[2], ARGV[1])
+end
+return 0
+'''
+
+# XX + INCR == атомарный ZINCRBY, который не создает неполный рейтинг, если ключа еще нет; ARGV: мем, прирост, лайки
+INCR_MEM_LIKES_SCRIPT = '''
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+end
+return redis.call('ZADD', KEYS[1], 'XX', 'INCR', ARGV[2], ARGV[1])
+'''
+
+# KEYS: рейтинг, признак записи изменений, изменения за время пересборки, построенный снимок; ARGV: токен пересборки
+FINISH_REBUILD_SCRIPT = '''
+redis.call('RENAME', KEYS[4], KEYS[1])
+local likes = redis.call('HGETALL', KEYS[3])
+for i = 1, #likes, 2 do
+    redis.call('ZADD', KEYS[1], likes[i + 1], likes[i])
+end
+redis.call('DEL', KEYS[3])
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[2])
+end
+return #likes / 2
+'''
+
+
+def to_member(mem_id: int) -> str:
+    return f'{mem_id:0{MEM_ID_WIDTH}d}'
+
+
+def get_script_keys() -> List[str]:
+    return [get_trendy_memes_key(), get_trendy_memes_recording_key(), get_trendy_memes_deltas_key()]
+
+
+async def add_mem(mem_id: int, likes: int = 0) -> None:
+    redis = await get_redis()
+    keys_and_args: List[Any] = [*get_script_keys(), to_member(mem_id), likes]
+    await redis.eval(ADD_MEM_SCRIPT, 3, *keys_and_args)
+
+
+def incr_mem_likes(pipe: Pipeline, mem_id: int, delta: int, likes: int) -> None:
+    # likes - число лайков после голоса, как его вернул Postgres
+    keys_and_args: List[Any] = [*get_script_keys(), to_member(mem_id), delta, likes]
+    pipe.eval(INCR_MEM_LIKES_SCRIPT, 3, *keys_and_args)
+
+
+async def get_top_mem_ids(offset: int, n: int) -> List[int] | None:
+    redis = await get_redis()
+    key = get_trendy_memes_key()
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.exists(key)
+        pipe.zrevrange(key, offset, offset + n - 1)
+        exists, members = await pipe.execute()
+
+    # None - рейтинг еще не построен, пустой список - в рейтинге больше нет мемов
+    if not exists:
+        return None
+    mem_ids = (int(member) for member in members)
+    return [mem_id for mem_id in mem_ids if mem_id != PLACEHOLDER_MEM_ID]
+
+
+async def start_recording(token: str) -> None:
+    redis = await get_redis()
+    # изменения, оставшиеся от прерванной пересборки, уже есть в Postgres
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(get_trendy_memes_deltas_key())
+        pipe.set(get_trendy_memes_recording_key(), token, ex=settings.TRENDY_MEMES_REBUILD_LOCK_TTL)
+        await pipe.execute()
+
+
+async def rebuild(chunks: AsyncIterable[Dict[int, int]]) -> bool:
+    redis = await get_redis()
+    key = get_trendy_memes_key()
+    lock_key = get_trendy_memes_lock_key()
+
+    token = await acquire_lock(lock_key, settings.TRENDY_MEMES_REBUILD_LOCK_TTL)
+    if token is None:
+        return False
+
+    # снимок у каждой пересборки свой: если блокировка истекла, параллельная пересборка его не испортит
+    tmp_key = f'{key}:rebuild:{token}'
+    try:
+        # изменения копятся еще до того, как открыта транзакция снимка: голос, который зафиксирован в Postgres
+        # до снимка, но дошел до Redis позже, не потеряется, а повтор его в снимке перекроется итоговыми лайками
+        await start_recording(token)
+        async for chunk in chunks:
+            await redis.zadd(tmp_key, {to_member(mem_id): likes for mem_id, likes in chunk.items()})
+        # пустой ZSET не хранится в Redis, поэтому для пустой корзины оставляем мем-заглушку с id 0
+        if not await redis.exists(tmp_key):
+            await redis.zadd(tmp_key, {to_member(PLACEHOLDER_MEM_ID): float('-inf')})
+        await redis.eval(FINISH_REBUILD_SCRIPT, 4, *get_script_keys(), tmp_key, token)
+    finally:
+        await redis.delete(tmp_key)
+        await release_lock(get_trendy_memes_recording_key(), token)
+        await release_lock(lock_key, token)
+    return True
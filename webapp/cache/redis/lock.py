@@ -0,0 +1,62 @@
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from redis.exceptions import RedisError
+
+from webapp.db.redis import get_redis
+from webapp.logger import logger
+
+# снимаем блокировку, только если она все еще наша
+RELEASE_LOCK_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+'''
+
+# продлеваем блокировку, только если она все еще наша
+EXTEND_LOCK_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+'''
+
+
+async def acquire_lock(key: str, ttl: float) -> str | None:
+    redis = await get_redis()
+    token = uuid.uuid4().hex
+    if await redis.set(key, token, nx=True, px=int(ttl * 1000)):
+        return token
+    return None
+
+
+async def release_lock(key: str, token: str) -> None:
+    redis = await get_redis()
+    await redis.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+
+
+async def extend_lock(key: str, token: str, ttl: float) -> bool:
+    redis = await get_redis()
+    return bool(await redis.eval(EXTEND_LOCK_SCRIPT, 1, key, token, int(ttl * 1000)))
+
+
+@asynccontextmanager
+async def keep_lock(key: str, token: str, ttl: float) -> AsyncIterator[None]:
+    # работа под блокировкой может идти дольше ее TTL - пока она идет, блокировка продлевается
+    async def renew() -> None:
+        while True:
+            await asyncio.sleep(ttl / 3)
+            try:
+                if not await extend_lock(key, token, ttl):
+                    return
+            except RedisError:
+                logger.warning('Lock %s was not extended', key, exc_info=True)
+
+    renewer = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        renewer.cancel()
@@ -0,0 +1,165 @@
+from typing import AsyncIterable, List, Tuple
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import (
+    get_random_memes_added_key,
+    get_random_memes_key,
+    get_random_memes_lock_key,
+    get_seen_memes_count_key,
+    get_seen_memes_key,
+)
+from webapp.cache.redis.lock import acquire_lock, release_lock
+from webapp.db.redis import get_redis
+
+PLACEHOLDER_MEM_ID = b'0'
+
+# KEYS: пул id, блокировка пересборки, мемы, добавленные за время пересборки
+# мем добавляется, только если пул уже построен: иначе случайный выбор шел бы из одного мема.
+# во время пересборки мем запоминается отдельно - снимок из Postgres мог его не застать
+ADD_MEM_SCRIPT = '''
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('SADD', KEYS[3], ARGV[1])
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('SADD', KEYS[1], ARGV[1])
+end
+return 0
+'''
+
+# KEYS: построенный снимок, пул id, мемы, добавленные за время пересборки
+FINISH_REBUILD_SCRIPT = '''
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('SUNIONSTORE', KEYS[1], KEYS[1], KEYS[3])
+    redis.call('DEL', KEYS[3])
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+return 1
+'''
+
+
+# KEYS: пул id, битовая карта просмотренных id пользователя, счетчик просмотренных
+# ARGV: сколько мемов нужно, число попыток выборки, доля просмотренного пула для сброса, TTL просмотров
+# SETBIT возвращает прежнее значение бита, поэтому проверка и пометка id как просмотренного атомарны
+SAMPLE_UNSEEN_SCRIPT = '''
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+
+local count = tonumber(ARGV[1])
+local picked = {}
+
+local function pick()
+    for _ = 1, tonumber(ARGV[2]) do
+        for _, mem_id in ipairs(redis.call('SRANDMEMBER', KEYS[1], count * 2)) do
+            if #picked == count then
+                return
+            end
+            if mem_id ~= '0' and redis.call('SETBIT', KEYS[2], mem_id, 1) == 0 then
+                picked[#picked + 1] = mem_id
+            end
+        end
+        if #picked == count then
+            return
+        end
+    end
+end
+
+pick()
+local seen = redis.call('INCRBY', KEYS[3], #picked)
+
+-- пользователь посмотрел почти весь пул: начинаем заново, сохранив только что выбранные мемы
+if #picked < count or seen >= redis.call('SCARD', KEYS[1]) * tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[2])
+    for _, mem_id in ipairs(picked) do
+        redis.call('SETBIT', KEYS[2], mem_id, 1)
+    end
+    pick()
+    redis.call('SET', KEYS[3], #picked)
+end
+
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return picked
+'''
+
+
+async def add_mem(mem_id: int) -> None:
+    redis = await get_redis()
+    await redis.eval(
+        ADD_MEM_SCRIPT, 3, get_random_memes_key(), get_random_memes_lock_key(), get_random_memes_added_key(), mem_id
+    )
+
+
+async def sample_mem_ids(count: int) -> List[int] | None:
+    redis = await get_redis()
+    key = get_random_memes_key()
+
+    # SRANDMEMBER с положительным count отдает различные id за O(count), не зависимо от размера пула
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.exists(key)
+        pipe.srandmember(key, count)
+        exists, mem_ids = await pipe.execute()
+
+    # None - пул еще не построен
+    if not exists:
+        return None
+    return [int(mem_id) for mem_id in mem_ids if mem_id != PLACEHOLDER_MEM_ID]
+
+
+async def sample_unseen_mem_ids(user_id: int, count: int) -> List[int] | None:
+    redis = await get_redis()
+
+    mem_ids = await redis.eval(
+        SAMPLE_UNSEEN_SCRIPT,
+        3,
+        get_random_memes_key(),
+        get_seen_memes_key(user_id),
+        get_seen_memes_count_key(user_id),
+        count,
+        settings.RANDOM_MEMES_SAMPLE_ATTEMPTS,
+        settings.RANDOM_MEMES_SEEN_RESET_RATIO,
+        settings.RANDOM_MEMES_SEEN_TTL,
+    )
+
+    # None - пул еще не построен
+    if mem_ids is None:
+        return None
+    return [int(mem_id) for mem_id in mem_ids]
+
+
+async def get_seen_stats(user_id: int) -> Tuple[int, int, int]:
+    redis = await get_redis()
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(get_seen_memes_count_key(user_id))
+        pipe.scard(get_random_memes_key())
+        # размер битовой карты в байтах: ~max(memes.id) / 8 на пользователя
+        pipe.strlen(get_seen_memes_key(user_id))
+        seen, pool, memory_bytes = await pipe.execute()
+
+    return int(seen or 0), pool, memory_bytes
+
+
+async def rebuild(chunks: AsyncIterable[List[int]]) -> bool:
+    redis = await get_redis()
+    key = get_random_memes_key()
+    lock_key = get_random_memes_lock_key()
+
+    token = await acquire_lock(lock_key, settings.RANDOM_MEMES_REBUILD_LOCK_TTL)
+    if token is None:
+        return False
+
+    # снимок у каждой пересборки свой: если блокировка истекла, параллельная пересборка его не испортит
+    tmp_key = f'{key}:rebuild:{token}'
+    try:
+        await redis.delete(get_random_memes_added_key())
+        async for chunk in chunks:
+            await redis.sadd(tmp_key, *chunk)
+        # пустое множество не хранится в Redis, поэтому для пустой корзины оставляем мем-заглушку с id 0
+        if not await redis.exists(tmp_key):
+            await redis.sadd(tmp_key, PLACEHOLDER_MEM_ID)
+        await redis.eval(FINISH_REBUILD_SCRIPT, 3, tmp_key, key, get_random_memes_added_key())
+    finally:
+        await redis.delete(tmp_key)
+        await release_lock(lock_key, token)
+    return True
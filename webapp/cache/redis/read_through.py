@@ -0,0 +1,226 @@
+import time
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Generic, List, Set, Tuple, Type, TypeVar
+
+import orjson
+from pydantic import BaseModel, ValidationError
+from redis.asyncio.client import Pipeline
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conf.config import settings
+from webapp.cache.local import LocalCache
+from webapp.cache.redis.invalidation import publish_invalidation_in
+from webapp.cache.redis.lock import acquire_lock, release_lock
+from webapp.db.postgres import async_session, is_replica, open_session_like
+from webapp.db.redis import get_redis
+from webapp.logger import logger
+from webapp.metrics import CACHE_REQUESTS
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+LoaderT = Callable[[AsyncSession], Awaitable[ModelT | None]]
+
+
+# Кэш в Redis поверх CRUD-чтения с защитой от лавины запросов в Postgres: значение хранится вместе с моментом,
+# до которого оно свежее, и еще CACHE_STALE_TTL секунд отдается устаревшим, пока обновляется в фоне.
+# Промахи по одному ключу внутри процесса схлопываются в одну загрузку со своей сессией, между воркерами - через
+# блокировку в Redis.
+# Перед Redis стоит локальный кэш воркера, его записи сбрасываются через pub/sub при изменении данных.
+class ReadThroughCache(Generic[ModelT]):
+    def __init__(self, name: str, model: Type[ModelT], ttl: int) -> None:
+        self.name = name
+        self.model = model
+        self.ttl = ttl
+        # загрузки по ключу и по тому, идут ли они в реплику
+        self._inflight: Dict[Tuple[str, bool], asyncio.Task[ModelT | None]] = {}
+        self._background: Set[asyncio.Task[ModelT | None]] = set()
+        self.local: LocalCache[ModelT] | None = (
+            LocalCache(settings.LOCAL_CACHE_MAX_SIZE, settings.LOCAL_CACHE_TTL)
+            if settings.LOCAL_CACHE_ENABLED
+            else None
+        )
+
+    async def get(self, key: str, loader: LoaderT[ModelT], session: AsyncSession) -> ModelT | None:
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        redis = await get_redis()
+        value, fresh = self._decode(await redis.get(key))
+
+        if value is not None:
+            if fresh:
+                CACHE_REQUESTS.labels(cache=self.name, result='hit').inc()
+                self._set_local(key, value)
+            else:
+                CACHE_REQUESTS.labels(cache=self.name, result='stale').inc()
+                self._refresh(key, loader)
+            return value
+
+        replica = is_replica(session)
+        inflight = self._get_inflight(key, replica)
+        if inflight is not None:
+            CACHE_REQUESTS.labels(cache=self.name, result='coalesced').inc()
+            return await asyncio.shield(inflight)
+
+        CACHE_REQUESTS.labels(cache=self.name, result='miss').inc()
+
+        # загрузку ждут и другие запросы, а запрос, который ее начал, может завершиться раньше нее,
+        # поэтому она идет в своей сессии к той же базе
+        async def load() -> ModelT | None:
+            async with open_session_like(session) as load_session:
+                return await self._load(key, loader, load_session, wait=True)
+
+        task = self._start((key, replica), load())
+        return await asyncio.shield(task)
+
+    async def get_many(self, keys: List[str]) -> List[ModelT | None]:
+        values = {key: self._get_local(key) for key in keys}
+        remote_keys = [key for key, value in values.items() if value is None]
+
+        if remote_keys:
+            redis = await get_redis()
+            for key, raw in zip(remote_keys, await redis.mget(remote_keys)):
+                value, fresh = self._decode(raw)
+                # устаревшее значение не отдаем: вызывающий дочитывает промахи одним запросом и обновляет их в кэше
+                if value is not None and fresh:
+                    CACHE_REQUESTS.labels(cache=self.name, result='hit').inc()
+                    self._set_local(key, value)
+                    values[key] = value
+                else:
+                    CACHE_REQUESTS.labels(cache=self.name, result='miss').inc()
+
+        return [values[key] for key in keys]
+
+    async def set(self, key: str, value: ModelT, changed: bool = False) -> None:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            self.set_in(pipe, key, value, changed)
+            await pipe.execute()
+
+    def set_in(self, pipe: Pipeline, key: str, value: ModelT, changed: bool = False) -> None:
+        raw, ex = self._encode(value)
+        pipe.set(key, raw, ex=ex)
+        self._set_local(key, value)
+
+        # данные изменились - остальные воркеры должны забыть свою локальную копию
+        if changed:
+            publish_invalidation_in(pipe, [key])
+
+    async def invalidate(self, keys: List[str]) -> None:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            self.invalidate_in(pipe, keys)
+            await pipe.execute()
+
+    def invalidate_in(self, pipe: Pipeline, keys: List[str]) -> None:
+        pipe.delete(*keys)
+        if self.local is not None:
+            self.local.delete(keys)
+        publish_invalidation_in(pipe, keys)
+
+    async def set_many(self, values: Dict[str, ModelT]) -> None:
+        if not values:
+            return
+
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                self.set_in(pipe, key, value)
+            await pipe.execute()
+
+    def _get_local(self, key: str) -> ModelT | None:
+        if self.local is None:
+            return None
+
+        value = self.local.get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(cache=self.name, result='local_hit').inc()
+        return value
+
+    def _set_local(self, key: str, value: ModelT) -> None:
+        if self.local is not None:
+            self.local.set(key, value)
+
+    def _encode(self, value: ModelT) -> Tuple[bytes, int]:
+        # разброс TTL, чтобы ключи, записанные одновременно, не истекали тоже одновременно
+        ttl = self.ttl * random.uniform(1 - settings.CACHE_TTL_JITTER, 1 + settings.CACHE_TTL_JITTER)
+        raw = orjson.dumps({'value': value.model_dump(mode='json'), 'fresh_until': time.time() + ttl})
+        return raw, int(ttl) + settings.CACHE_STALE_TTL
+
+    def _decode(self, raw: bytes | None) -> Tuple[ModelT | None, bool]:
+        if not raw:
+            return None, False
+        try:
+            data = orjson.loads(raw)
+            return self.model.model_validate(data['value']), data['fresh_until'] > time.time()
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValidationError):
+            # значение в старом формате считаем промахом, оно будет перезаписано
+            return None, False
+
+    def _get_inflight(self, key: str, replica: bool) -> asyncio.Task[ModelT | None] | None:
+        # читающий с реплики может дождаться загрузки из основной базы, но не наоборот: реплика может отставать
+        inflight = self._inflight.get((key, False))
+        if inflight is None and replica:
+            inflight = self._inflight.get((key, True))
+        return inflight
+
+    def _start(
+        self, inflight_key: Tuple[str, bool], coro: Coroutine[Any, Any, ModelT | None]
+    ) -> asyncio.Task[ModelT | None]:
+        task = asyncio.create_task(coro)
+        self._inflight[inflight_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        return task
+
+    def _refresh(self, key: str, loader: LoaderT[ModelT]) -> None:
+        if self._get_inflight(key, replica=False) is not None:
+            return
+
+        # запрос, который увидел устаревшее значение, уже ответит, поэтому фоновая загрузка открывает свою сессию
+        async def refresh() -> ModelT | None:
+            async with async_session() as session:
+                return await self._load(key, loader, session, wait=False)
+
+        task = self._start((key, False), refresh())
+        self._background.add(task)
+        task.add_done_callback(self._on_refreshed)
+
+    def _on_refreshed(self, task: asyncio.Task[ModelT | None]) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning('Cache %s refresh failed', self.name, exc_info=task.exception())
+
+    async def _load(self, key: str, loader: LoaderT[ModelT], session: AsyncSession, wait: bool) -> ModelT | None:
+        if not settings.CACHE_LOCK_ENABLED:
+            return await self._load_and_set(key, loader, session)
+
+        lock_key = f'{key}:lock'
+        token = await acquire_lock(lock_key, settings.CACHE_LOCK_TTL)
+        if token is not None:
+            try:
+                return await self._load_and_set(key, loader, session)
+            finally:
+                await release_lock(lock_key, token)
+
+        # значение уже загружает другой воркер
+        if not wait:
+            return None
+
+        redis = await get_redis()
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            value, _ = self._decode(await redis.get(key))
+            if value is not None:
+                CACHE_REQUESTS.labels(cache=self.name, result='coalesced').inc()
+                return value
+
+        # не дождались - загружаем сами, чтобы не отвечать ошибкой
+        return await self._load_and_set(key, loader, session)
+
+    async def _load_and_set(self, key: str, loader: LoaderT[ModelT], session: AsyncSession) -> ModelT | None:
+        value = await loader(session)
+        if value is not None and not is_replica(session):
+            await self.set(key, value)
+        return value
@@ -0,0 +1,66 @@
+import time
+import asyncio
+from typing import Dict
+
+from redis.exceptions import RedisError
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import get_revoked_tokens_key
+from webapp.db.redis import get_redis
+from webapp.logger import logger
+
+# KEYS: список отозванных токенов; ARGV: uid:exp, сколько секунд хранить запись
+# счет - время отзыва по часам Redis: у всех воркеров одни часы, и новые записи всегда в конце списка,
+# поэтому воркеры дочитывают только то, что появилось после прошлой синхронизации
+REVOKE_TOKEN_SCRIPT = '''
+local now = redis.call('TIME')
+local score = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZADD', KEYS[1], score, ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', score - tonumber(ARGV[2]))
+return tostring(score)
+'''
+
+# копия списка отозванных токенов в памяти воркера: uid токена -> его exp
+revoked: Dict[str, float] = {}
+
+# время отзыва последней прочитанной записи
+last_synced_score: float = float('-inf')
+
+syncer: asyncio.Task[None]
+
+
+def is_revoked(uid: str) -> bool:
+    return uid in revoked
+
+
+async def revoke_token(uid: str, exp: float) -> None:
+    redis = await get_redis()
+    # токен живет не дольше JWT_TOKEN_TTL, дольше хранить запись незачем
+    await redis.eval(REVOKE_TOKEN_SCRIPT, 1, get_revoked_tokens_key(), f'{uid}:{exp}', settings.JWT_TOKEN_TTL)
+    revoked[uid] = exp
+
+
+async def sync_revoked_tokens() -> None:
+    global last_synced_score
+
+    redis = await get_redis()
+    # границу включаем: записи с тем же временем отзыва могли появиться после прошлого чтения
+    tokens = await redis.zrangebyscore(get_revoked_tokens_key(), last_synced_score, '+inf', withscores=True)
+
+    for member, score in tokens:
+        uid, exp = member.decode().rsplit(':', 1)
+        revoked[uid] = float(exp)
+        last_synced_score = max(last_synced_score, score)
+
+    now = time.time()
+    for uid in [uid for uid, exp in revoked.items() if exp < now]:
+        del revoked[uid]
+
+
+async def run_revocation_sync() -> None:
+    while True:
+        try:
+            await sync_revoked_tokens()
+        except (RedisError, OSError):
+            logger.warning('Revoked tokens sync failed', exc_info=True)
+        await asyncio.sleep(settings.JWT_REVOCATION_SYNC_INTERVAL)
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Dict, Tuple
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import (
+    get_flushing_votes_key,
+    get_mem_counters_key,
+    get_pending_votes_key,
+    get_trendy_memes_deltas_key,
+    get_trendy_memes_key,
+    get_trendy_memes_recording_key,
+    get_vote_key,
+)
+from webapp.cache.redis.leaderboard import to_member
+from webapp.db.redis import get_redis
+
+NO_VOTE = 'none'
+
+# KEYS: текущая оценка пользователя, счетчики мема, буфер голосов для Postgres, рейтинг лайков,
+#       признак записи изменений рейтинга и лайки мемов, измененные за время пересборки
+# ARGV: оценка, поле буфера "mem_id:user_id", id мема в рейтинге, TTL состояния,
+#       и, если состояния в Redis еще нет, данные из Postgres: likes, dislikes, оценка пользователя
+# Без данных из Postgres скрипт возвращает nil, если их не хватает, и ничего не меняет.
+RECORD_VOTE_SCRIPT = '''
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if #ARGV < 7 then
+        return false
+    end
+    redis.call('HSET', KEYS[2], 'like', ARGV[5], 'dislike', ARGV[6])
+end
+
+local current = redis.call('GET', KEYS[1])
+if not current then
+    if #ARGV < 7 then
+        return false
+    end
+    current = ARGV[7]
+end
+
+-- повторная такая же оценка снимает голос, другая - заменяет его
+local new = ARGV[1]
+if current == new then
+    new = 'none'
+end
+
+if current ~= 'none' then
+    redis.call('HINCRBY', KEYS[2], current, -1)
+end
+if new ~= 'none' then
+    redis.call('HINCRBY', KEYS[2], new, 1)
+end
+
+redis.call('SET', KEYS[1], new, 'EX', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('HSET', KEYS[3], ARGV[2], new)
+
+local likes_delta = (new == 'like' and 1 or 0) - (current == 'like' and 1 or 0)
+if likes_delta ~= 0 then
+    redis.call('ZADD', KEYS[4], 'XX', 'INCR', likes_delta, ARGV[3])
+    if redis.call('EXISTS', KEYS[5]) == 1 then
+        redis.call('HSET', KEYS[6], ARGV[3], redis.call('HGET', KEYS[2], 'like'))
+    end
+end
+
+return redis.call('HMGET', KEYS[2], 'like', 'dislike')
+'''
+
+# Голоса сбрасываются в Postgres из отдельного ключа: если сброс не завершился, этот же снимок
+# будет повторно записан при следующем запуске, а новые голоса копятся в буфере отдельно
+TAKE_PENDING_SCRIPT = '''
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+return redis.call('HGETALL', KEYS[2])
+'''
+
+
+async def record_vote(
+    mem_id: int, user_id: int, mark: str, stored: Tuple[int, int, str] | None = None
+) -> Tuple[int, int] | None:
+    redis = await get_redis()
+
+    args = [mark, f'{mem_id}:{user_id}', to_member(mem_id), settings.VOTES_STATE_TTL]
+    if stored is not None:
+        args.extend(stored)
+
+    counters = await redis.eval(
+        RECORD_VOTE_SCRIPT,
+        6,
+        get_vote_key(mem_id, user_id),
+        get_mem_counters_key(mem_id),
+        get_pending_votes_key(),
+        get_trendy_memes_key(),
+        get_trendy_memes_recording_key(),
+        get_trendy_memes_deltas_key(),
+        *args,
+    )
+    if counters is None:
+        return None
+
+    likes, dislikes = counters
+    return int(likes), int(dislikes)
+
+
+async def take_pending() -> Dict[Tuple[int, int], str]:
+    redis = await get_redis()
+    pending = await redis.eval(TAKE_PENDING_SCRIPT, 2, get_pending_votes_key(), get_flushing_votes_key())
+
+    votes = {}
+    for field, mark in zip(pending[::2], pending[1::2]):
+        mem_id, user_id = field.split(b':')
+        votes[(int(mem_id), int(user_id))] = mark.decode()
+    return votes
+
+
+async def ack_pending() -> None:
+    redis = await get_redis()
+    await redis.delete(get_flushing_votes_key())
+
+
+flusher: asyncio.Task[None]
@@ -1,260 +1,474 @@
-import uuid
 import asyncio
-from datetime import datetime
-from typing import List, Optional
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
 
 import orjson
 from fastapi import HTTPException, UploadFile
-from sqlalchemy import case, func, insert, update
+from miniopy_async.commonconfig import REPLACE, CopySource
+from miniopy_async.error import S3Error
+from sqlalchemy import (
+    CTE,
+    Integer,
+    ScalarSelect,
+    Select,
+    any_,
+    bindparam,
+    case,
+    delete,
+    exists,
+    func,
+    literal,
+    null,
+    or_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from starlette import status
 
 from conf.config import settings
-from webapp.db.minio import minio_client
+from webapp.cache.rabbit.queue import publish_mem
+from webapp.cache.redis import leaderboard, random_memes
+from webapp.cache.redis.key_builder import get_mem_cache_key, get_mem_download_cache_key, get_mem_download_url_key
+from webapp.cache.redis.read_through import ReadThroughCache
+from webapp.db.minio import async_minio_client
+from webapp.db.postgres import async_session, is_replica
 from webapp.db.redis import get_redis
-from webapp.models.sirius.mem import Mem as SQLAMem
+from webapp.logger import logger
+from webapp.models.sirius.mem import Mem as SQLAMem, phash_band_column
 from webapp.models.sirius.mem_cart import MemCart as SQLAMemCart
+from webapp.models.sirius.mem_event import MemEvent as SQLAMemEvent, MemEventEnum
 from webapp.models.sirius.mem_rating import LikeDislikeEnum, MemRating as SQLAMemRating
-from webapp.schema.mem.mem import MemAfterCreate, MemCreate, MemDownload, MemRead
+from webapp.schema.mem.mem import MemAfterCreate, MemCreate, MemDownload, MemPage, MemRead, MemSeenStats
+from webapp.utils.phash import PHASH_BANDS, phash_band, phash_distance
+from webapp.utils.upload import ImageUpload
 
-REDIS_PREFIX = settings.REDIS_SIRIUS_CACHE_PREFIX
+mem_cache = ReadThroughCache('mem', MemRead, ttl=settings.MEM_CACHE_TTL)
+mem_download_cache = ReadThroughCache('mem_download', MemDownload, ttl=settings.MEM_CACHE_TTL)
 
 
-async def upload_file_to_minio(file: UploadFile, user_id: int) -> str:
-    bucket_name = settings.BUCKET_NAME
-
-    if not minio_client.bucket_exists(bucket_name):
-        minio_client.make_bucket(bucket_name)
-
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    unique_suffix = uuid.uuid4().hex
-    file_name = f'{file.filename.rsplit(".", 1)[0]}_{unique_suffix}.{file.filename.rsplit(".", 1)[-1]}'
-    file_path = f'{current_date}/{file_name}'
-
-    file_data = file.file.read()
-    file_size = len(file_data)
-    file.file.seek(0)
+async def upload_file_to_minio(upload: ImageUpload) -> str:
+    # имя объекта - хэш содержимого: повторно загруженная картинка не копируется, а ссылается на тот же объект.
+    # копирование объекта в себя обновляет last_modified, чтобы scripts/gc_images.py не удалил его, пока мем
+    # с этой ссылкой еще не записан
+    try:
+        await async_minio_client.copy_object(
+            settings.BUCKET_NAME,
+            upload.object_name,
+            CopySource(settings.BUCKET_NAME, upload.object_name),
+            metadata={'Content-Type': upload.content_type},
+            metadata_directive=REPLACE,
+        )
+        return upload.object_name
+    except S3Error as e:
+        if e.code != 'NoSuchKey':
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'ошибка в minio {str(e)}') from e
 
     try:
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            minio_client.put_object,
-            bucket_name,
-            file_path,
-            file.file,
-            file_size,
-            file.content_type,
+        # в памяти держится не больше одной части multipart-загрузки
+        await async_minio_client.put_object(
+            settings.BUCKET_NAME,
+            upload.object_name,
+            upload,
+            length=upload.size,
+            content_type=upload.content_type,
+            part_size=settings.MINIO_PART_SIZE,
+            num_parallel_uploads=1,
         )
-        return file_path
+        return upload.object_name
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f'ошибка в minio {str(e)}') from e
 
 
+async def find_similar_memes(session: AsyncSession, phash: int) -> List[int]:
+    # кандидаты ищутся по индексам частей хэша, точное расстояние Хэмминга считается уже по ним
+    bands = [phash_band_column(band) == phash_band(phash, band) for band in range(PHASH_BANDS)]
+    result = await session.execute(
+        select(SQLAMem.id, SQLAMem.phash).where(or_(*bands)).limit(settings.MEM_PHASH_MAX_CANDIDATES)
+    )
+    return [mem.id for mem in result.all() if phash_distance(mem.phash, phash) <= settings.MEM_PHASH_MAX_DISTANCE]
+
+
+async def fan_out_mem(mem_id: int) -> None:
+    # мем уже записан: сбой Redis или RabbitMQ не должен превращаться в ошибку, иначе клиент загрузит мем повторно.
+    # рейтинг и набор случайных мемов восстанавливаются пересборкой из Postgres
+    results = await asyncio.gather(
+        leaderboard.add_mem(mem_id), random_memes.add_mem(mem_id), publish_mem(mem_id), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning('Fan-out of new mem %s failed', mem_id, exc_info=result)
+
+
 async def create_mem(
     session: AsyncSession,
     body: MemCreate,
     file: UploadFile,
     user_id: int,
 ) -> MemAfterCreate | None:
-    minio_path = await upload_file_to_minio(file=file, user_id=user_id)
-    new_file = SQLAMem(text=body.text, photo_url=minio_path, user_id=user_id)
+    upload = await ImageUpload.open(file)
+    minio_path = await upload_file_to_minio(upload)
+    similar_mem_ids = await find_similar_memes(session, upload.phash) if upload.phash is not None else []
+
+    new_file = SQLAMem(text=body.text, photo_url=minio_path, user_id=user_id, phash=upload.phash)
     session.add(new_file)
+    await session.flush()
+    # мем, корзина и событие о создании фиксируются одной транзакцией
+    session.add(SQLAMemCart(user_id=user_id, cart_type='general', mem_id=new_file.id))
+    session.add(
+        SQLAMemEvent(
+            mem_id=new_file.id,
+            event_type=MemEventEnum.created,
+            payload={'user_id': user_id, 'photo_url': minio_path, 'similar_mem_ids': similar_mem_ids},
+        )
+    )
     await session.commit()
-    await session.refresh(new_file)
-    add_to_cart = SQLAMemCart(user_id=user_id, cart_type='general', mem_id=new_file.id)
-    session.add(add_to_cart)
-    await session.commit()
-    await session.refresh(add_to_cart)
-
-    return MemAfterCreate.model_validate(new_file)
+    await fan_out_mem(new_file.id)
 
+    mem = MemAfterCreate.model_validate(new_file)
+    mem.similar_mem_ids = similar_mem_ids
+    return mem
 
-async def get_mem_by_id(session: AsyncSession, mem_id: int) -> MemRead | None:
-    redis = await get_redis()
-    cached_mem_data = await redis.get(f'{REDIS_PREFIX}:mem:{mem_id}')
 
-    if cached_mem_data:
-        cached_mem = orjson.loads(cached_mem_data)
-        return MemRead.model_validate_json(cached_mem)
-
-    mem_query = (
-        select(
-            SQLAMem.id,
-            SQLAMem.text,
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.like, 1))).label('likes'),
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.dislike, 1))).label('dislikes'),
-        )
-        .outerjoin(SQLAMemRating, SQLAMemRating.mem_id == SQLAMem.id)
-        .where(SQLAMem.id == mem_id)
-        .group_by(SQLAMem.id)
-    )
+async def _load_mem(session: AsyncSession, mem_id: int) -> MemRead | None:
+    mem_query = select(SQLAMem.id, SQLAMem.text, SQLAMem.likes, SQLAMem.dislikes).where(SQLAMem.id == mem_id)
 
     result = await session.execute(mem_query)
     mem = result.fetchone()
-    if mem:
-        mem_read = MemRead.model_validate(mem)
-        await redis.set(f'{REDIS_PREFIX}:mem:{mem_id}', orjson.dumps(mem_read.model_dump_json()), 3600)
-        return mem_read
-    return None
+    return MemRead.model_validate(mem) if mem else None
+
+
+async def get_mem_by_id(session: AsyncSession, mem_id: int) -> MemRead | None:
+    return await mem_cache.get(get_mem_cache_key(mem_id), lambda s: _load_mem(s, mem_id), session)
 
 
-async def get_memes_by_cart(session: AsyncSession, cart_type: str, user_id: int) -> Optional[List[MemRead]]:
+def _memes_by_cart_query(cart_type: str, user_id: int, after: int | None = None) -> Select[Tuple[int, str, int, int]]:
     memes_query = (
-        select(
-            SQLAMem.id,
-            SQLAMem.text,
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.like, 1))).label('likes'),
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.dislike, 1))).label('dislikes'),
-        )
+        select(SQLAMem.id, SQLAMem.text, SQLAMem.likes, SQLAMem.dislikes)
         .join(SQLAMemCart, SQLAMem.id == SQLAMemCart.mem_id)
-        .outerjoin(SQLAMemRating, SQLAMem.id == SQLAMemRating.mem_id)
         .where(SQLAMemCart.cart_type == cart_type)
-        .group_by(SQLAMem.id)
+        .order_by(SQLAMem.id)
     )
 
     if cart_type == 'personal':
         memes_query = memes_query.where(SQLAMemCart.user_id == user_id)
 
-    result = await session.execute(memes_query)
-    memes = result.all()
-    mem_read_list = [MemRead.model_validate(mem) for mem in memes] if memes else None
+    # keyset-пагинация по memes.id
+    if after is not None:
+        memes_query = memes_query.where(SQLAMem.id > after)
 
-    return mem_read_list
+    return memes_query
 
 
-async def download_mem_by_id(session: AsyncSession, mem_id: int) -> MemDownload | None:
-    redis = await get_redis()
-    cache_key = f'{REDIS_PREFIX}:mem_download:{mem_id}'
-    cached_mem_data = await redis.get(cache_key)
+async def get_memes_by_cart(
+    session: AsyncSession, cart_type: str, user_id: int, limit: int, after: int | None = None
+) -> MemPage:
+    result = await session.execute(_memes_by_cart_query(cart_type, user_id, after).limit(limit))
+    items = [MemRead.model_validate(mem) for mem in result.all()]
+    next_after = items[-1].id if len(items) == limit else None
+
+    return MemPage(items=items, next_after=next_after)
+
 
-    if cached_mem_data:
-        cached_mem = orjson.loads(cached_mem_data)
-        return MemDownload.model_validate_json(cached_mem)
+async def stream_memes_by_cart(
+    session: AsyncSession, cart_type: str, user_id: int, after: int | None = None
+) -> AsyncIterator[bytes]:
+    memes_query = _memes_by_cart_query(cart_type, user_id, after).execution_options(
+        yield_per=settings.MEM_STREAM_YIELD_PER
+    )
+
+    # строки читаются серверным курсором пачками по yield_per и сразу уходят клиенту
+    result = await session.stream(memes_query)
+    async for mem in result:
+        yield orjson.dumps(MemRead.model_validate(mem).model_dump()) + b'\n'
 
+
+async def _load_mem_download(session: AsyncSession, mem_id: int) -> MemDownload | None:
     result = await session.execute(select(SQLAMem).where(SQLAMem.id == mem_id))
     mem = result.scalars().first()
-    if mem:
-        mem_download = MemDownload.model_validate(mem)
-        await redis.set(cache_key, orjson.dumps(mem_download.model_dump_json()), 3600)
-        return mem_download
-    return None
+    return MemDownload.model_validate(mem) if mem else None
 
 
-async def rating_mem(session: AsyncSession, mem_id: int, user_id: int, mark: LikeDislikeEnum) -> MemRead | None:
+async def download_mem_by_id(session: AsyncSession, mem_id: int) -> MemDownload | None:
+    return await mem_download_cache.get(
+        get_mem_download_cache_key(mem_id), lambda s: _load_mem_download(s, mem_id), session
+    )
+
+
+async def get_mem_download_url(
+    mem_id: int, photo_url: str, response_headers: Dict[str, str], public: bool, variant: str = 'original'
+) -> str:
     redis = await get_redis()
-    # начало транзакции
-    async with session.begin():
-        query = await session.execute(
-            select(SQLAMemRating).where(SQLAMemRating.mem_id == mem_id, SQLAMemRating.user_id == user_id)
+    key = get_mem_download_url_key(mem_id, public, variant)
+
+    url = await redis.get(key)
+    if url:
+        return url.decode()
+
+    # для редиректа ссылка подписывается на внешний адрес MinIO, для X-Accel-Redirect - на внутренний
+    url = await async_minio_client.presigned_get_object(
+        settings.BUCKET_NAME,
+        photo_url,
+        expires=timedelta(seconds=settings.MEM_DOWNLOAD_URL_TTL),
+        response_headers=response_headers,
+        change_host=settings.MINIO_PUBLIC_URL if public else None,
+    )
+    # в кэше ссылка живет половину своего срока, поэтому клиент всегда получает ее с запасом времени
+    await redis.set(key, url, ex=settings.MEM_DOWNLOAD_URL_TTL // 2)
+    return url
+
+
+def _rating_mem_query(mem_id: int, user_id: int, mark: LikeDislikeEnum) -> Select[Tuple[int, str, int, int, int]]:
+    other = LikeDislikeEnum.dislike if mark == LikeDislikeEnum.like else LikeDislikeEnum.like
+    counters = {LikeDislikeEnum.like: SQLAMem.likes, LikeDislikeEnum.dislike: SQLAMem.dislikes}
+    user_rating = (SQLAMemRating.mem_id == mem_id, SQLAMemRating.user_id == user_id)
+
+    # все CTE видят один снимок данных, поэтому на существующую оценку срабатывает ровно одна из веток:
+    # такая же оценка удаляется, противоположная меняется, а если оценки нет - она вставляется
+    deleted = (
+        delete(SQLAMemRating)
+        .where(*user_rating, SQLAMemRating.rating == mark)
+        .returning(SQLAMemRating.id)
+        .cte('deleted')
+    )
+    updated = (
+        update(SQLAMemRating)
+        .where(*user_rating, SQLAMemRating.rating == other)
+        .values(rating=mark)
+        .returning(SQLAMemRating.id)
+        .cte('updated')
+    )
+    # при гонке с параллельной вставкой той же оценки ON CONFLICT DO NOTHING оставит счетчики согласованными
+    inserted = (
+        insert(SQLAMemRating)
+        .from_select(
+            ['user_id', 'mem_id', 'rating'],
+            select(literal(user_id), SQLAMem.id, literal(mark, SQLAMemRating.rating.type)).where(
+                SQLAMem.id == mem_id, ~exists().where(*user_rating)
+            ),
         )
-        existing_rating = query.scalar_one_or_none()
-
-        if existing_rating:
-            # если оценка уже существует и совпадает, удаляем
-            if existing_rating.rating == mark:
-                await session.delete(existing_rating)
-            # если оценка уже существует, но не совпадает
-            else:
-                stmt = (
-                    update(SQLAMemRating)
-                    .where(SQLAMemRating.mem_id == mem_id, SQLAMemRating.user_id == user_id)
-                    .values(rating=mark)
-                )
-                await session.execute(stmt)
-        # если оценки от юзера для этого мема еще нет
-        else:
-            stmt = insert(SQLAMemRating).values(user_id=user_id, mem_id=mem_id, rating=mark)
-            await session.execute(stmt)
+        .on_conflict_do_nothing()
+        .returning(SQLAMemRating.id)
+        .cte('inserted')
+    )
 
-        # фиксация транзакции
-        await session.commit()
+    def count(cte: CTE) -> ScalarSelect[int]:
+        return select(func.count()).select_from(cte).scalar_subquery()
 
-    # удаляем из Redis после фиксации
-    await redis.delete(f'{REDIS_PREFIX}:mem:{mem_id}')
-    await redis.delete(f'{REDIS_PREFIX}:trendy_mem')
+    mark_delta = count(inserted) + count(updated) - count(deleted)
+    other_delta = -count(updated)
 
-    # повторно запрашиваем информацию о меме
-    async with session.begin():
-        stmt = (
-            select(
-                SQLAMem.id,
-                SQLAMem.text,
-                func.count(case((SQLAMemRating.rating == LikeDislikeEnum.like, 1))).label('likes'),
-                func.count(case((SQLAMemRating.rating == LikeDislikeEnum.dislike, 1))).label('dislikes'),
-            )
-            .outerjoin(SQLAMemRating, SQLAMem.id == SQLAMemRating.mem_id)
-            .where(SQLAMem.id == mem_id)
-            .group_by(SQLAMem.id)
+    mem = (
+        update(SQLAMem)
+        .where(SQLAMem.id == mem_id)
+        .values({counters[mark]: counters[mark] + mark_delta, counters[other]: counters[other] + other_delta})
+        .returning(
+            SQLAMem.id,
+            SQLAMem.text,
+            SQLAMem.likes,
+            SQLAMem.dislikes,
+            (mark_delta if mark == LikeDislikeEnum.like else other_delta).label('likes_delta'),
+            (count(inserted) + count(updated) + count(deleted)).label('changed'),
+        )
+        .cte('mem')
+    )
+    # событие для outbox пишется тем же запросом и только если оценка действительно изменилась
+    payload = func.jsonb_build_object(
+        literal('user_id'),
+        literal(user_id),
+        literal('mark'),
+        case((count(deleted) > 0, null()), else_=literal(mark.value)),
+        literal('likes'),
+        mem.c.likes,
+        literal('dislikes'),
+        mem.c.dislikes,
+    )
+    event = (
+        insert(SQLAMemEvent)
+        .from_select(
+            ['mem_id', 'event_type', 'payload'],
+            select(mem.c.id, literal(MemEventEnum.rated, SQLAMemEvent.event_type.type), payload).where(
+                mem.c.changed > 0
+            ),
         )
-        result = await session.execute(stmt)
+        .cte('event')
+    )
+
+    return select(mem.c.id, mem.c.text, mem.c.likes, mem.c.dislikes, mem.c.likes_delta).add_cte(event)
+
+
+async def rating_mem(session: AsyncSession, mem_id: int, user_id: int, mark: LikeDislikeEnum) -> MemRead | None:
+    # переключение оценки, пересчет счетчиков и запись события - один запрос, который сразу возвращает свежие значения
+    async with session.begin():
+        result = await session.execute(_rating_mem_query(mem_id, user_id, mark))
         mem = result.fetchone()
 
-    if mem:
-        mem_read = MemRead.model_validate(mem)
-        await redis.set(f'{REDIS_PREFIX}:mem:{mem_id}', orjson.dumps(mem_read.model_dump_json()), ex=3600)
-        return mem_read
-    else:
-        return None
+    cache_key = get_mem_cache_key(mem_id)
+    redis = await get_redis()
+    # кэш мема, рейтинг лайков и сброс локальных кэшей уходят в Redis одним пайплайном
+    async with redis.pipeline(transaction=False) as pipe:
+        if mem:
+            mem_read = MemRead.model_validate(mem)
+            mem_cache.set_in(pipe, cache_key, mem_read, changed=True)
+            if mem.likes_delta:
+                leaderboard.incr_mem_likes(pipe, mem_id, mem.likes_delta, mem.likes)
+        else:
+            mem_read = None
+            mem_cache.invalidate_in(pipe, [cache_key])
+        await pipe.execute()
+
+    return mem_read
+
+
+async def get_memes_by_ids(session: AsyncSession, mem_ids: List[int]) -> List[MemRead]:
+    if not mem_ids:
+        return []
+
+    # один параметр-массив вместо IN (...) - текст запроса не зависит от количества id
+    mem_ids_param = bindparam('mem_ids', list(set(mem_ids)), type_=ARRAY(Integer))
+    result = await session.execute(
+        select(SQLAMem.id, SQLAMem.text, SQLAMem.likes, SQLAMem.dislikes).where(SQLAMem.id == any_(mem_ids_param))
+    )
+    memes = {mem.id: MemRead.model_validate(mem) for mem in result.all()}
+
+    return [memes[mem_id] for mem_id in mem_ids if mem_id in memes]
+
+
+async def get_cached_memes_by_ids(session: AsyncSession, mem_ids: List[int]) -> List[MemRead]:
+    if not mem_ids:
+        return []
+
+    cached_memes = await mem_cache.get_many([get_mem_cache_key(mem_id) for mem_id in mem_ids])
+    memes = {mem_id: mem_read for mem_id, mem_read in zip(mem_ids, cached_memes) if mem_read is not None}
+
+    # промахи кэша добираем одним запросом и одним пайплайном в Redis
+    missed_memes = await get_memes_by_ids(session, [mem_id for mem_id in mem_ids if mem_id not in memes])
+    if not is_replica(session):
+        await mem_cache.set_many({get_mem_cache_key(mem_read.id): mem_read for mem_read in missed_memes})
+    memes.update((mem_read.id, mem_read) for mem_read in missed_memes)
+
+    return [memes[mem_id] for mem_id in mem_ids if mem_id in memes]
+
+
+async def _rebuild_on_primary(rebuild: Callable[[AsyncSession], Awaitable[bool]], session: AsyncSession) -> bool:
+    # снимок с отстающей реплики потерял бы оценки, сделанные за время отставания
+    if not is_replica(session):
+        return await rebuild(session)
+    async with async_session() as primary:
+        return await rebuild(primary)
+
+
+async def rebuild_random_memes(session: AsyncSession) -> bool:
+    mem_ids_query = (
+        select(SQLAMemCart.mem_id)
+        .where(SQLAMemCart.cart_type == 'general')
+        .execution_options(yield_per=settings.MEM_STREAM_YIELD_PER)
+    )
+
+    async def chunks() -> AsyncIterator[List[int]]:
+        result = await session.stream_scalars(mem_ids_query)
+        async for partition in result.partitions():
+            yield list(partition)
+
+    return await random_memes.rebuild(chunks())
 
 
-async def random_mem(session: AsyncSession) -> MemRead | None:
+async def _sample_mem_ids(count: int, user_id: int | None) -> List[int] | None:
+    # для пользователя выбираем только мемы, которые он еще не видел
+    if user_id is not None and settings.RANDOM_MEMES_SKIP_SEEN:
+        return await random_memes.sample_unseen_mem_ids(user_id, count)
+    return await random_memes.sample_mem_ids(count)
+
+
+async def random_mem(session: AsyncSession, count: int = 1, user_id: int | None = None) -> List[MemRead]:
+    mem_ids = await _sample_mem_ids(count, user_id)
+    # холодный старт: строим пул id из Postgres, если это уже не делает другой запрос
+    if mem_ids is None and await _rebuild_on_primary(rebuild_random_memes, session):
+        mem_ids = await _sample_mem_ids(count, user_id)
+
+    if mem_ids is not None:
+        return await get_cached_memes_by_ids(session, mem_ids)
+
+    # пул еще строится - разово выбираем случайные мемы в Postgres
     random_mem_query = (
-        select(
-            SQLAMem.id,
-            SQLAMem.text,
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.like, 1))).label('likes'),
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.dislike, 1))).label('dislikes'),
-        )
+        select(SQLAMem.id, SQLAMem.text, SQLAMem.likes, SQLAMem.dislikes)
         .join(SQLAMemCart, SQLAMem.id == SQLAMemCart.mem_id)
-        .outerjoin(SQLAMemRating, SQLAMem.id == SQLAMemRating.mem_id)
         .where(SQLAMemCart.cart_type == 'general')
-        .group_by(SQLAMem.id)
         .order_by(func.random())
-        .limit(1)
+        .limit(count)
     )
-    random_mem = await session.execute(random_mem_query)
-    mem = random_mem.fetchone() if random_mem else None
-    return MemRead.model_validate(mem) if mem else None
+    result = await session.execute(random_mem_query)
+    return [MemRead.model_validate(mem) for mem in result.all()]
 
 
-async def trendy_mem(session: AsyncSession) -> MemRead | None:
-    redis = await get_redis()
-    cache_key = f'{REDIS_PREFIX}:trendy_mem'
-    cached_mem_data = await redis.get(cache_key)
+async def get_seen_stats(user_id: int) -> MemSeenStats:
+    seen, pool, memory_bytes = await random_memes.get_seen_stats(user_id)
+    return MemSeenStats(seen=seen, pool=pool, memory_bytes=memory_bytes)
 
-    if cached_mem_data:
-        cached_mem = orjson.loads(cached_mem_data)
-        return MemRead.model_validate_json(cached_mem)
 
-    trendy_mem_query = (
-        select(
-            SQLAMem.id,
-            SQLAMem.text,
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.like, 1))).label('likes'),
-            func.count(case((SQLAMemRating.rating == LikeDislikeEnum.dislike, 1))).label('dislikes'),
-        )
+async def rebuild_trendy_memes(session: AsyncSession) -> bool:
+    scores_query = (
+        select(SQLAMem.id, SQLAMem.likes)
+        .join(SQLAMemCart, SQLAMem.id == SQLAMemCart.mem_id)
+        .where(SQLAMemCart.cart_type == 'general')
+        .execution_options(yield_per=settings.MEM_STREAM_YIELD_PER)
+    )
+
+    async def chunks() -> AsyncIterator[Dict[int, int]]:
+        result = await session.stream(scores_query)
+        async for partition in result.partitions():
+            yield {row.id: row.likes for row in partition}
+
+    return await leaderboard.rebuild(chunks())
+
+
+async def _top_mem_ids(session: AsyncSession, offset: int, n: int) -> List[int] | None:
+    mem_ids = await leaderboard.get_top_mem_ids(offset, n)
+    # холодный старт: строим рейтинг из Postgres, если это уже не делает другой запрос
+    if mem_ids is None and await _rebuild_on_primary(rebuild_trendy_memes, session):
+        mem_ids = await leaderboard.get_top_mem_ids(offset, n)
+    return mem_ids
+
+
+async def _top_memes_from_db(session: AsyncSession, offset: int, n: int) -> List[MemRead]:
+    # рейтинг еще строится - отвечаем напрямую из Postgres по индексу memes.likes
+    top_query = (
+        select(SQLAMem.id, SQLAMem.text, SQLAMem.likes, SQLAMem.dislikes)
         .join(SQLAMemCart, SQLAMem.id == SQLAMemCart.mem_id)
-        .outerjoin(SQLAMemRating, SQLAMem.id == SQLAMemRating.mem_id)
         .where(SQLAMemCart.cart_type == 'general')
-        .group_by(SQLAMem.id)
-        .order_by(func.count(case((SQLAMemRating.rating == LikeDislikeEnum.like, 1))).desc())
-        .limit(1)
+        .order_by(SQLAMem.likes.desc(), SQLAMem.id.desc())
+        .offset(offset)
+        .limit(n)
     )
-    trendy_mem = await session.execute(trendy_mem_query)
-    mem = trendy_mem.fetchone() if trendy_mem else None
+    result = await session.execute(top_query)
+    return [MemRead.model_validate(mem) for mem in result.all()]
+
 
-    if mem:
-        mem_read = MemRead.model_validate(mem)
-        await redis.set(cache_key, orjson.dumps(mem_read.model_dump_json()), 3600)
-        return mem_read
-    return None
+async def top_memes(session: AsyncSession, offset: int, n: int) -> List[MemRead]:
+    mem_ids = await _top_mem_ids(session, offset, n)
+    if mem_ids is None:
+        return await _top_memes_from_db(session, offset, n)
+    return await get_cached_memes_by_ids(session, mem_ids)
+
+
+async def trendy_mem(session: AsyncSession) -> MemRead | None:
+    mem_ids = await _top_mem_ids(session, offset=0, n=1)
+    if mem_ids is None:
+        memes = await _top_memes_from_db(session, offset=0, n=1)
+        return memes[0] if memes else None
+    return await get_mem_by_id(session, mem_ids[0]) if mem_ids else None
 
 
 async def personal_cart(session: AsyncSession, user_id: int, mem_id: int) -> bool:
     add_mem = SQLAMemCart(user_id=user_id, mem_id=mem_id, cart_type='personal')
     session.add(add_mem)
+    session.add(
+        SQLAMemEvent(
+            mem_id=mem_id, event_type=MemEventEnum.added_to_cart, payload={'user_id': user_id, 'cart_type': 'personal'}
+        )
+    )
     try:
         await session.commit()
         return True
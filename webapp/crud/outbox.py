@@ -0,0 +1,80 @@
+import asyncio
+
+import orjson
+from aiokafka.errors import KafkaError
+from sqlalchemy import BigInteger, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conf.config import settings
+from webapp.db import kafka
+from webapp.db.postgres import async_session
+from webapp.logger import logger
+from webapp.models.sirius.mem_event import MemEvent as SQLAMemEvent
+
+# ключ advisory-блокировки публикации outbox
+OUTBOX_LOCK_ID = 160516
+
+
+async def publish_mem_events(session: AsyncSession) -> int:
+    async with session.begin():
+        # публикует один воркер за раз: при параллельном разборе outbox события одного мема могли бы
+        # уйти в Kafka не по порядку. Блокировка снимается вместе с транзакцией
+        if not await session.scalar(select(func.pg_try_advisory_xact_lock(OUTBOX_LOCK_ID))):
+            return 0
+
+        result = await session.execute(
+            select(
+                SQLAMemEvent.id,
+                SQLAMemEvent.mem_id,
+                SQLAMemEvent.event_type,
+                SQLAMemEvent.payload,
+                SQLAMemEvent.created_at,
+            )
+            .order_by(SQLAMemEvent.id)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+        )
+        events = result.all()
+        if not events:
+            return 0
+
+        # send только ставит сообщение в пачку продюсера, поэтому порядок вызовов - порядок в партиции;
+        # подтверждения ждем уже для всей пачки. Ключ - id мема, чтобы его события шли в одну партицию
+        producer = kafka.get_producer()
+        deliveries = [
+            await producer.send(
+                settings.KAFKA_MEM_EVENTS_TOPIC,
+                value=orjson.dumps(
+                    {
+                        'id': event.id,
+                        'type': event.event_type.value,
+                        'mem_id': event.mem_id,
+                        'payload': event.payload,
+                        'created_at': event.created_at,
+                    }
+                ),
+                key=str(event.mem_id).encode(),
+            )
+            for event in events
+        ]
+        await asyncio.gather(*deliveries)
+
+        event_ids_param = bindparam('event_ids', [event.id for event in events], type_=ARRAY(BigInteger))
+        await session.execute(delete(SQLAMemEvent).where(SQLAMemEvent.id == any_(event_ids_param)))
+
+    return len(events)
+
+
+async def run_outbox_publisher() -> None:
+    while True:
+        published = 0
+        try:
+            async with async_session() as session:
+                published = await publish_mem_events(session)
+        except (KafkaError, SQLAlchemyError):
+            logger.exception('Mem events publish failed, will retry')
+
+        # полная пачка - в outbox, скорее всего, есть еще события, забираем их сразу
+        if published < settings.OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_MS / 1000)
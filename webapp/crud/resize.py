@@ -0,0 +1,119 @@
+from typing import Any, Dict
+
+import msgpack
+from aiokafka.errors import KafkaError
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import get_file_resize_cache
+from webapp.db import kafka
+from webapp.db.minio import async_minio_client
+from webapp.db.redis import get_redis
+from webapp.logger import logger
+from webapp.schema.file.resize import ImageResizeResponse, ResizeStatusEnum
+from webapp.utils.upload import ImageUpload
+
+# KEYS: хэш статусов; ARGV: размер, статус queued, статус failed, TTL хэша, через сколько секунд поставить
+# задачу в статусе queued повторно
+# Задачу ставит только первый запрос, а после ошибки воркера или потери задачи - первый следующий. Время постановки
+# по часам Redis хранится в поле "{размер}:queued_at". Возвращает 1, если задача поставлена этим вызовом,
+# иначе текущий статус.
+QUEUE_VARIANT_SCRIPT = '''
+local status = redis.call('HGET', KEYS[1], ARGV[1])
+local now = tonumber(redis.call('TIME')[1])
+local queued_at_field = ARGV[1] .. ':queued_at'
+if status == ARGV[2] then
+    local queued_at = tonumber(redis.call('HGET', KEYS[1], queued_at_field))
+    if queued_at and now - queued_at < tonumber(ARGV[5]) then
+        return status
+    end
+elseif status and status ~= ARGV[3] then
+    return status
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2], queued_at_field, now)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+'''
+
+
+def get_resize_variant(width: int, height: int) -> str:
+    return f'{width}x{height}'
+
+
+def get_resized_path(mem_id: str, variant: str) -> str:
+    return f'resized/{mem_id}/{variant}.jpg'
+
+
+def get_resize_upload_path(mem_id: str) -> str:
+    return f'resized/{mem_id}/upload'
+
+
+def get_queued_at_field(variant: str) -> str:
+    return f'{variant}:queued_at'
+
+
+async def send_resize_job(job: Dict[str, Any]) -> None:
+    await kafka.get_producer().send_and_wait(
+        settings.KAFKA_TOPIC, value=msgpack.packb(job), partition=kafka.get_partition()
+    )
+
+
+async def resize_uploaded_image(mem_id: str, upload: ImageUpload, width: int, height: int) -> ImageResizeResponse:
+    # сама картинка в сообщение не кладется: она больше лимита размера сообщения Kafka, воркер читает ее из MinIO
+    upload_path = get_resize_upload_path(mem_id)
+    await async_minio_client.put_object(
+        settings.BUCKET_NAME,
+        upload_path,
+        upload,
+        length=upload.size,
+        content_type=upload.content_type,
+        part_size=settings.MINIO_PART_SIZE,
+        num_parallel_uploads=1,
+    )
+    # id задачи новый, поэтому проверять повторную постановку не нужно; статус queued записывается до отправки,
+    # чтобы задача в очереди отличалась от неизвестной
+    await set_resize_status(mem_id, width, height, ResizeStatusEnum.queued)
+    await send_resize_job({'upload_path': upload_path, 'mem_id': mem_id, 'width': width, 'height': height})
+    return ImageResizeResponse(status=ResizeStatusEnum.queued, mem_id=mem_id)
+
+
+async def get_resize_status(mem_id: str, width: int, height: int) -> ResizeStatusEnum | None:
+    redis = await get_redis()
+    status = await redis.hget(get_file_resize_cache(mem_id), get_resize_variant(width, height))
+    return ResizeStatusEnum(status.decode()) if status else None
+
+
+async def set_resize_status(mem_id: str, width: int, height: int, status: ResizeStatusEnum) -> None:
+    redis = await get_redis()
+    key = get_file_resize_cache(mem_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(key, get_resize_variant(width, height), status.value)
+        pipe.hdel(key, get_queued_at_field(get_resize_variant(width, height)))
+        pipe.expire(key, settings.RESIZE_STATUS_TTL)
+        await pipe.execute()
+
+
+async def get_resized_mem_path(mem_id: int, photo_url: str, width: int, height: int) -> str | None:
+    redis = await get_redis()
+    key = get_file_resize_cache(str(mem_id))
+    variant = get_resize_variant(width, height)
+
+    status = await redis.eval(
+        QUEUE_VARIANT_SCRIPT,
+        1,
+        key,
+        variant,
+        ResizeStatusEnum.queued.value,
+        ResizeStatusEnum.failed.value,
+        settings.RESIZE_STATUS_TTL,
+        settings.RESIZE_REQUEUE_AFTER,
+    )
+    if status == 1:
+        try:
+            await send_resize_job({'photo_url': photo_url, 'mem_id': str(mem_id), 'width': width, 'height': height})
+        except KafkaError:
+            # задача не ушла - снимаем отметку, чтобы ее поставил следующий запрос; пока отдается оригинал
+            logger.warning('Resize job for mem %s %s was not sent', mem_id, variant, exc_info=True)
+            await redis.hdel(key, variant, get_queued_at_field(variant))
+        return None
+
+    return get_resized_path(str(mem_id), variant) if status == ResizeStatusEnum.done.value.encode() else None
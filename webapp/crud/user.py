@@ -1,4 +1,7 @@
+import hmac
+
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from webapp.models.sirius.user import User
@@ -10,20 +13,18 @@ async def get_user_by_username(session: AsyncSession, user_info: UserLogin) -> U
     return (await session.scalars(select(User).where(User.username == user_info.username))).one_or_none()
 
 
-async def get_user(session: AsyncSession, user_info: UserLogin) -> User | None:
-    return (
-        await session.scalars(
-            select(User).where(
-                User.username == user_info.username,
-                User.code == hash_password(user_info.code),
-            )
-        )
-    ).one_or_none()
+def check_password(user: User, user_info: UserLogin) -> bool:
+    return hmac.compare_digest(user.code, hash_password(user_info.code))
 
 
 async def register_user(session: AsyncSession, user_info: UserLogin) -> User:
-    new_user = User(username=user_info.username, tg=user_info.tg, code=hash_password(user_info.code))
-    session.add(new_user)
+    # при одновременной регистрации вернется уже вставленная строка, пароль затем сверяется как при входе
+    insert_query = (
+        insert(User)
+        .values(username=user_info.username, tg=user_info.tg, code=hash_password(user_info.code))
+        .on_conflict_do_update(index_elements=[User.username], set_={'username': User.username})
+        .returning(User)
+    )
+    new_user = (await session.scalars(insert_query)).one()
     await session.commit()
-    await session.refresh(new_user)
     return new_user
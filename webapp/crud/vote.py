@@ -0,0 +1,159 @@
+import asyncio
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+from redis.exceptions import RedisError
+from sqlalchemy import Integer, and_, any_, bindparam, delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conf.config import settings
+from webapp.cache.redis import votes
+from webapp.cache.redis.key_builder import get_mem_cache_key, get_votes_flush_lock_key
+from webapp.cache.redis.lock import acquire_lock, extend_lock, keep_lock, release_lock
+from webapp.crud.mem import get_mem_by_id, mem_cache
+from webapp.db.postgres import async_session
+from webapp.logger import logger
+from webapp.models.sirius.mem import Mem as SQLAMem
+from webapp.models.sirius.mem_event import MemEvent as SQLAMemEvent, MemEventEnum
+from webapp.models.sirius.mem_rating import LikeDislikeEnum, MemRating as SQLAMemRating
+from webapp.schema.mem.mem import MemRead
+
+T = TypeVar('T')
+
+
+def _chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def buffer_rating_mem(session: AsyncSession, mem_id: int, user_id: int, mark: LikeDislikeEnum) -> MemRead | None:
+    counters = await votes.record_vote(mem_id, user_id, mark.value)
+
+    # состояния мема или пользователя еще нет в Redis - один раз читаем его из Postgres
+    if counters is None:
+        stored_query = (
+            select(SQLAMem.likes, SQLAMem.dislikes, SQLAMemRating.rating)
+            .outerjoin(SQLAMemRating, and_(SQLAMemRating.mem_id == SQLAMem.id, SQLAMemRating.user_id == user_id))
+            .where(SQLAMem.id == mem_id)
+        )
+        stored = (await session.execute(stored_query)).fetchone()
+        if stored is None:
+            return None
+
+        rating = stored.rating.value if stored.rating else votes.NO_VOTE
+        counters = await votes.record_vote(mem_id, user_id, mark.value, (stored.likes, stored.dislikes, rating))
+        # состояние из Postgres передано - скрипт всегда возвращает счетчики
+        if counters is None:
+            return None
+
+    mem_read = await get_mem_by_id(session, mem_id)
+    if mem_read is None:
+        return None
+
+    likes, dislikes = counters
+    mem_read = mem_read.model_copy(update={'likes': likes, 'dislikes': dislikes})
+    await mem_cache.set(get_mem_cache_key(mem_id), mem_read, changed=True)
+    return mem_read
+
+
+async def _write_votes(session: AsyncSession, pending: Dict[Tuple[int, int], str]) -> None:
+    upserts = [
+        {'mem_id': mem_id, 'user_id': user_id, 'rating': LikeDislikeEnum(mark)}
+        for (mem_id, user_id), mark in pending.items()
+        if mark != votes.NO_VOTE
+    ]
+    deletes = [key for key, mark in pending.items() if mark == votes.NO_VOTE]
+
+    for chunk in _chunks(upserts, settings.VOTES_FLUSH_BATCH_SIZE):
+        stmt = insert(SQLAMemRating).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SQLAMemRating.user_id, SQLAMemRating.mem_id],
+            set_={'rating': stmt.excluded.rating},
+        )
+        await session.execute(stmt)
+
+    for keys in _chunks(deletes, settings.VOTES_FLUSH_BATCH_SIZE):
+        await session.execute(
+            delete(SQLAMemRating).where(tuple_(SQLAMemRating.mem_id, SQLAMemRating.user_id).in_(keys))
+        )
+
+    # счетчики пересчитываются по mem_ratings, поэтому повторная запись того же снимка ничего не испортит
+    mem_ids_param = bindparam('mem_ids', list({mem_id for mem_id, _ in pending}), type_=ARRAY(Integer))
+    counts = (
+        select(
+            SQLAMem.id.label('mem_id'),
+            func.count(SQLAMemRating.id).filter(SQLAMemRating.rating == LikeDislikeEnum.like).label('likes'),
+            func.count(SQLAMemRating.id).filter(SQLAMemRating.rating == LikeDislikeEnum.dislike).label('dislikes'),
+        )
+        .outerjoin(SQLAMemRating, SQLAMemRating.mem_id == SQLAMem.id)
+        .where(SQLAMem.id == any_(mem_ids_param))
+        .group_by(SQLAMem.id)
+        .subquery()
+    )
+    result = await session.execute(
+        update(SQLAMem)
+        .where(SQLAMem.id == counts.c.mem_id)
+        .values(likes=counts.c.likes, dislikes=counts.c.dislikes)
+        .returning(SQLAMem.id, SQLAMem.likes, SQLAMem.dislikes)
+        .execution_options(synchronize_session=False)
+    )
+    mems = {mem.id: mem for mem in result.all()}
+
+    # события об оценках пишутся в outbox в той же транзакции, что и сами оценки
+    events = [
+        {
+            'mem_id': mem_id,
+            'event_type': MemEventEnum.rated,
+            'payload': {
+                'user_id': user_id,
+                'mark': None if mark == votes.NO_VOTE else mark,
+                'likes': mems[mem_id].likes,
+                'dislikes': mems[mem_id].dislikes,
+            },
+        }
+        for (mem_id, user_id), mark in pending.items()
+        if mem_id in mems
+    ]
+    for chunk in _chunks(events, settings.VOTES_FLUSH_BATCH_SIZE):
+        await session.execute(insert(SQLAMemEvent).values(chunk))
+
+
+async def flush_votes(session: AsyncSession) -> int:
+    lock_key = get_votes_flush_lock_key()
+    token = await acquire_lock(lock_key, settings.VOTES_FLUSH_LOCK_TTL)
+    # голоса уже сбрасывает другой воркер
+    if token is None:
+        return 0
+
+    try:
+        async with keep_lock(lock_key, token, settings.VOTES_FLUSH_LOCK_TTL):
+            pending = await votes.take_pending()
+            if not pending:
+                return 0
+
+            async with session.begin() as transaction:
+                await _write_votes(session, pending)
+                # блокировка истекла (Redis был недоступен дольше TTL) - этот же снимок мог забрать другой воркер,
+                # коммит продублировал бы события об оценках
+                if not await extend_lock(lock_key, token, settings.VOTES_FLUSH_LOCK_TTL):
+                    logger.warning('Votes flush lock was lost, the snapshot is left to its new owner')
+                    await transaction.rollback()
+                    return 0
+
+        await votes.ack_pending()
+        return len(pending)
+    finally:
+        await release_lock(lock_key, token)
+
+
+async def run_vote_flusher() -> None:
+    while True:
+        await asyncio.sleep(settings.VOTES_FLUSH_INTERVAL_MS / 1000)
+        try:
+            async with async_session() as session:
+                await flush_votes(session)
+        except (SQLAlchemyError, RedisError):
+            logger.exception('Votes flush failed, will retry')
@@ -1,10 +1,12 @@
 import random
+import asyncio
 from typing import List
 
 from aiokafka.producer import AIOKafkaProducer
 
 producer: AIOKafkaProducer
 partitions: List[int]
+outbox_publisher: asyncio.Task[None]
 
 
 def get_producer() -> AIOKafkaProducer:
@@ -13,7 +15,7 @@ def get_producer() -> AIOKafkaProducer:
     return producer
 
 
-def get_partition() -> int:
+def get_partition() -> int | None:
     global partitions
 
-    return random.choice(partitions)
+    return random.choice(partitions) if partitions else None
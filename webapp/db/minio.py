@@ -1,10 +1,59 @@
-from minio import Minio
+from typing import AsyncIterator
+
+import aiohttp
 
 from conf.config import settings
+from webapp.utils.instrumentation import InstrumentedMinio
 
-minio_client = Minio(
+async_minio_client = InstrumentedMinio(
     f'{settings.MINIO_HOST}:{settings.MINIO_PORT}',
     access_key=settings.MINIO_ACCESS_KEY,
     secret_key=settings.MINIO_SECRET_KEY,
     secure=False,
 )
+
+
+http_session: aiohttp.ClientSession | None = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    global http_session
+
+    # одна сессия на процесс: соединения с MinIO переиспользуются между скачиваниями
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=settings.MINIO_HTTP_CONNECTIONS))
+    return http_session
+
+
+async def close_http_session() -> None:
+    if http_session is not None:
+        await http_session.close()
+
+
+class ObjectStream:
+    # ответ MinIO, который читается частями; соединение возвращается в пул и при обрыве клиента, и при ошибке
+    def __init__(self, object_name: str, offset: int = 0, length: int = 0) -> None:
+        self.object_name = object_name
+        self.offset = offset
+        self.length = length
+        self.response: aiohttp.ClientResponse | None = None
+
+    async def open(self) -> 'ObjectStream':
+        self.response = await async_minio_client.get_object(
+            settings.BUCKET_NAME, self.object_name, get_http_session(), offset=self.offset, length=self.length
+        )
+        return self
+
+    async def iter_chunks(self, chunk_size: int) -> AsyncIterator[bytes]:
+        if self.response is None:
+            raise RuntimeError(f'Object stream {self.object_name} is not opened')
+        try:
+            async for chunk in self.response.content.iter_chunked(chunk_size):
+                yield chunk
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self.response is not None:
+            self.response.release()
+            self.response = None
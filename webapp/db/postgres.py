@@ -1,36 +1,80 @@
-from typing import AsyncGenerator
+import uuid
+from typing import Any, AsyncGenerator, Dict, Tuple
 
-from sqlalchemy import QueuePool
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from conf.config import settings
+from webapp.utils.instrumentation import InstrumentedQueuePool, instrument_engine
 
 
-def create_engine() -> AsyncEngine:
-    return create_async_engine(
-        settings.DB_URL,
-        poolclass=QueuePool,
-        connect_args={
+def get_pool_limits() -> Tuple[int, int]:
+    if not settings.DB_POOL_BUDGET:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+
+    # бюджет соединений делится между воркерами, постоянная часть пула не больше DB_POOL_SIZE
+    per_worker = max(1, settings.DB_POOL_BUDGET // settings.WEB_WORKERS)
+    pool_size = min(settings.DB_POOL_SIZE, per_worker)
+    return pool_size, per_worker - pool_size
+
+
+def get_connect_args() -> Dict[str, Any]:
+    if settings.DB_CONNECTION_MODE == 'pgbouncer':
+        # pgbouncer отдает транзакциям разные серверные соединения: кэш подготовленных запросов отключен,
+        # а уникальные имена не дают запросам разных клиентов столкнуться на одном соединении
+        return {
             'statement_cache_size': 0,
-        },
-        pool_size=5,
-        max_overflow=20,
-        pool_recycle=3600,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+        }
+
+    return {
+        'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+        'prepared_statement_cache_size': settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+
+
+def create_engine(url: str | None = None, pool_label: str = 'primary') -> AsyncEngine:
+    pool_size, max_overflow = get_pool_limits()
+    engine = create_async_engine(
+        url or settings.DB_URL,
+        poolclass=InstrumentedQueuePool.labeled(pool_label),
+        connect_args=get_connect_args(),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
     )
+    instrument_engine(engine)
+    return engine
 
 
-def create_session(engine: AsyncEngine | None = None) -> async_sessionmaker[AsyncSession]:
+def create_session(engine: AsyncEngine | None = None, replica: bool = False) -> async_sessionmaker[AsyncSession]:
     return async_sessionmaker(
         bind=engine or create_engine(),
         class_=AsyncSession,
         autoflush=False,
         expire_on_commit=False,
+        info={'replica': replica},
     )
 
 
+def is_replica(session: AsyncSession) -> bool:
+    # прочитанное с реплики может отставать, такие данные не записываются в общие кэши
+    return session.info.get('replica', False)
+
+
+def open_session_like(session: AsyncSession) -> AsyncSession:
+    # своя сессия к той же базе, что и у переданной: ей можно пользоваться и после того, как та закроется
+    return AsyncSession(bind=session.bind, autoflush=False, expire_on_commit=False, info=dict(session.info))
+
+
 engine = create_engine()
 async_session = create_session(engine)
 
+replica_engines = [create_engine(url, f'replica_{index}') for index, url in enumerate(settings.DB_REPLICA_URLS)]
+replica_sessions = [create_session(replica_engine, replica=True) for replica_engine in replica_engines]
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
@@ -0,0 +1,79 @@
+import asyncio
+import itertools
+from typing import AsyncGenerator, List
+
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from conf.config import settings
+from webapp.cache.redis.key_builder import get_recent_write_key
+from webapp.db.postgres import get_session, replica_engines, replica_sessions
+from webapp.db.redis import get_redis
+from webapp.logger import logger
+from webapp.utils.auth.jwt import JwtTokenT, jwt_auth
+
+# состояние реплик по результатам последней проверки, до первой проверки реплики считаются доступными
+healthy: List[bool] = [True] * len(replica_engines)
+round_robin = itertools.count()
+
+health_checker: asyncio.Task[None]
+
+
+def pick_replica() -> async_sessionmaker[AsyncSession] | None:
+    candidates = [session_maker for session_maker, ok in zip(replica_sessions, healthy) if ok]
+    if not candidates:
+        return None
+    return candidates[next(round_robin) % len(candidates)]
+
+
+async def mark_user_write(user_id: int) -> None:
+    if not replica_sessions:
+        return
+
+    redis = await get_redis()
+    await redis.set(get_recent_write_key(user_id), 1, px=int(settings.DB_READ_YOUR_WRITES_WINDOW * 1000))
+
+
+async def has_recent_write(user_id: int) -> bool:
+    redis = await get_redis()
+    return bool(await redis.exists(get_recent_write_key(user_id)))
+
+
+async def get_read_session(
+    primary: AsyncSession = Depends(get_session),
+    current_user: JwtTokenT = Depends(jwt_auth.get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    # сессия основной базы создается лениво и без запросов соединение не берет
+    session_maker = pick_replica() if replica_sessions else None
+    if session_maker is None or await has_recent_write(current_user['user_id']):
+        yield primary
+        return
+
+    async with session_maker() as session:
+        yield session
+
+
+async def ping_replica(index: int) -> None:
+    async with replica_engines[index].connect() as conn:
+        await conn.execute(text('SELECT 1'))
+
+
+async def check_replica(index: int) -> None:
+    try:
+        await asyncio.wait_for(ping_replica(index), settings.DB_REPLICA_HEALTH_CHECK_TIMEOUT)
+    except (asyncio.TimeoutError, OSError, SQLAlchemyError):
+        if healthy[index]:
+            logger.warning('Replica %s is unavailable, reads go to other replicas or primary', index, exc_info=True)
+        healthy[index] = False
+    else:
+        if not healthy[index]:
+            logger.info('Replica %s is available again', index)
+        healthy[index] = True
+
+
+async def run_replica_health_checks() -> None:
+    while True:
+        await asyncio.gather(*(check_replica(index) for index in range(len(replica_engines))))
+        await asyncio.sleep(settings.DB_REPLICA_HEALTH_CHECK_INTERVAL)
@@ -6,18 +6,33 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from webapp.api.auth.router import auth_router
+from webapp.api.file.router import file_router
 from webapp.api.mem.router import mem_router
 from webapp.metrics import metrics
+from webapp.middleware.body_limit import BodySizeLimitMiddleware
 from webapp.middleware.logger import LogServerMiddleware
 from webapp.middleware.metrics import MeasureLatencyMiddleware
-from webapp.on_shutdown import stop_producer
-from webapp.on_startup.kafka import create_producer
+from webapp.on_shutdown import (
+    stop_cache_invalidation,
+    stop_minio,
+    stop_outbox_publisher,
+    stop_producer,
+    stop_replica_health_checks,
+    stop_revocation_sync,
+    stop_vote_flusher,
+)
+from webapp.on_startup.cache import start_cache_invalidation, start_revocation_sync
+from webapp.on_startup.kafka import create_producer, start_outbox_publisher
 from webapp.on_startup.logger import setup_logger
+from webapp.on_startup.minio import start_minio
 from webapp.on_startup.rabbit import start_rabbit
 from webapp.on_startup.redis import start_redis
+from webapp.on_startup.replica import start_replica_health_checks
+from webapp.on_startup.votes import start_vote_flusher
 
 
 def setup_middleware(app: FastAPI) -> None:
+    app.add_middleware(BodySizeLimitMiddleware)
     app.add_middleware(LogServerMiddleware)
     app.add_middleware(MeasureLatencyMiddleware)
 
@@ -37,17 +52,30 @@ def setup_routers(app: FastAPI) -> None:
 
     app.include_router(auth_router)
     app.include_router(mem_router)
+    app.include_router(file_router)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     setup_logger()
     await start_redis()
+    await start_replica_health_checks()
+    await start_cache_invalidation()
+    await start_revocation_sync()
+    await start_vote_flusher()
     await start_rabbit()
+    await start_minio()
     await create_producer()
+    await start_outbox_publisher()
     print('START APP')
     yield
+    await stop_vote_flusher()
+    await stop_outbox_publisher()
     await stop_producer()
+    await stop_revocation_sync()
+    await stop_cache_invalidation()
+    await stop_replica_health_checks()
+    await stop_minio()
     print('END APP')
 
 
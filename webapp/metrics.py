@@ -1,4 +1,6 @@
 import os
+from contextvars import ContextVar
+from typing import Dict
 
 import prometheus_client
 from aiokafka import AIOKafkaConsumer
@@ -30,15 +32,8 @@ DEFAULT_BUCKETS = (
 )
 
 
-# TODO in middleware
-# prometheus_client.Counter(
-#     'sirius_deps_latency_seconds',
-#     '',
-#     ['endpoint'],
-# )
-
 # histogram_quantile(0.99, sum(rate(sirius_deps_latency_seconds_bucket[1m])) by (le, endpoint))
-# среднее время обработки за 1 мин
+# суммарное время запроса во внешних зависимостях (Postgres, Redis, MinIO, RabbitMQ)
 DEPS_LATENCY = prometheus_client.Histogram(
     'sirius_deps_latency_seconds',
     '',
@@ -46,9 +41,40 @@ DEPS_LATENCY = prometheus_client.Histogram(
     buckets=DEFAULT_BUCKETS,
 )
 
+# время, потраченное запросом на каждую внешнюю зависимость; словарь заводит MeasureLatencyMiddleware
+integration_timings_ctx: ContextVar[Dict[str, float] | None] = ContextVar('integration_timings_ctx', default=None)
+
+# пул соединений с Postgres: по этим метрикам подбираются DB_POOL_SIZE и DB_MAX_OVERFLOW;
+# pool - primary или replica_{номер в DB_REPLICA_URLS}
+DB_POOL_CHECKED_OUT = prometheus_client.Gauge(
+    'sirius_db_pool_checked_out',
+    'Соединения, выданные из пула',
+    ['pool'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_OVERFLOW = prometheus_client.Gauge(
+    'sirius_db_pool_overflow',
+    'Соединения сверх DB_POOL_SIZE',
+    ['pool'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAIT = prometheus_client.Histogram(
+    'sirius_db_pool_wait_seconds',
+    'Время получения соединения из пула, включая открытие нового',
+    ['pool'],
+    buckets=DEFAULT_BUCKETS,
+)
+
+# обращения к кэшам чтения: hit, stale, miss, coalesced (запрос дождался чужой загрузки)
+CACHE_REQUESTS = prometheus_client.Counter(
+    'sirius_cache_requests_total',
+    'Обращения к кэшам чтения',
+    ['cache', 'result'],
+)
+
 
 def metrics(request: Request) -> Response:
-    if 'prometheus_multiproc_dir' in os.environ:
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ or 'prometheus_multiproc_dir' in os.environ:
         registry = CollectorRegistry()
         MultiProcessCollector(registry)
     else:
@@ -0,0 +1,56 @@
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from starlette import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from conf.config import settings
+
+
+def get_body_max_size() -> int:
+    # самый большой запрос - загрузка мема: файл плюс поля формы и границы multipart
+    return settings.MEM_UPLOAD_MAX_SIZE + settings.MEM_UPLOAD_MULTIPART_OVERHEAD
+
+
+def _too_large_detail(max_size: int) -> str:
+    return f'тело запроса больше {max_size} байт'
+
+
+class BodySizeLimitMiddleware:
+    # starlette пишет multipart во временный файл целиком до вызова ручки, поэтому размер проверяется здесь
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        max_size = get_body_max_size()
+        for header, value in scope['headers']:
+            if header == b'content-length':
+                if value.isdigit() and int(value) > max_size:
+                    response = ORJSONResponse(
+                        {'detail': _too_large_detail(max_size)},
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        # без Content-Length (chunked) или с неверным значением обрываем чтение, как только тело превысит лимит
+        async def receive_wrapper() -> Message:
+            nonlocal received
+
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=_too_large_detail(max_size),
+                    )
+            return message
+
+        await self.app(scope, receive_wrapper, send)
@@ -1,10 +1,11 @@
 import time
+from typing import Dict
 
 from prometheus_client import Counter, Histogram
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from webapp.metrics import DEFAULT_BUCKETS, DEPS_LATENCY
+from webapp.logger import correlation_id_ctx
+from webapp.metrics import DEFAULT_BUCKETS, DEPS_LATENCY, integration_timings_ctx
 
 # гистограмма для измерения времени выполнения каждой ручки
 API_REQUEST_LATENCY = Histogram(
@@ -14,6 +15,22 @@ API_REQUEST_LATENCY = Histogram(
     buckets=DEFAULT_BUCKETS,
 )
 
+# время до первого байта ответа: для потоковых ответов оно меньше полного времени ручки
+API_TIME_TO_FIRST_BYTE = Histogram(
+    'api_time_to_first_byte_seconds',
+    'Время до начала отправки ответа в секундах',
+    ['method', 'endpoint'],
+    buckets=DEFAULT_BUCKETS,
+)
+
+# размер тела ответа
+API_RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes',
+    'Размер тела ответа в байтах',
+    ['method', 'endpoint'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, float('+inf')),
+)
+
 # гистограмма для измерения времени выполнения всех интеграционных методов
 INTEGRATION_METHOD_LATENCY = Histogram(
     'integration_method_latency_seconds',
@@ -50,39 +67,81 @@ UNSUCCESSFUL_REQUESTS_COUNTER = Counter(
 )
 
 
-class MeasureLatencyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        endpoint = request.url.path
-        method = request.method
-        start_time = time.time()
-
-        response = await call_next(request)
-
-        process_time = time.time() - start_time
-        DEPS_LATENCY.labels(endpoint=endpoint).observe(process_time)
-        API_REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(
-            process_time,
-        )
-
-        # увеличиваем счетчик
-        REQUESTS_COUNTER.labels(
-            method=request.method,
-            endpoint=endpoint,
-            http_status=response.status_code,
-        ).inc()
-
-        # увеличиваем счетчик успешных/неуспешных запросов
-        if 200 <= response.status_code < 400:
-            SUCCESSFUL_REQUESTS_COUNTER.labels(
-                method=request.method,
-                endpoint=endpoint,
-                http_status=response.status_code,
-            ).inc()
-        else:
-            UNSUCCESSFUL_REQUESTS_COUNTER.labels(
-                method=request.method,
-                endpoint=endpoint,
-                http_status=response.status_code,
-            ).inc()
-
-        return response
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+def get_endpoint(scope: Scope) -> str:
+    # шаблон пути вместо самого пути, чтобы /{mem_id} не давал отдельный ряд на каждый мем
+    route = scope.get('route')
+    if route is not None:
+        return route.path
+    # ручки, добавленные через add_route (/metrics, /swagger), без параметров в пути
+    if 'endpoint' in scope:
+        return scope['path']
+    return UNMATCHED_ENDPOINT
+
+
+def get_server_timing(timings: Dict[str, float], total: float) -> bytes:
+    # разбивка по зависимостям на момент начала ответа, в миллисекундах
+    metrics = [f'{name};dur={duration * 1000:.1f}' for name, duration in timings.items()]
+    metrics.append(f'app;dur={total * 1000:.1f}')
+
+    correlation_id = correlation_id_ctx.get(None)
+    if correlation_id is not None:
+        correlation_id = ''.join(char for char in correlation_id if char.isalnum() or char in '-_.')
+        metrics.append(f'cid;desc="{correlation_id}"')
+    return ', '.join(metrics).encode('latin-1')
+
+
+class MeasureLatencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        timings: Dict[str, float] = {}
+        timings_token = integration_timings_ctx.set(timings)
+        first_byte_time: float | None = None
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal first_byte_time, status_code, response_size
+
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', get_server_timing(timings, time.perf_counter() - start_time)))
+                message = {**message, 'headers': headers}
+            elif message['type'] == 'http.response.body':
+                if first_byte_time is None:
+                    first_byte_time = time.perf_counter()
+                response_size += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            integration_timings_ctx.reset(timings_token)
+            process_time = time.perf_counter() - start_time
+            endpoint = get_endpoint(scope)
+            method = scope['method']
+
+            API_REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(process_time)
+            DEPS_LATENCY.labels(endpoint=endpoint).observe(sum(timings.values()))
+            if first_byte_time is not None:
+                API_TIME_TO_FIRST_BYTE.labels(method=method, endpoint=endpoint).observe(first_byte_time - start_time)
+            API_RESPONSE_SIZE.labels(method=method, endpoint=endpoint).observe(response_size)
+
+            # увеличиваем счетчик
+            REQUESTS_COUNTER.labels(method=method, endpoint=endpoint, http_status=status_code).inc()
+
+            # увеличиваем счетчик успешных/неуспешных запросов
+            if 200 <= status_code < 400:
+                SUCCESSFUL_REQUESTS_COUNTER.labels(method=method, endpoint=endpoint, http_status=status_code).inc()
+            else:
+                UNSUCCESSFUL_REQUESTS_COUNTER.labels(method=method, endpoint=endpoint, http_status=status_code).inc()
@@ -1 +1 @@
-from . import mem, mem_cart, mem_rating, user
+from . import mem, mem_cart, mem_event, mem_rating, user
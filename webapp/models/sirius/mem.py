@@ -1,9 +1,10 @@
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, ColumnElement, ForeignKey, Index, Integer, String, Text, literal_column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from webapp.models.meta import DEFAULT_SCHEMA, Base
+from webapp.utils.phash import PHASH_BAND_BITS, PHASH_BANDS
 
 if TYPE_CHECKING:
     from webapp.models.sirius.mem_cart import MemCart
@@ -17,9 +18,28 @@ class Mem(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey(f'{DEFAULT_SCHEMA}.users.id'), nullable=False)
-    photo_url: Mapped[str] = mapped_column(String(200), nullable=False)
+    # файлы адресуются по содержимому, поэтому один photo_url может быть у нескольких мемов
+    photo_url: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
     text: Mapped[str] = mapped_column(Text, nullable=False)
+    # денормализованные счетчики оценок, обновляются в транзакции rating_mem
+    likes: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0', index=True)
+    dislikes: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    # перцептивный хэш картинки (dhash), заполняется при MEM_PHASH_ENABLED
+    phash: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
 
     user: Mapped['User'] = relationship('User', back_populates='memes')
     ratings: Mapped[List['MemRating']] = relationship('MemRating', back_populates='mem')
     carts: Mapped[List['MemCart']] = relationship('MemCart', back_populates='mem')
+
+
+def phash_band_column(band: int) -> ColumnElement[int]:
+    # константы, а не параметры запроса: иначе планировщик не сопоставит условие с индексом по выражению
+    shift = literal_column(str(band * PHASH_BAND_BITS), Integer)
+    mask = literal_column(str((1 << PHASH_BAND_BITS) - 1), Integer)
+    return Mem.phash.op('>>')(shift).op('&')(mask)
+
+
+# индекс на каждую 16-битную часть хэша: у хэшей на расстоянии меньше PHASH_BANDS бит хотя бы одна часть совпадает
+# по выражению с op() таблица индекса сама не определяется, поэтому индекс добавляется в нее явно
+for _band in range(PHASH_BANDS):
+    Mem.__table__.append_constraint(Index(f'ix_sirius_memes_phash_band_{_band}', phash_band_column(_band)))
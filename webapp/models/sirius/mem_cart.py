@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ENUM
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,6 +21,8 @@ class MemCart(Base):
     __tablename__ = 'mem_carts'
     __table_args__ = (
         UniqueConstraint('user_id', 'mem_id', 'cart_type', name='user_mem_unique_cart'),
+        # выборки общей корзины: фильтр по cart_type и соединение с memes по mem_id
+        Index('ix_sirius_mem_carts_cart_type_mem_id', 'cart_type', 'mem_id'),
         {'schema': DEFAULT_SCHEMA},
     )
 
@@ -0,0 +1,29 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict
+
+from sqlalchemy import BigInteger, DateTime, Integer, func
+from sqlalchemy.dialects.postgresql import ENUM, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from webapp.models.meta import DEFAULT_SCHEMA, Base
+
+
+class MemEventEnum(Enum):
+    created = 'created'
+    rated = 'rated'
+    added_to_cart = 'added_to_cart'
+
+
+# outbox: событие пишется в одной транзакции с изменением мема, а в Kafka его отправляет фоновая задача
+class MemEvent(Base):
+    __tablename__ = 'mem_events'
+    __table_args__ = ({'schema': DEFAULT_SCHEMA},)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    mem_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    event_type: Mapped[MemEventEnum] = mapped_column(
+        ENUM(MemEventEnum, name='mem_event_enum', schema=DEFAULT_SCHEMA), nullable=False
+    )
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ENUM
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,6 +21,8 @@ class MemRating(Base):
     __tablename__ = 'mem_ratings'
     __table_args__ = (
         UniqueConstraint('user_id', 'mem_id', name='user_mem_unique_rating'),
+        # уникальный индекс начинается с user_id, а счетчики мема считаются по mem_id; INCLUDE - для index-only scan
+        Index('ix_sirius_mem_ratings_mem_id', 'mem_id', postgresql_include=['rating', 'id']),
         {'schema': DEFAULT_SCHEMA},
     )
 
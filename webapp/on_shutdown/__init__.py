@@ -1,5 +1,43 @@
-from webapp.db import kafka
+from conf.config import settings
+from webapp.cache.redis import invalidation, revoked_tokens, votes
+from webapp.crud.vote import flush_votes
+from webapp.db import kafka, replica
+from webapp.db.minio import close_http_session
+from webapp.db.postgres import async_session, replica_engines
+
+
+async def stop_outbox_publisher() -> None:
+    if settings.OUTBOX_PUBLISH_ENABLED:
+        kafka.outbox_publisher.cancel()
 
 
 async def stop_producer() -> None:
+    # stop() дожидается отправки уже накопленных пачек
     await kafka.producer.stop()
+
+
+async def stop_minio() -> None:
+    await close_http_session()
+
+
+async def stop_cache_invalidation() -> None:
+    invalidation.listener.cancel()
+
+
+async def stop_replica_health_checks() -> None:
+    if replica_engines:
+        replica.health_checker.cancel()
+        for replica_engine in replica_engines:
+            await replica_engine.dispose()
+
+
+async def stop_revocation_sync() -> None:
+    revoked_tokens.syncer.cancel()
+
+
+async def stop_vote_flusher() -> None:
+    if settings.VOTES_WRITE_BEHIND:
+        votes.flusher.cancel()
+        # последний сброс, чтобы не оставлять голоса в буфере до следующего запуска
+        async with async_session() as session:
+            await flush_votes(session)
@@ -0,0 +1,13 @@
+import asyncio
+
+from webapp.cache.redis import invalidation, revoked_tokens
+
+
+async def start_cache_invalidation() -> None:
+    invalidation.listener = asyncio.create_task(invalidation.listen_invalidations())
+
+
+async def start_revocation_sync() -> None:
+    # первая загрузка до приема запросов, чтобы отозванные токены не проходили сразу после старта
+    await revoked_tokens.sync_revoked_tokens()
+    revoked_tokens.syncer = asyncio.create_task(revoked_tokens.run_revocation_sync())
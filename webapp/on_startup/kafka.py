@@ -1,8 +1,27 @@
+import asyncio
+
 from aiokafka.producer import AIOKafkaProducer
 
 from conf.config import settings
+from webapp.crud.outbox import run_outbox_publisher
 from webapp.db import kafka
 
 
 async def create_producer() -> None:
-    pass
+    # сообщения копятся до KAFKA_LINGER_MS и уходят сжатыми пачками; события одного мема - в одну партицию по ключу
+    kafka.producer = AIOKafkaProducer(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        linger_ms=settings.KAFKA_LINGER_MS,
+        max_batch_size=settings.KAFKA_MAX_BATCH_SIZE,
+        compression_type=settings.KAFKA_COMPRESSION_TYPE,
+        acks='all',
+        enable_idempotence=True,
+    )
+    await kafka.producer.start()
+    # топика может еще не быть - тогда партицию выбирает сам продюсер
+    kafka.partitions = sorted(await kafka.producer.partitions_for(settings.KAFKA_TOPIC) or [])
+
+
+async def start_outbox_publisher() -> None:
+    if settings.OUTBOX_PUBLISH_ENABLED:
+        kafka.outbox_publisher = asyncio.create_task(run_outbox_publisher())
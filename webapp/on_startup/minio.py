@@ -0,0 +1,8 @@
+from conf.config import settings
+from webapp.db.minio import async_minio_client
+
+
+async def start_minio() -> None:
+    # бакет проверяется один раз при старте, а не на каждой загрузке
+    if not await async_minio_client.bucket_exists(settings.BUCKET_NAME):
+        await async_minio_client.make_bucket(settings.BUCKET_NAME)
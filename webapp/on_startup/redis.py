@@ -1,15 +1,29 @@
-from redis.asyncio import ConnectionPool, Redis
+from redis.asyncio import BlockingConnectionPool, ConnectionPool
 
 from conf.config import settings
 from webapp.db import redis
+from webapp.utils.instrumentation import InstrumentedRedis
 
 
-async def start_redis() -> None:
-    pool = ConnectionPool(
+def create_pool() -> ConnectionPool:
+    if not settings.REDIS_POOL_BUDGET:
+        return ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD,
+        )
+
+    # доля воркера в общем бюджете; одно соединение всегда занято подпиской на инвалидацию кэша
+    return BlockingConnectionPool(
         host=settings.REDIS_HOST,
         port=settings.REDIS_PORT,
         password=settings.REDIS_PASSWORD,
+        max_connections=max(2, settings.REDIS_POOL_BUDGET // settings.WEB_WORKERS),
+        timeout=settings.REDIS_POOL_TIMEOUT,
     )
-    redis.redis = Redis(
-        connection_pool=pool,
+
+
+async def start_redis() -> None:
+    redis.redis = InstrumentedRedis(
+        connection_pool=create_pool(),
     )
@@ -0,0 +1,9 @@
+import asyncio
+
+from webapp.db import replica
+from webapp.db.postgres import replica_engines
+
+
+async def start_replica_health_checks() -> None:
+    if replica_engines:
+        replica.health_checker = asyncio.create_task(replica.run_replica_health_checks())
@@ -0,0 +1,10 @@
+import asyncio
+
+from conf.config import settings
+from webapp.cache.redis import votes
+from webapp.crud.vote import run_vote_flusher
+
+
+async def start_vote_flusher() -> None:
+    if settings.VOTES_WRITE_BEHIND:
+        votes.flusher = asyncio.create_task(run_vote_flusher())
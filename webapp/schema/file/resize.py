@@ -14,7 +14,9 @@ class FillQueue(BaseModel):
 
 
 class ResizeStatusEnum(enum.Enum):
-    status = 'status'
+    queued = 'queued'
+    done = 'done'
+    failed = 'failed'
 
 
 class ImageResizeResponse(BaseModel):
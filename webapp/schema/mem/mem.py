@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel, ConfigDict
 
 from webapp.schema.enums import CartEnum, LikeDislikeEnum
@@ -12,12 +14,25 @@ class MemRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MemPage(BaseModel):
+    items: List[MemRead]
+    next_after: int | None = None
+
+
+class MemSeenStats(BaseModel):
+    seen: int
+    pool: int
+    memory_bytes: int
+
+
 class MemCreate(BaseModel):
     text: str
 
 
 class MemAfterCreate(BaseModel):
     id: int
+    # похожие по перцептивному хэшу мемы, если MEM_PHASH_ENABLED
+    similar_mem_ids: List[int] = []
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -1,4 +1,6 @@
+import time
 import uuid
+import hashlib
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import cast
@@ -10,6 +12,8 @@ from starlette import status
 from typing_extensions import TypedDict
 
 from conf.config import settings
+from webapp.cache.local import LocalCache
+from webapp.cache.redis.revoked_tokens import is_revoked
 from webapp.models.sirius.user import User
 
 auth_scheme = HTTPBearer()
@@ -17,7 +21,8 @@ auth_scheme = HTTPBearer()
 
 class JwtTokenT(TypedDict):
     uid: str
-    exp: datetime
+    # после декодирования - unix-время в секундах
+    exp: int
     user_id: int
 
 
@@ -28,21 +33,42 @@ class JwtAuth:
     def create_token(self, user: User) -> str:
         access_token = {
             'uid': uuid.uuid4().hex,
-            'exp': datetime.utcnow() + timedelta(days=6),
+            'exp': datetime.utcnow() + timedelta(seconds=settings.JWT_TOKEN_TTL),
             'user_id': user.id,
         }
         return jwt.encode(access_token, self.secret)
 
-    def validate_token(self, credentials: HTTPAuthorizationCredentials = Security(auth_scheme)) -> JwtTokenT:
-        token = credentials.credentials
+    def check_token(self, token: str) -> JwtTokenT:
+        # в кэше лежат только уже проверенные токены, ключ - хэш, чтобы не держать сами токены в памяти
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        payload = token_cache.get(digest) if token_cache is not None else None
 
-        try:
-            return cast(JwtTokenT, jwt.decode(token, self.secret))
-        except JWTError:
+        if payload is None:
+            try:
+                payload = cast(JwtTokenT, jwt.decode(token, self.secret))
+            except JWTError:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+            ttl = payload['exp'] - time.time()
+            if token_cache is not None and ttl > 0:
+                token_cache.set(digest, payload, ttl)
+
+        if is_revoked(payload['uid']):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        return payload
+
+    async def validate_token(self, credentials: HTTPAuthorizationCredentials = Security(auth_scheme)) -> JwtTokenT:
+        # async-зависимость выполняется в цикле событий, а не в пуле потоков: token_cache не потокобезопасен
+        return self.check_token(credentials.credentials)
+
+    async def get_current_user(self, credentials: HTTPAuthorizationCredentials = Security(auth_scheme)) -> JwtTokenT:
+        return self.check_token(credentials.credentials)
 
-    def get_current_user(self, credentials: HTTPAuthorizationCredentials = Security(auth_scheme)) -> JwtTokenT:
-        return self.validate_token(credentials)
 
+# проверенные токены до их exp, чтобы не декодировать и не проверять подпись на каждый запрос.
+# инвалидация кэша мемов его не касается: токен остается верным и после переподключения к Redis
+token_cache: LocalCache[JwtTokenT] | None = (
+    LocalCache(settings.JWT_CACHE_MAX_SIZE, 0, register=False) if settings.JWT_CACHE_ENABLED else None
+)
 
 jwt_auth = JwtAuth(settings.JWT_SECRET_SALT)
@@ -0,0 +1,50 @@
+import re
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+from starlette import status
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int] | None:
+    # поддерживается один диапазон; несколько диапазонов или непонятный заголовок - отдаем файл целиком
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # bytes=-N - последние N байт
+        start, end = max(size - int(last), 0), size - 1
+        unsatisfiable = int(last) == 0 or size == 0
+    elif last and int(last) < int(first):
+        return None
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+        unsatisfiable = start >= size
+
+    if unsatisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail='диапазон за пределами файла',
+            headers={'Content-Range': f'bytes */{size}'},
+        )
+    return start, end
+
+
+def if_range_matches(if_range: str, etag: str, last_modified: datetime) -> bool:
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/')):
+        # слабые ETag для диапазонов не подходят
+        return if_range == etag and not etag.startswith('W/')
+
+    try:
+        return parsedate_to_datetime(if_range) == last_modified.replace(microsecond=0)
+    except (TypeError, ValueError):
+        return False
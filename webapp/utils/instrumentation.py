@@ -0,0 +1,96 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Type
+
+from miniopy_async import Minio
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from sqlalchemy import AsyncAdaptedQueuePool, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import ConnectionPoolEntry, PoolProxiedConnection
+
+from webapp.metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_WAIT, integration_timings_ctx
+from webapp.middleware.metrics import INTEGRATION_METHOD_LATENCY, OUTGOING_REQUESTS_COUNTER
+
+
+def observe_integration(integration_point: str, method: str, duration: float) -> None:
+    INTEGRATION_METHOD_LATENCY.labels(method=method, integration_point=integration_point).observe(duration)
+    OUTGOING_REQUESTS_COUNTER.labels(method=method, destination=integration_point).inc()
+
+    timings = integration_timings_ctx.get()
+    if timings is not None:
+        timings[integration_point] = timings.get(integration_point, 0.0) + duration
+
+
+@contextmanager
+def timed(integration_point: str, method: str) -> Iterator[None]:
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_integration(integration_point, method, time.perf_counter() - start_time)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    # события синхронного движка срабатывают в том же контексте, что и await в async-сессии
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        start_time = conn.info['query_start_time'].pop()
+        observe_integration('postgres', statement.split(None, 1)[0].upper(), time.perf_counter() - start_time)
+
+    @event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(context: Any) -> None:
+        start_times = context.connection.info.get('query_start_time') if context.connection is not None else None
+        if start_times:
+            observe_integration('postgres', 'ERROR', time.perf_counter() - start_times.pop())
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    pool_label = 'primary'
+
+    @classmethod
+    def labeled(cls, pool_label: str) -> Type['InstrumentedQueuePool']:
+        # движок создает пул сам и пересоздает его по классу, поэтому метка хранится в подклассе
+        return type(cls.__name__, (cls,), {'pool_label': pool_label})
+
+    def connect(self) -> PoolProxiedConnection:
+        start_time = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_WAIT.labels(pool=self.pool_label).observe(time.perf_counter() - start_time)
+            self._observe_usage()
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._observe_usage()
+
+    def _observe_usage(self) -> None:
+        DB_POOL_CHECKED_OUT.labels(pool=self.pool_label).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(pool=self.pool_label).set(max(0, self.overflow()))
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> Any:
+        with timed('redis', 'PIPELINE'):
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(Redis):
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        with timed('redis', str(args[0]).upper()):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedMinio(Minio):
+    # все обращения клиента к MinIO проходят через _url_open, метка - HTTP-метод запроса к S3
+    async def _url_open(self, method: str, region: str, *args: Any, **kwargs: Any) -> Any:
+        with timed('minio', method):
+            return await super()._url_open(method, region, *args, **kwargs)
@@ -0,0 +1,31 @@
+from typing import BinaryIO
+
+from PIL import Image
+
+PHASH_BITS = 64
+PHASH_BAND_BITS = 16
+PHASH_BANDS = PHASH_BITS // PHASH_BAND_BITS
+PHASH_MASK = (1 << PHASH_BITS) - 1
+
+
+def dhash(file: BinaryIO) -> int:
+    # разностный хэш: 9x8 в оттенках серого, бит - ярче ли пиксель своего соседа справа
+    with Image.open(file) as img:
+        img.draft('L', (64, 64))
+        pixels = list(img.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+
+    # в Postgres хэш хранится в знаковом BIGINT
+    return value - (1 << PHASH_BITS) if value >= 1 << (PHASH_BITS - 1) else value
+
+
+def phash_band(value: int, band: int) -> int:
+    return (value >> (band * PHASH_BAND_BITS)) & ((1 << PHASH_BAND_BITS) - 1)
+
+
+def phash_distance(first: int, second: int) -> int:
+    return ((first ^ second) & PHASH_MASK).bit_count()
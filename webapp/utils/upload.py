@@ -0,0 +1,94 @@
+import hashlib
+from typing import BinaryIO, Dict, Tuple
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+
+from conf.config import settings
+from webapp.utils.phash import dhash
+
+# сигнатуры в начале файла для поддерживаемых форматов картинок
+IMAGE_SIGNATURES: Dict[bytes, str] = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+    b'GIF87a': 'image/gif',
+    b'GIF89a': 'image/gif',
+}
+SIGNATURE_SIZE = 12
+IMAGE_EXTENSIONS: Dict[str, str] = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+
+def detect_image_type(head: bytes) -> str | None:
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f'файл больше {settings.MEM_UPLOAD_MAX_SIZE} байт',
+    )
+
+
+class ImageUpload:
+    # загруженный файл, уже проверенный и посчитанный: sha256 задает имя объекта в MinIO, длина известна заранее
+    def __init__(self, file: UploadFile, content_type: str, size: int, sha256: str, phash: int | None) -> None:
+        self.file = file
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.phash = phash
+
+    @property
+    def object_name(self) -> str:
+        return f'blobs/{self.sha256[:2]}/{self.sha256}{IMAGE_EXTENSIONS[self.content_type]}'
+
+    @classmethod
+    async def open(cls, file: UploadFile) -> 'ImageUpload':
+        # размер части из multipart: тело целиком уже ограничено BodySizeLimitMiddleware, здесь - сам файл
+        if file.size is not None and file.size > settings.MEM_UPLOAD_MAX_SIZE:
+            raise _too_large()
+
+        # файл уже лежит во временном файле starlette: один проход в потоке проверяет и хэширует его частями
+        return cls(file, *await run_in_threadpool(cls._scan, file.file))
+
+    @staticmethod
+    def _scan(file: BinaryIO) -> Tuple[str, int, str, int | None]:
+        file.seek(0)
+        head = file.read(SIGNATURE_SIZE)
+        content_type = detect_image_type(head)
+        if content_type is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='файл не является картинкой')
+
+        sha256 = hashlib.sha256(head)
+        size = len(head)
+        while chunk := file.read(settings.MEM_UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.MEM_UPLOAD_MAX_SIZE:
+                raise _too_large()
+            sha256.update(chunk)
+
+        phash = None
+        if settings.MEM_PHASH_ENABLED:
+            file.seek(0)
+            try:
+                phash = dhash(file)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='картинка повреждена') from None
+
+        file.seek(0)
+        return content_type, size, sha256.hexdigest(), phash
+
+    async def read(self, size: int = -1) -> bytes:
+        return await self.file.read(size)
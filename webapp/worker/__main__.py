@@ -0,0 +1,6 @@
+import asyncio
+
+from webapp.worker.resize import run_resize_worker
+
+if __name__ == '__main__':
+    asyncio.run(run_resize_worker())
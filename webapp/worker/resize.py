@@ -0,0 +1,94 @@
+import io
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict
+
+import aiohttp
+import msgpack
+from aiokafka import AIOKafkaConsumer
+from miniopy_async.error import S3Error
+from PIL import Image
+
+from conf.config import settings
+from webapp.crud.resize import get_resize_variant, get_resized_path, set_resize_status
+from webapp.db.minio import ObjectStream, async_minio_client, close_http_session
+from webapp.logger import logger
+from webapp.on_startup.logger import setup_logger
+from webapp.on_startup.redis import start_redis
+from webapp.schema.file.resize import ResizeStatusEnum
+
+
+def resize_image(image: bytes, width: int, height: int) -> bytes:
+    with Image.open(io.BytesIO(image)) as img:
+        # JPEG сразу декодируется в уменьшенном масштабе, не разворачивая картинку целиком
+        img.draft('RGB', (width, height))
+        img.thumbnail((width, height))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        result = io.BytesIO()
+        img.save(result, 'JPEG', quality=settings.RESIZE_JPEG_QUALITY, optimize=True)
+    return result.getvalue()
+
+
+async def read_image(photo_url: str) -> bytes:
+    stream = await ObjectStream(photo_url).open()
+    return b''.join([chunk async for chunk in stream.iter_chunks(settings.MEM_DOWNLOAD_CHUNK_SIZE)])
+
+
+async def process_job(pool: Executor, job: Dict[str, Any]) -> None:
+    mem_id, width, height = job['mem_id'], job['width'], job['height']
+
+    try:
+        image = await read_image(job.get('upload_path') or job['photo_url'])
+        # уменьшение картинки нагружает CPU, поэтому выполняется в пуле процессов, а не в event loop
+        resized = await asyncio.get_running_loop().run_in_executor(pool, resize_image, image, width, height)
+        await async_minio_client.put_object(
+            settings.BUCKET_NAME,
+            get_resized_path(mem_id, get_resize_variant(width, height)),
+            io.BytesIO(resized),
+            len(resized),
+            content_type='image/jpeg',
+        )
+        status = ResizeStatusEnum.done
+    except (S3Error, aiohttp.ClientError, OSError, ValueError, Image.DecompressionBombError):
+        # OSError включает и битые картинки (UnidentifiedImageError), и таймауты
+        logger.exception('Resize of %s to %sx%s failed', mem_id, width, height)
+        status = ResizeStatusEnum.failed
+
+    await set_resize_status(mem_id, width, height, status)
+    # загруженный через /file/resize оригинал нужен только воркеру
+    if 'upload_path' in job:
+        try:
+            await async_minio_client.remove_object(settings.BUCKET_NAME, job['upload_path'])
+        except (S3Error, aiohttp.ClientError, OSError):
+            logger.warning('Resize upload %s was not removed', job['upload_path'], exc_info=True)
+
+
+async def run_resize_worker() -> None:
+    setup_logger()
+    await start_redis()
+
+    workers = settings.RESIZE_WORKERS or os.cpu_count() or 1
+    consumer = AIOKafkaConsumer(
+        settings.KAFKA_TOPIC,
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        group_id=settings.KAFKA_RESIZE_GROUP_ID,
+        enable_auto_commit=False,
+        value_deserializer=msgpack.unpackb,
+    )
+    await consumer.start()
+
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            while True:
+                # пачка не больше числа процессов, смещения фиксируются только после ее обработки
+                batches = await consumer.getmany(timeout_ms=1000, max_records=workers)
+                jobs = [message.value for messages in batches.values() for message in messages]
+                if jobs:
+                    await asyncio.gather(*(process_job(pool, job) for job in jobs))
+                    await consumer.commit()
+    finally:
+        await consumer.stop()
+        await close_http_session()
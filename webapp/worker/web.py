@@ -0,0 +1,6 @@
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    # явно, без auto: без uvloop и httptools воркер не должен молча переходить на asyncio и h11
+    CONFIG_KWARGS = {'loop': 'uvloop', 'http': 'httptools'}